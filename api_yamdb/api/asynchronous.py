@@ -0,0 +1,191 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers import asgi
+from django.db import connections
+from django.urls import URLPattern
+from rest_framework.response import Response
+from rest_framework.routers import DefaultRouter
+
+from api.profiling import profiled
+
+# Ограниченный пул для блокирующих вызовов асинхронных вьюх: размер
+# пула ограничивает и число одновременных соединений с базой.
+executor = ThreadPoolExecutor(max_workers=settings.ASYNC_EXECUTOR_WORKERS,
+                              thread_name_prefix='yamdb-async')
+
+
+def blocking(func, *args, **kwargs):
+    """Вызов func в потоке пула.
+
+    Поток пула держит свои соединения с базой между запросами, так что
+    пул работает и как пул соединений. Закрываем только соединения,
+    на которых были ошибки и которые больше нельзя использовать."""
+    try:
+        return func(*args, **kwargs)
+    finally:
+        for connection in connections.all():
+            if connection.errors_occurred:
+                connection.close_if_unusable_or_obsolete()
+
+
+def run_blocking(func, *args, **kwargs):
+    """Awaitable с результатом func, выполненной в пуле потоков."""
+    return sync_to_async(
+        profiled(partial(blocking, func)), thread_sensitive=False,
+        executor=executor)(*args, **kwargs)
+
+
+class AsyncReadMixin:
+    """Асинхронные варианты list и retrieve для ASGI.
+
+    Аутентификация, права, запросы к базе и сериализация выполняются
+    в пуле потоков, COUNT(*) и выборка страницы - параллельно. Вьюсет
+    переопределяет шаги через alist/aretrieve так же, как через
+    list/retrieve; остальные действия обрабатывает синхронная вьюха."""
+
+    async_actions = ('list', 'retrieve')
+
+    @classmethod
+    def as_async_view(cls, sync_view):
+        """Асинхронная вьюха для маршрута роутера.
+
+        Методы, которые не отображаются в async_actions, передаются
+        синхронной вьюхе sync_view."""
+        actions = sync_view.actions
+        delegate = sync_to_async(profiled(sync_view))
+
+        async def view(request, *args, **kwargs):
+            if actions.get(request.method.lower()) not in cls.async_actions:
+                return await delegate(request, *args, **kwargs)
+            self = cls(**sync_view.initkwargs)
+            self.action_map = actions
+            self.request = request
+            self.args = args
+            self.kwargs = kwargs
+            return await self.adispatch(request, *args, **kwargs)
+
+        view.cls = cls
+        view.initkwargs = sync_view.initkwargs
+        view.actions = actions
+        view.csrf_exempt = True
+        return view
+
+    async def adispatch(self, request, *args, **kwargs):
+        """Асинхронный аналог APIView.dispatch."""
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+        try:
+            await run_blocking(self.initial, request, *args, **kwargs)
+            handler = getattr(self, f'a{self.action}')
+            response = await handler(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        self.response = self.finalize_response(
+            request, response, *args, **kwargs)
+        return self.response
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = await run_blocking(
+            lambda: self.filter_queryset(self.get_queryset()))
+        page = await self.apaginate_queryset(queryset)
+        if page is not None:
+            data = await run_blocking(
+                lambda: self.get_serializer(page, many=True).data)
+            return self.get_paginated_response(data)
+        data = await run_blocking(
+            lambda: self.get_serializer(queryset, many=True).data)
+        return Response(data)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        data = await run_blocking(
+            lambda: self.get_serializer(self.get_object()).data)
+        return Response(data)
+
+    async def apaginate_queryset(self, queryset):
+        if self.paginator is None:
+            return None
+        apaginate = getattr(self.paginator, 'apaginate_queryset', None)
+        if apaginate is None:
+            return await run_blocking(self.paginate_queryset, queryset)
+        return await apaginate(queryset, self.request, view=self)
+
+
+async def gather_blocking(*calls):
+    """Параллельно выполняем в пуле потоков вызовы (func, *args)."""
+    return await asyncio.gather(
+        *(run_blocking(func, *args) for func, *args in calls))
+
+
+class AsyncReadRouter(DefaultRouter):
+    """DefaultRouter, который с async_reads=True подменяет маршруты
+    вьюсетов с AsyncReadMixin асинхронными вьюхами."""
+
+    def __init__(self, *args, async_reads=False, **kwargs):
+        self.async_reads = async_reads
+        super().__init__(*args, **kwargs)
+
+    def get_urls(self):
+        urls = super().get_urls()
+        if not self.async_reads:
+            return urls
+        return [self.get_async_url(url) for url in urls]
+
+    @staticmethod
+    def get_async_url(url):
+        viewset = getattr(url.callback, 'cls', None)
+        if not (isinstance(viewset, type)
+                and issubclass(viewset, AsyncReadMixin)
+                and set(url.callback.actions.values())
+                & set(viewset.async_actions)):
+            return url
+        return URLPattern(url.pattern, viewset.as_async_view(url.callback),
+                          url.default_args, url.name)
+
+
+class ASGIHandler(asgi.ASGIHandler):
+    """ASGI-приложение проекта.
+
+    Django 3.2 перебирает StreamingHttpResponse прямо в цикле событий,
+    и генератор с запросами к базе (выгрузка /api/v1/export/) падает
+    с SynchronousOnlyOperation, а клиент получает 200 с пустым телом.
+    Здесь каждую часть ответа достаёт sync_to_async в одном и том же
+    потоке, в котором курсор базы остаётся открытым между частями.
+
+    Синхронные вьюхи Django выполняет в своём потоке через
+    sync_to_async; оборачиваем их в profiled, чтобы их SQL-запросы
+    попадали в замеры ProfilingMiddleware так же, как под WSGI."""
+
+    def make_view_atomic(self, view):
+        view = super().make_view_atomic(view)
+        if asyncio.iscoroutinefunction(view):
+            return view
+        return profiled(view)
+
+    async def send_response(self, response, send):
+        if not response.streaming:
+            return await super().send_response(response, send)
+        headers = [(header.encode('ascii'), value.encode('latin1'))
+                   for header, value in response.items()]
+        headers.extend(
+            (b'Set-Cookie', cookie.output(header='').encode('ascii').strip())
+            for cookie in response.cookies.values())
+        await send({'type': 'http.response.start',
+                    'status': response.status_code, 'headers': headers})
+        parts = iter(response)
+        next_part = sync_to_async(next, thread_sensitive=True)
+        while True:
+            part = await next_part(parts, None)
+            if part is None:
+                break
+            for chunk, _ in self.chunk_bytes(part):
+                await send({'type': 'http.response.body', 'body': chunk,
+                            'more_body': True})
+        await send({'type': 'http.response.body'})
+        await sync_to_async(response.close, thread_sensitive=True)()
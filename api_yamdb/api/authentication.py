@@ -0,0 +1,85 @@
+from django.core.cache import caches
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from reviews.models import ClaimsUser, User
+
+CACHE_ALIAS = 'tokens'
+CLAIMS = ('username', 'role', 'is_superuser', 'token_version')
+REVOKING_FIELDS = ('username', 'role', 'is_superuser', 'is_active')
+
+
+def version_key(user_id):
+    return f'token_version:{user_id}'
+
+
+def get_token_version(user_id):
+    """Актуальная версия токенов пользователя; None, если его нет."""
+    cache = caches[CACHE_ALIAS]
+    version = cache.get(version_key(user_id))
+    if version is None:
+        version = User.objects.filter(pk=user_id).values_list(
+            'token_version', flat=True).first()
+        if version is not None:
+            cache.set(version_key(user_id), version, None)
+    return version
+
+
+def get_token_for_user(user):
+    """Access-токен с claims, достаточными для проверки прав без БД."""
+    token = AccessToken.for_user(user)
+    for claim in CLAIMS:
+        token[claim] = getattr(user, claim)
+    return token
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """JWT-аутентификация без загрузки пользователя из БД.
+
+    Если токен содержит claims из CLAIMS и его версия совпадает
+    с текущей версией токенов пользователя, пользователь собирается
+    из claims. Иначе (старый формат токена, смена роли) пользователь
+    загружается из БД, как в JWTAuthentication."""
+
+    def get_user(self, validated_token):
+        if not all(claim in validated_token for claim in CLAIMS):
+            return super().get_user(validated_token)
+        user_id = validated_token[api_settings.USER_ID_CLAIM]
+        if get_token_version(user_id) != validated_token['token_version']:
+            return super().get_user(validated_token)
+        user = ClaimsUser(
+            id=user_id,
+            username=validated_token['username'],
+            role=validated_token['role'],
+            is_superuser=validated_token['is_superuser'],
+            token_version=validated_token['token_version'],
+        )
+        user._state.adding = False
+        return user
+
+
+@receiver(pre_save, sender=User)
+def revoke_claims(sender, instance, **kwargs):
+    """При смене имени, роли или статуса увеличиваем версию токенов, чтобы
+    claims выданных ранее токенов перестали использоваться."""
+    if instance.pk is None:
+        return
+    previous = User.objects.filter(pk=instance.pk).values(
+        *REVOKING_FIELDS).first()
+    if previous and any(previous[field] != getattr(instance, field)
+                        for field in REVOKING_FIELDS):
+        instance.token_version += 1
+
+
+@receiver(post_save, sender=User)
+def cache_token_version(sender, instance, **kwargs):
+    caches[CACHE_ALIAS].set(
+        version_key(instance.pk), instance.token_version, None)
+
+
+@receiver(post_delete, sender=User)
+def forget_token_version(sender, instance, **kwargs):
+    caches[CACHE_ALIAS].delete(version_key(instance.pk))
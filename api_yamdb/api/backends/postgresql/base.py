@@ -0,0 +1,9 @@
+"""PostgreSQL с проверкой постоянных соединений перед первым
+использованием в запросе (DB_HEALTH_CHECKS)."""
+from django.db.backends.postgresql import base
+
+from api.database import HealthCheckMixin
+
+
+class DatabaseWrapper(HealthCheckMixin, base.DatabaseWrapper):
+    pass
@@ -0,0 +1,262 @@
+from django.db import NotSupportedError, connections, router, transaction
+from django.utils.encoding import smart_str
+from rest_framework import serializers, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.validators import UniqueValidator
+
+from api.parsers import FastJSONParser, NDJSONParser
+from api.permissions import IsAdmin
+from reviews.signals import catalogue_changed
+
+BULK_MODES = ('atomic', 'best-effort')
+
+
+class CachedSlugRelatedField(serializers.SlugRelatedField):
+    """SlugRelatedField, который при массовой записи берёт объекты
+    из загруженного одним запросом словаря context['slug_cache']."""
+
+    def to_internal_value(self, data):
+        slug_cache = self.context.get('slug_cache', {})
+        model = self.get_queryset().model
+        if model not in slug_cache:
+            return super().to_internal_value(data)
+        try:
+            return slug_cache[model][smart_str(data)]
+        except KeyError:
+            self.fail('does_not_exist', slug_name=self.slug_field,
+                      value=smart_str(data))
+        except TypeError:
+            self.fail('invalid')
+
+
+def load_slug_cache(serializer, items):
+    """Загружаем все упомянутые в пачке объекты по slug, по одному
+    запросу на связанную модель."""
+    slug_cache = {}
+    for name, field in serializer.fields.items():
+        relation = getattr(field, 'child_relation', field)
+        if not isinstance(relation, CachedSlugRelatedField):
+            continue
+        slugs = set()
+        for item in items:
+            value = item.get(name) if isinstance(item, dict) else None
+            values = value if isinstance(value, list) else [value]
+            slugs.update(smart_str(slug) for slug in values
+                         if isinstance(slug, (str, int)))
+        queryset = relation.get_queryset().filter(
+            **{f'{relation.slug_field}__in': slugs})
+        slug_cache[queryset.model] = {
+            smart_str(getattr(obj, relation.slug_field)): obj
+            for obj in queryset}
+    return slug_cache
+
+
+def set_pks(model, objects, unique_fields=()):
+    """Проставляем id после bulk_create там, где база их не возвращает.
+
+    Вызывается в той же транзакции сразу после вставки. Объекты
+    находятся по первому полю из unique_fields (slug). У моделей без
+    уникальных полей id восстанавливаются только в SQLite: запись
+    держит блокировку базы до коммита, а AUTOINCREMENT выдаёт id
+    по возрастанию, поэтому последние len(objects) id - наши. Другие
+    базы без RETURNING отклоняются NotSupportedError, а не получают
+    чужие id."""
+    if not objects or objects[0].pk is not None:
+        return
+    if unique_fields:
+        name = unique_fields[0]
+        pks = dict(model.objects.filter(
+            **{f'{name}__in': [getattr(obj, name) for obj in objects]}
+        ).values_list(name, 'pk'))
+        for obj in objects:
+            obj.pk = pks[getattr(obj, name)]
+        return
+    vendor = connections[router.db_for_write(model)].vendor
+    if vendor != 'sqlite':
+        raise NotSupportedError(
+            f'База {vendor} не возвращает id из bulk_create, а у '
+            f'{model.__name__} нет уникальных полей для их поиска.')
+    pks = model.objects.order_by('-pk').values_list(
+        'pk', flat=True)[:len(objects)]
+    for obj, pk in zip(objects, reversed(pks)):
+        obj.pk = pk
+
+
+class BulkWriteMixin:
+    """Массовое создание (POST) и изменение (PATCH) объектов на
+    эндпоинте <prefix>/bulk/.
+
+    Принимает JSON-массив или NDJSON. Связанные объекты по slug и
+    уникальность полей из bulk_unique_fields проверяются одним
+    запросом на всю пачку. Параметр ?mode=atomic (по умолчанию)
+    отклоняет пачку целиком при любой ошибке, ?mode=best-effort
+    сохраняет корректные элементы и возвращает ошибки остальных."""
+
+    bulk_unique_fields = ()
+    bulk_batch_size = 1000
+
+    @action(methods=['post', 'patch'], detail=False, url_path='bulk',
+            permission_classes=(IsAdmin,),
+            parser_classes=(FastJSONParser, NDJSONParser))
+    def bulk(self, request):
+        mode = request.query_params.get('mode', 'atomic')
+        if mode not in BULK_MODES:
+            return Response(
+                {'mode': f'Допустимые значения: {", ".join(BULK_MODES)}.'},
+                status=status.HTTP_400_BAD_REQUEST)
+        items = request.data
+        if not isinstance(items, list):
+            return Response(
+                {'detail': 'Ожидается массив объектов.'},
+                status=status.HTTP_400_BAD_REQUEST)
+        partial = request.method == 'PATCH'
+        instances = self.get_bulk_instances(items) if partial else {}
+        validated, errors = self.validate_bulk(items, instances, partial)
+        if errors and (mode == 'atomic' or not validated):
+            return Response({'errors': errors},
+                            status=status.HTTP_400_BAD_REQUEST)
+        with transaction.atomic():
+            if partial:
+                saved = self.perform_bulk_update(validated, instances)
+            else:
+                saved = self.perform_bulk_create(validated)
+            model = self.get_queryset().model
+            transaction.on_commit(
+                lambda: catalogue_changed.send(sender=model))
+        lookup = self.get_bulk_lookup()
+        return Response(
+            {'count': len(saved),
+             'results': [getattr(obj, lookup) for obj in saved],
+             'errors': errors},
+            status=status.HTTP_200_OK if partial else status.HTTP_201_CREATED)
+
+    def get_bulk_lookup(self):
+        return 'pk' if self.lookup_field == 'pk' else self.lookup_field
+
+    def get_bulk_item_key(self, item):
+        lookup = self.get_bulk_lookup()
+        return item.get('id' if lookup == 'pk' else lookup)
+
+    def get_bulk_instances(self, items):
+        """Объекты для изменения одним запросом по id или slug."""
+        keys = [self.get_bulk_item_key(item) for item in items
+                if isinstance(item, dict)]
+        keys = [smart_str(key) for key in keys if key is not None]
+        lookup = self.get_bulk_lookup()
+        return {
+            smart_str(getattr(obj, lookup)): obj
+            for obj in self.get_queryset().model.objects.filter(
+                **{f'{lookup}__in': keys})
+        }
+
+    def validate_bulk(self, items, instances, partial):
+        serializer = self.get_serializer(partial=partial)
+        serializer.context['slug_cache'] = load_slug_cache(serializer, items)
+        for name in self.bulk_unique_fields:
+            field = serializer.fields[name]
+            field.validators = [
+                validator for validator in field.validators
+                if not isinstance(validator, UniqueValidator)]
+        validated, errors = [], []
+        for index, item in enumerate(items):
+            try:
+                if not isinstance(item, dict):
+                    raise serializers.ValidationError(
+                        'Ожидается объект.')
+                instance = None
+                if partial:
+                    instance = instances.get(
+                        smart_str(self.get_bulk_item_key(item)))
+                    if instance is None:
+                        raise serializers.ValidationError(
+                            'Объект не найден.')
+                validated.append(
+                    (index, instance, serializer.run_validation(item)))
+            except serializers.ValidationError as error:
+                errors.append({'index': index, 'errors': error.detail})
+        validated = self.check_bulk_unique(validated, errors)
+        return validated, errors
+
+    def check_bulk_unique(self, validated, errors):
+        """Проверяем уникальность полей по базе и внутри пачки."""
+        model = self.get_queryset().model
+        for name in self.bulk_unique_fields:
+            values = [data[name] for _, _, data in validated if name in data]
+            taken = dict(model.objects.filter(
+                **{f'{name}__in': values}).values_list(name, 'pk'))
+            seen = set()
+            unique = []
+            for index, instance, data in validated:
+                if name not in data:
+                    unique.append((index, instance, data))
+                    continue
+                value = data[name]
+                owner = taken.get(value)
+                if value in seen or (owner is not None and (
+                        instance is None or owner != instance.pk)):
+                    errors.append({'index': index, 'errors': {
+                        name: [f'Значение {value} уже используется.']}})
+                    continue
+                seen.add(value)
+                unique.append((index, instance, data))
+            validated = unique
+        errors.sort(key=lambda error: error['index'])
+        return validated
+
+    def perform_bulk_create(self, validated):
+        model = self.get_queryset().model
+        many_to_many = list(model._meta.many_to_many)
+        names = {field.name for field in many_to_many}
+        objects = [
+            model(**{key: value for key, value in data.items()
+                     if key not in names})
+            for _, _, data in validated]
+        model.objects.bulk_create(objects, batch_size=self.bulk_batch_size)
+        set_pks(model, objects, self.bulk_unique_fields)
+        self.set_bulk_many_to_many(
+            many_to_many, objects, [data for _, _, data in validated])
+        self.after_bulk_save(objects)
+        return objects
+
+    def perform_bulk_update(self, validated, instances):
+        model = self.get_queryset().model
+        many_to_many = list(model._meta.many_to_many)
+        names = {field.name for field in many_to_many}
+        objects, fields = [], set()
+        for _, instance, data in validated:
+            for key, value in data.items():
+                if key not in names:
+                    setattr(instance, key, value)
+                    fields.add(key)
+            objects.append(instance)
+        if fields:
+            model.objects.bulk_update(objects, fields,
+                                      batch_size=self.bulk_batch_size)
+        self.set_bulk_many_to_many(
+            many_to_many, objects, [data for _, _, data in validated])
+        self.after_bulk_save(objects)
+        return objects
+
+    def set_bulk_many_to_many(self, many_to_many, objects, data):
+        """Записываем строки промежуточных таблиц одним bulk_create."""
+        for field in many_to_many:
+            through = field.remote_field.through
+            source = field.m2m_field_name()
+            target = field.m2m_reverse_field_name()
+            changed = [(obj, values[field.name])
+                       for obj, values in zip(objects, data)
+                       if field.name in values]
+            if not changed:
+                continue
+            through.objects.filter(
+                **{f'{source}__in': [obj.pk for obj, _ in changed]}).delete()
+            through.objects.bulk_create(
+                (through(**{f'{source}_id': obj.pk,
+                            f'{target}_id': related.pk})
+                 for obj, related_objects in changed
+                 for related in related_objects),
+                batch_size=self.bulk_batch_size)
+
+    def after_bulk_save(self, objects):
+        """Точка расширения: bulk_create и bulk_update не вызывают save()."""
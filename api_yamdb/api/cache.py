@@ -0,0 +1,272 @@
+import time
+from functools import partial
+from hashlib import md5
+from threading import Lock
+
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+
+from api.asynchronous import run_blocking
+from api.replicas import reads_replica
+from reviews.models import (Category, Comment, Genre, GenreTitle, Review,
+                            Title, User)
+from reviews.signals import catalogue_changed
+
+CACHE_ALIAS = 'catalogue'
+CATALOGUE = 'catalogue'
+USERS = 'users'
+
+_stats = {'hits': 0, 'misses': 0}
+_stats_lock = Lock()
+
+
+def get_cache():
+    return caches[CACHE_ALIAS]
+
+
+def version_key(scope):
+    return f'version:{scope}'
+
+
+def get_versions(scopes):
+    """Версии областей данных одним обращением к кешу.
+
+    Версия - время последнего изменения в наносекундах, поэтому она же
+    служит источником Last-Modified. Отсутствующая версия заводится
+    заново, что лишь делает недействительными старые ключи и ETag."""
+    cache = get_cache()
+    keys = [version_key(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        for key in missing:
+            cache.add(key, time.time_ns(), None)
+        versions.update(cache.get_many(missing))
+    return [versions[key] for key in keys]
+
+
+def get_version():
+    """Текущая версия каталога, входящая в ключи всех ответов."""
+    return get_versions([CATALOGUE])[0]
+
+
+def bump(scope):
+    """Меняем версию области данных."""
+    get_cache().set(version_key(scope), time.time_ns(), None)
+
+
+def invalidate():
+    """Сменой версии делаем недоступными все закешированные ответы."""
+    bump(CATALOGUE)
+
+
+def count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def get_stats():
+    """Счётчики попаданий и промахов кеша в текущем процессе."""
+    with _stats_lock:
+        return dict(_stats, version=get_version())
+
+
+def query_string(request):
+    params = sorted(
+        (key, value) for key, values in request.query_params.lists()
+        for value in values)
+    return f'{request.path}?{params}'
+
+
+def make_key(request):
+    """Ключ ответа: версия каталога, путь и отсортированные параметры."""
+    digest = md5(query_string(request).encode()).hexdigest()
+    return f'catalogue:{get_version()}:{digest}'
+
+
+class CachedListMixin:
+    """Кешируем данные ответов list каталога.
+
+    Кеш хранит уже сериализованные данные, поэтому при попадании
+    не выполняются ни запросы к базе, ни сериализация. Ответы,
+    прочитанные из реплики, не сохраняются: реплика может отставать
+    от версии каталога в ключе."""
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    async def alist(self, request, *args, **kwargs):
+        return await self.acached_response(
+            super().alist, request, *args, **kwargs)
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        key, response = self.get_cached_response(request)
+        if response is not None:
+            return response
+        return self.set_cached_response(
+            key, handler(request, *args, **kwargs))
+
+    async def acached_response(self, handler, request, *args, **kwargs):
+        key, response = await run_blocking(
+            self.get_cached_response, request)
+        if response is not None:
+            return response
+        response = await handler(request, *args, **kwargs)
+        return await run_blocking(self.set_cached_response, key, response)
+
+    @staticmethod
+    def get_cached_response(request):
+        """Ключ ответа и ответ из кеша (None при промахе)."""
+        key = make_key(request)
+        data = get_cache().get(key)
+        if data is None:
+            count('misses')
+            return key, None
+        count('hits')
+        return key, Response(data, headers={'X-Cache': 'HIT'})
+
+    @staticmethod
+    def set_cached_response(key, response):
+        if response.status_code == 200 and not reads_replica():
+            get_cache().set(key, response.data)
+        response['X-Cache'] = 'MISS'
+        return response
+
+
+class CachedResponseMixin(CachedListMixin):
+    """Кешируем данные ответов list и retrieve каталога."""
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        return await self.acached_response(
+            super().aretrieve, request, *args, **kwargs)
+
+
+class ConditionalListMixin:
+    """ETag и Last-Modified для list без сериализации ответа.
+
+    Оба заголовка вычисляются из версий областей данных, от которых
+    зависит ответ (get_etag_scopes). Запросы с совпавшим If-None-Match
+    или If-Modified-Since получают 304 до обращения к сериализатору.
+    Ответ из реплики валидаторов не получает: версии уже могут учитывать
+    запись, которой в реплике ещё нет, и клиент закрепил бы устаревшее
+    тело под свежим ETag. Отвечать 304 на такой запрос можно - совпавший
+    ETag клиент получил вместе с телом из основной базы."""
+
+    etag_scopes = (CATALOGUE,)
+
+    def get_etag_scopes(self):
+        return list(self.etag_scopes)
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs)
+
+    async def alist(self, request, *args, **kwargs):
+        return await self.aconditional_response(
+            super().alist, request, *args, **kwargs)
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        headers, response = self.get_conditional_headers(request)
+        if response is not None:
+            return response
+        return self.set_conditional_headers(
+            handler(request, *args, **kwargs), headers)
+
+    async def aconditional_response(self, handler, request, *args,
+                                    **kwargs):
+        headers, response = await run_blocking(
+            self.get_conditional_headers, request)
+        if response is not None:
+            return response
+        return self.set_conditional_headers(
+            await handler(request, *args, **kwargs), headers)
+
+    def get_conditional_headers(self, request):
+        """Заголовки ETag и Last-Modified и готовый ответ 304, если
+        клиент прислал совпадающие валидаторы."""
+        versions = get_versions(self.get_etag_scopes())
+        etag = '"{}"'.format(md5(
+            f'{versions}:{query_string(request)}:'
+            f'{request.accepted_media_type}'.encode()).hexdigest())
+        last_modified = max(versions) // 10 ** 9
+        headers = {'ETag': etag, 'Last-Modified': http_date(last_modified)}
+        if self.is_not_modified(request, etag, last_modified):
+            return headers, Response(status=status.HTTP_304_NOT_MODIFIED,
+                                     headers=headers)
+        return headers, None
+
+    @staticmethod
+    def set_conditional_headers(response, headers):
+        if response.status_code == status.HTTP_200_OK and not reads_replica():
+            for header, value in headers.items():
+                response[header] = value
+        return response
+
+    @staticmethod
+    def is_not_modified(request, etag, last_modified):
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match is not None:
+            tags = [tag.strip() for tag in if_none_match.split(',')]
+            return etag in tags or '*' in tags
+        if_modified_since = parse_http_date_safe(
+            request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+        return (if_modified_since is not None
+                and last_modified <= if_modified_since)
+
+
+class ConditionalGetMixin(ConditionalListMixin):
+    """ETag и Last-Modified для list и retrieve."""
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        return await self.aconditional_response(
+            super().aretrieve, request, *args, **kwargs)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+@receiver(post_save, sender=Title)
+@receiver(post_delete, sender=Title)
+@receiver(post_save, sender=GenreTitle)
+@receiver(post_delete, sender=GenreTitle)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+@receiver(m2m_changed, sender=Title.genre.through)
+@receiver(catalogue_changed)
+def invalidate_on_change(sender, **kwargs):
+    """Сбрасываем кеш после фиксации транзакции, чтобы параллельный
+    запрос не закешировал данные до коммита."""
+    transaction.on_commit(invalidate)
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def bump_reviews(sender, instance, **kwargs):
+    transaction.on_commit(partial(bump, f'reviews:{instance.title_id}'))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def bump_comments(sender, instance, **kwargs):
+    transaction.on_commit(partial(bump, f'comments:{instance.review_id}'))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def bump_users(sender, **kwargs):
+    """Имя автора выводится в отзывах и комментариях."""
+    transaction.on_commit(partial(bump, USERS))
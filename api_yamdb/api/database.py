@@ -0,0 +1,91 @@
+import re
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+PRAGMA_VALUE = re.compile(r'^[\w-]+$')
+
+
+@receiver(connection_created)
+def set_sqlite_pragmas(sender, connection, **kwargs):
+    """Настраиваем каждое новое соединение SQLite по SQLITE_PRAGMAS.
+
+    Выполняем напрямую через DB-API, чтобы PRAGMA не попадали
+    в execute_wrapper и счётчики запросов."""
+    if connection.vendor != 'sqlite':
+        return
+    for pragma, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+        if not PRAGMA_VALUE.match(f'{pragma}{value}'):
+            raise ValueError(f'Недопустимая PRAGMA {pragma} = {value}')
+        connection.connection.execute(f'PRAGMA {pragma} = {value}')
+
+
+class HealthCheckMixin:
+    """Проверка постоянного соединения перед первым использованием
+    в запросе, как CONN_HEALTH_CHECKS в Django 4.1.
+
+    В начале и в конце запроса Django вызывает
+    close_if_unusable_or_obsolete, и соединение помечается
+    непроверенным. Первый курсор или транзакция запроса проверяют его
+    одним is_usable(); разорванное сервером соединение закрывается
+    и открывается заново, а не даёт 500. Соединения, которые запрос
+    не трогает, не проверяются, новое соединение тоже."""
+
+    health_check_done = False
+
+    @property
+    def health_check_enabled(self):
+        return bool(self.settings_dict.get('CONN_HEALTH_CHECKS')
+                    and self.settings_dict['CONN_MAX_AGE'] != 0)
+
+    def connect(self):
+        self.health_check_done = True
+        super().connect()
+
+    def close_if_unusable_or_obsolete(self):
+        if self.connection is not None:
+            self.health_check_done = False
+        super().close_if_unusable_or_obsolete()
+
+    def close_if_health_check_failed(self):
+        if (self.connection is None or self.in_atomic_block
+                or not self.health_check_enabled
+                or self.health_check_done):
+            return
+        if not self.is_usable():
+            self.close()
+        self.health_check_done = True
+
+    def set_autocommit(self, *args, **kwargs):
+        self.close_if_health_check_failed()
+        return super().set_autocommit(*args, **kwargs)
+
+    def _cursor(self, *args, **kwargs):
+        self.close_if_health_check_failed()
+        return super()._cursor(*args, **kwargs)
+
+
+def check_databases():
+    """Доступность и время ответа каждой базы из DATABASES."""
+    result = {}
+    for alias in connections:
+        connection = connections[alias]
+        started = time.perf_counter()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+                cursor.fetchone()
+        except DatabaseError as error:
+            result[alias] = {'ok': False, 'vendor': connection.vendor,
+                             'error': str(error)}
+            continue
+        result[alias] = {
+            'ok': True,
+            'vendor': connection.vendor,
+            'latency_ms': round((time.perf_counter() - started) * 1000, 3),
+            'persistent': connection.settings_dict['CONN_MAX_AGE'] != 0,
+        }
+    return result
@@ -0,0 +1,85 @@
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+
+
+def parse_names(value):
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+class SparseFieldsetMixin:
+    """Выбор полей ответа параметрами GET-запроса.
+
+    ?fields=id,name оставляет в ответе только перечисленные поля,
+    ?expand=stats добавляет или разворачивает во вложенный объект поля
+    из expandable_fields: имя поля - (класс сериализатора, аргументы).
+    Параметры действуют только на корневой сериализатор безопасных
+    запросов. Неизвестные имена дают 400.
+
+    get_query_fields сообщает RelatedQuerySetMixin, какие связи
+    и колонки нужны выбранным полям."""
+
+    expandable_fields = {}
+
+    @property
+    def sparse_request(self):
+        request = self.context.get('request')
+        if (request is None or request.method not in SAFE_METHODS
+                or self.root not in (self, self.parent)):
+            return None
+        return request
+
+    def get_requested(self, param):
+        request = self.sparse_request
+        if request is None or param not in request.query_params:
+            return None
+        return parse_names(request.query_params[param])
+
+    def get_fields(self):
+        fields = super().get_fields()
+        expand = self.get_requested(EXPAND_PARAM) or ()
+        self.check_names(EXPAND_PARAM, expand, self.expandable_fields)
+        for name in expand:
+            serializer_class, kwargs = self.expandable_fields[name]
+            fields[name] = serializer_class(**kwargs)
+        requested = self.get_requested(FIELDS_PARAM)
+        if requested is None:
+            return fields
+        self.check_names(FIELDS_PARAM, requested, fields)
+        return OrderedDict((name, field) for name, field in fields.items()
+                           if name in requested)
+
+    def check_names(self, param, names, allowed):
+        unknown = [name for name in names if name not in allowed]
+        if unknown:
+            raise serializers.ValidationError({param: [
+                f'Неизвестные поля: {", ".join(unknown)}. '
+                f'Доступны: {", ".join(allowed)}.']})
+
+    def get_query_fields(self, select_related, prefetch_related):
+        """Связи для select_related и prefetch_related, нужные выбранным
+        полям, и колонки модели для only(). Колонки None, если в ответе
+        все поля или поле читает неизвестный атрибут модели."""
+        fields = self.fields
+        roots = {field.source.split('.')[0] for field in fields.values()}
+        select_related = [path for path in select_related
+                          if path.split('__')[0] in roots]
+        prefetch_related = [path for path in prefetch_related
+                            if path.split('__')[0] in roots]
+        if self.get_requested(FIELDS_PARAM) is None:
+            return select_related, prefetch_related, None
+        opts = self.Meta.model._meta
+        columns = {opts.pk.name}
+        for root in roots:
+            try:
+                field = opts.get_field(root)
+            except FieldDoesNotExist:
+                return select_related, prefetch_related, None
+            if field.concrete and not field.many_to_many:
+                columns.add(root)
+        return select_related, prefetch_related, columns
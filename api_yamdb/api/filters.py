@@ -1,23 +1,57 @@
 import django_filters
+from django.db.models import Count
 
-from reviews.models import Title
+from reviews.models import Category, Genre, GenreTitle, Title, TitleTrigram
+from reviews.search import normalize, trigrams
 
 
 class TitleFilter(django_filters.FilterSet):
     """Создаем фильтр для модели Title
     с указанием необходимых параметров при фильтрации."""
-    category = django_filters.CharFilter(
-        field_name='category__slug',
-        lookup_expr='icontains')
-    genre = django_filters.CharFilter(
-        field_name='genre__slug',
-        lookup_expr='icontains')
-    name = django_filters.CharFilter(
-        field_name='name',
-        lookup_expr='icontains')
+    category = django_filters.CharFilter(method='filter_category')
+    genre = django_filters.CharFilter(method='filter_genre')
+    name = django_filters.CharFilter(method='filter_name')
     year = django_filters.NumberFilter(
         field_name='year')
 
     class Meta:
         model = Title
         fields = ('category', 'genre', 'name', 'year',)
+
+    def filter_category(self, queryset, name, value):
+        """Точный slug ищем по уникальному индексу, иначе по подстроке."""
+        category_id = Category.objects.filter(slug=value).values_list(
+            'id', flat=True).first()
+        if category_id is not None:
+            return queryset.filter(category_id=category_id)
+        return queryset.filter(category__slug__icontains=value)
+
+    def filter_genre(self, queryset, name, value):
+        """Фильтруем через подзапрос к GenreTitle, чтобы произведения
+        с несколькими подходящими жанрами не дублировались."""
+        genre_id = Genre.objects.filter(slug=value).values_list(
+            'id', flat=True).first()
+        if genre_id is not None:
+            genre_titles = GenreTitle.objects.filter(genre_id=genre_id)
+        else:
+            genre_titles = GenreTitle.objects.filter(
+                genre__slug__icontains=value)
+        return queryset.filter(id__in=genre_titles.values('title_id'))
+
+    def filter_name(self, queryset, name, value):
+        """Ищем по подстроке без учёта регистра через индекс триграмм.
+
+        Произведение-кандидат должно содержать все триграммы запроса,
+        окончательная проверка идёт по нормализованному названию."""
+        value = normalize(value)
+        queryset = queryset.filter(search_name__contains=value)
+        query_trigrams = trigrams(value)
+        if not query_trigrams:
+            return queryset
+        candidates = (
+            TitleTrigram.objects.filter(trigram__in=query_trigrams)
+            .values('title')
+            .annotate(matches=Count('id'))
+            .filter(matches=len(query_trigrams))
+            .values('title'))
+        return queryset.filter(id__in=candidates)
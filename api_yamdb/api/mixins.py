@@ -1,11 +1,82 @@
+from django.shortcuts import get_object_or_404
 from rest_framework import filters, mixins, viewsets
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
 
+from api.asynchronous import AsyncReadMixin
+from api.fieldsets import SparseFieldsetMixin
 from api.pagination import UserPagination
 from api.permissions import IsAdmin
+from api.profiling import ProfilingMixin
+from api.replicas import ReplicaReadMixin
 
 
-class CreateListDestroyViewSet(mixins.CreateModelMixin,
+class RelatedQuerySetMixin:
+    """Подключаем select_related и prefetch_related, объявленные
+    в сериализаторе атрибутами select_related_fields
+    и prefetch_related_fields.
+
+    Оптимизация применяется в filter_queryset, через который проходят
+    и список, и get_object, поэтому работает и для вьюсетов
+    с собственным get_queryset.
+
+    Для сериализаторов с SparseFieldsetMixin связи подключаются только
+    для полей из ?fields= и ?expand=, а колонки ограничиваются only()
+    вместе с полями сортировки пагинатора."""
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        serializer_class = self.get_serializer_class()
+        select_related = getattr(serializer_class,
+                                 'select_related_fields', ())
+        prefetch_related = getattr(serializer_class,
+                                   'prefetch_related_fields', ())
+        columns = None
+        if issubclass(serializer_class, SparseFieldsetMixin):
+            serializer = serializer_class(
+                context=self.get_serializer_context())
+            select_related, prefetch_related, columns = (
+                serializer.get_query_fields(select_related,
+                                            prefetch_related))
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+        if columns is not None:
+            queryset = queryset.only(*columns, *self.get_ordering_columns())
+        return queryset
+
+    def get_ordering_columns(self):
+        """Поля сортировки пагинатора: курсор читает их у объектов
+        страницы."""
+        ordering = getattr(self.paginator, 'ordering', None) or ()
+        if isinstance(ordering, str):
+            ordering = (ordering,)
+        return [field.lstrip('-') for field in ordering]
+
+
+class NestedParentMixin:
+    """Родительский объект вложенного ресурса (произведение для отзывов,
+    отзыв для комментариев) загружаем один раз за запрос и храним
+    на вьюсете.
+
+    parent_lookups сопоставляет поля parent_model с именованными
+    параметрами URL."""
+
+    parent_model = None
+    parent_lookups = {}
+
+    def get_parent(self):
+        if not hasattr(self, '_parent'):
+            self._parent = get_object_or_404(self.parent_model, **{
+                field: self.kwargs.get(kwarg)
+                for field, kwarg in self.parent_lookups.items()})
+        return self._parent
+
+
+class CreateListDestroyViewSet(ProfilingMixin,
+                               ReplicaReadMixin,
+                               AsyncReadMixin,
+                               mixins.CreateModelMixin,
                                mixins.ListModelMixin,
                                mixins.DestroyModelMixin,
                                viewsets.GenericViewSet):
@@ -1,7 +1,182 @@
-from rest_framework.pagination import PageNumberPagination
+from collections import OrderedDict
+
+from django.core.paginator import InvalidPage
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from api.asynchronous import gather_blocking, run_blocking
+
+FALSE_VALUES = ('0', 'false', 'False', 'no')
 
 
 class UserPagination(PageNumberPagination):
-    """Кастомный класс пагинации для users/."""
+    """Постраничная пагинация users/ и основа SwitchablePagination
+    для titles/, отзывов и комментариев.
+
+    С параметром ?count=false пропускает COUNT(*): выбирает на одну
+    запись больше размера страницы, чтобы понять, есть ли следующая,
+    и не возвращает ключ count."""
+
+    page_size = 10
+    count_query_param = 'count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.skip_count = (request.query_params.get(self.count_query_param)
+                           in FALSE_VALUES)
+        if not self.skip_count:
+            return super().paginate_queryset(queryset, request, view)
+
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        try:
+            self.page_number = int(
+                request.query_params.get(self.page_query_param, 1))
+        except ValueError:
+            raise NotFound(self.invalid_page_message)
+        if self.page_number < 1:
+            raise NotFound(self.invalid_page_message)
+
+        offset = (self.page_number - 1) * page_size
+        objects = list(queryset[offset:offset + page_size + 1])
+        self.has_next = len(objects) > page_size
+        if not objects and self.page_number > 1:
+            raise NotFound(self.invalid_page_message)
+        self.request = request
+        return objects[:page_size]
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """Асинхронный вариант: COUNT(*) и выборка страницы вместе
+        с prefetch_related выполняются параллельно.
+
+        Номер страницы проверяется по числу записей уже после выборки.
+        Нестандартные номера страниц и режим без COUNT(*) обрабатывает
+        синхронный paginate_queryset."""
+        page_size = self.get_page_size(request)
+        page_number = request.query_params.get(self.page_query_param, '1')
+        number = int(page_number) if page_number.isdigit() else 0
+        if (not page_size or number < 1
+                or request.query_params.get(self.count_query_param)
+                in FALSE_VALUES):
+            return await run_blocking(
+                self.paginate_queryset, queryset, request, view)
+        self.skip_count = False
+        paginator = self.django_paginator_class(queryset, page_size)
+        offset = (number - 1) * page_size
+        paginator.count, objects = await gather_blocking(
+            (queryset.count,),
+            (list, queryset[offset:offset + page_size]))
+        try:
+            self.page = paginator.page(number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=page_number, message=str(exc)))
+        self.page.object_list = objects
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        self.request = request
+        return objects
+
+    def get_paginated_response(self, data):
+        if not self.skip_count:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
+
+    def get_next_link(self):
+        if not self.skip_count:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.page_query_param,
+                                   self.page_number + 1)
+
+    def get_previous_link(self):
+        if not self.skip_count:
+            return super().get_previous_link()
+        if self.page_number == 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.page_number == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param,
+                                   self.page_number - 1)
+
+
+class KeysetPagination(CursorPagination):
+    """Курсорная пагинация по стабильной индексированной сортировке."""
 
     page_size = 10
+    ordering = 'id'
+
+
+class SwitchablePagination(UserPagination):
+    """Постраничная пагинация с курсорным режимом по запросу.
+
+    Курсорный режим включается параметром ?pagination=cursor
+    (или наличием ?cursor=), не выполняет COUNT(*) и не использует
+    OFFSET. Клиенты с ?page= продолжают работать как раньше."""
+
+    mode_query_param = 'pagination'
+    cursor_query_param = 'cursor'
+    ordering = 'id'
+
+    def is_cursor_mode(self, request):
+        return (request.query_params.get(self.mode_query_param) == 'cursor'
+                or self.cursor_query_param in request.query_params)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        if not self.is_cursor_mode(request):
+            return super().paginate_queryset(queryset, request, view)
+        self.cursor_paginator = KeysetPagination()
+        self.cursor_paginator.page_size = self.page_size
+        self.cursor_paginator.ordering = self.ordering
+        self.cursor_paginator.cursor_query_param = self.cursor_query_param
+        return self.cursor_paginator.paginate_queryset(
+            queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """В курсорном режиме одна выборка без COUNT(*), распараллеливать
+        нечего."""
+        self.cursor_paginator = None
+        if self.is_cursor_mode(request):
+            return await run_blocking(
+                self.paginate_queryset, queryset, request, view)
+        return await super().apaginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class TitlePagination(SwitchablePagination):
+    """Пагинация для titles/, курсор по id."""
+
+    ordering = 'id'
+
+
+class PubDatePagination(SwitchablePagination):
+    """Пагинация для отзывов и комментариев, курсор по (pub_date, id)."""
+
+    ordering = ('pub_date', 'id')
+
+
+class TopPagination(KeysetPagination):
+    """Курсорная пагинация для titles/top/ по индексу рейтинга."""
+
+    ordering = ('-weighted_rating', 'id')
+
+
+class TrendingPagination(KeysetPagination):
+    """Курсорная пагинация для titles/trending/ по индексу
+    числа свежих отзывов."""
+
+    ordering = ('-review_velocity', 'id')
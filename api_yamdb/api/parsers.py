@@ -0,0 +1,63 @@
+import codecs
+import json
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+from rest_framework.utils.json import strict_constant
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def loads(data, encoding, strict=False):
+    """Разбор JSON из байтов. UTF-8 разбирает orjson; если он отказался
+    (ошибка, NaN, целые больше 64 бит), повторяем разбор json, поэтому
+    результат и текст ошибки совпадают с json."""
+    if orjson is not None and codecs.lookup(encoding).name == 'utf-8':
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+    parse_constant = strict_constant if strict else None
+    return json.loads(data.decode(encoding), parse_constant=parse_constant)
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser на orjson с разбором json в качестве запасного."""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        try:
+            return loads(stream.read(), encoding, strict=self.strict)
+        except ValueError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
+
+class NDJSONParser(BaseParser):
+    """Разбор NDJSON: по одному JSON-объекту в строке, пустые строки
+    пропускаются. Результат - список объектов; строка, которая не
+    разбирается или содержит не объект, даёт 400 с её номером."""
+
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        items = []
+        for number, line in enumerate(stream, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = loads(line, encoding)
+            except ValueError as error:
+                raise ParseError(f'NDJSON, строка {number}: {error}')
+            if not isinstance(item, dict):
+                raise ParseError(
+                    f'NDJSON, строка {number}: ожидается объект.')
+            items.append(item)
+        return items
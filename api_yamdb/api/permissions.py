@@ -3,10 +3,11 @@ from rest_framework import permissions
 
 class IsModerOrAdminOrAuthor(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
+        """Автора сравниваем по author_id, не загружая пользователя."""
         return (request.method in permissions.SAFE_METHODS
                 or request.user.role == 'admin'
                 or request.user.role == 'moderator'
-                or obj.author == request.user)
+                or obj.author_id == request.user.id)
 
     def has_permission(self, request, view):
         return (request.method in permissions.SAFE_METHODS
@@ -27,7 +28,7 @@ class IsUser(permissions.BasePermission):
         if request.method in permissions.SAFE_METHODS:
             return True
         return (request.user.is_authenticated
-                and obj.author == request.user
+                and obj.author_id == request.user.id
                 and (request.user.role == 'user'
                      or request.user.role == 'admin'
                      or request.user.role == 'moderator'))
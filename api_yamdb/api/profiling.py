@@ -0,0 +1,318 @@
+import asyncio
+import logging
+import random
+import time
+from bisect import bisect_left
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from threading import Lock
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+SECONDS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+                   2.5, 5.0, 10.0)
+QUERIES_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+METRICS = {
+    'latency': ('yamdb_request_latency_seconds', SECONDS_BUCKETS,
+                'Полное время обработки запроса.'),
+    'queries': ('yamdb_request_queries', QUERIES_BUCKETS,
+                'Количество SQL-запросов за запрос.'),
+    'sql': ('yamdb_request_sql_seconds', SECONDS_BUCKETS,
+            'Суммарное время SQL-запросов.'),
+    'serializer': ('yamdb_request_serializer_seconds', SECONDS_BUCKETS,
+                   'Время сериализации ответа.'),
+    'render': ('yamdb_request_render_seconds', SECONDS_BUCKETS,
+               'Время рендеринга ответа.'),
+    'permission': ('yamdb_request_permission_seconds', SECONDS_BUCKETS,
+                   'Время проверки прав доступа.'),
+}
+BUDGET_METRIC = 'yamdb_query_budget_exceeded_total'
+ALIAS_METRIC = 'yamdb_db_queries_total'
+UNRESOLVED = '<unresolved>'
+
+# Замеры текущего запроса. Контекст копируется в потоки sync_to_async,
+# поэтому запросы к базе из пула потоков тоже попадают в замеры.
+current_profile = ContextVar('current_profile', default=None)
+
+
+class Histogram:
+    """Гистограмма с накопительными корзинами в формате Prometheus."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip((*self.buckets, '+Inf'), self.counts):
+            total += count
+            yield bound, total
+
+
+class Registry:
+    """Гистограммы и счётчики в памяти процесса по имени URL."""
+
+    def __init__(self):
+        self.lock = Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.histograms = {}
+            self.over_budget = {}
+            self.alias_queries = {}
+
+    def record(self, view_name, values, over_budget, aliases=None):
+        with self.lock:
+            for alias, total in (aliases or {}).items():
+                key = (view_name, alias)
+                self.alias_queries[key] = (
+                    self.alias_queries.get(key, 0) + total)
+            for metric, value in values.items():
+                key = (metric, view_name)
+                if key not in self.histograms:
+                    self.histograms[key] = Histogram(METRICS[metric][1])
+                self.histograms[key].observe(value)
+            if over_budget:
+                self.over_budget[view_name] = (
+                    self.over_budget.get(view_name, 0) + 1)
+
+    def export(self):
+        """Текстовый формат экспозиции Prometheus 0.0.4."""
+        lines = []
+        with self.lock:
+            for metric, (name, _, description) in METRICS.items():
+                views = sorted(view for key, view in self.histograms
+                               if key == metric)
+                if not views:
+                    continue
+                lines.append(f'# HELP {name} {description}')
+                lines.append(f'# TYPE {name} histogram')
+                for view in views:
+                    histogram = self.histograms[(metric, view)]
+                    label = f'view="{escape(view)}"'
+                    for bound, total in histogram.cumulative():
+                        lines.append(
+                            f'{name}_bucket{{{label},le="{bound}"}} {total}')
+                    lines.append(f'{name}_sum{{{label}}} {histogram.sum}')
+                    lines.append(
+                        f'{name}_count{{{label}}} {histogram.count}')
+            if self.over_budget:
+                lines.append(f'# HELP {BUDGET_METRIC} Запросы, превысившие '
+                             'бюджет SQL-запросов.')
+                lines.append(f'# TYPE {BUDGET_METRIC} counter')
+                for view, total in sorted(self.over_budget.items()):
+                    lines.append(
+                        f'{BUDGET_METRIC}{{view="{escape(view)}"}} {total}')
+            if self.alias_queries:
+                lines.append(f'# HELP {ALIAS_METRIC} SQL-запросы по базам '
+                             'данных.')
+                lines.append(f'# TYPE {ALIAS_METRIC} counter')
+                for (view, alias), total in sorted(
+                        self.alias_queries.items()):
+                    lines.append(
+                        f'{ALIAS_METRIC}{{view="{escape(view)}",'
+                        f'alias="{escape(alias)}"}} {total}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+def escape(value):
+    """Экранируем значение метки Prometheus."""
+    return (value.replace('\\', '\\\\').replace('"', '\\"')
+            .replace('\n', '\\n'))
+
+
+class Profile:
+    """Замеры одного запроса.
+
+    Асинхронные вьюхи выполняют запросы к базе в нескольких потоках
+    одновременно, поэтому счётчики меняются под блокировкой."""
+
+    def __init__(self):
+        self.queries = 0
+        self.aliases = {}
+        self.timings = {'sql': 0, 'serializer': 0, 'render': 0,
+                        'permission': 0}
+        self.lock = Lock()
+
+    def add(self, name, started):
+        elapsed = time.perf_counter() - started
+        with self.lock:
+            self.timings[name] += elapsed
+
+    def execute(self, execute, sql, params, many, context):
+        """execute_wrapper: считаем запросы и их время."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            alias = context['connection'].alias
+            with self.lock:
+                self.queries += 1
+                self.aliases[alias] = self.aliases.get(alias, 0) + 1
+            self.add('sql', started)
+
+    @contextmanager
+    def capture(self):
+        """Подключаем execute_wrapper к соединениям текущего потока,
+        если он ещё не подключен."""
+        with ExitStack() as stack:
+            for connection in connections.all():
+                if self.execute not in connection.execute_wrappers:
+                    stack.enter_context(
+                        connection.execute_wrapper(self.execute))
+            yield
+
+
+def profiled(func):
+    """Оборачиваем функцию, которая выполняется в другом потоке, чтобы
+    её запросы к базе попали в замеры текущего запроса."""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        profile = current_profile.get()
+        if profile is None:
+            return func(*args, **kwargs)
+        with profile.capture():
+            return func(*args, **kwargs)
+    return wrapper
+
+
+class ProfilingMiddleware:
+    """Выборочно замеряем запросы к api по имени URL.
+
+    Доля замеряемых запросов задаётся PROFILING_SAMPLE_RATE (0 -
+    выключено), запросы сверх PROFILING_QUERY_BUDGET SQL-запросов
+    попадают в лог с предупреждением. Время прав доступа и
+    сериализации собирает ProfilingMixin во вьюсетах.
+
+    Работает и под WSGI, и под ASGI без переключения в поток. Под ASGI
+    запросы синхронных вьюх замеряются, если приложение -
+    api.asynchronous.ASGIHandler (api_yamdb.asgi)."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        profile = self.start(request)
+        if profile is None:
+            return self.get_response(request)
+        started = time.perf_counter()
+        token = current_profile.set(profile)
+        try:
+            with profile.capture():
+                response = self.get_response(request)
+        finally:
+            current_profile.reset(token)
+        self.record(request, profile, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        profile = self.start(request)
+        if profile is None:
+            return await self.get_response(request)
+        started = time.perf_counter()
+        token = current_profile.set(profile)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_profile.reset(token)
+        self.record(request, profile, time.perf_counter() - started)
+        return response
+
+    @staticmethod
+    def start(request):
+        """Profile для запроса, выбранного для замера, иначе None."""
+        rate = settings.PROFILING_SAMPLE_RATE
+        if rate <= 0 or random.random() >= rate:
+            return None
+        request.profile = Profile()
+        return request.profile
+
+    def process_template_response(self, request, response):
+        """Ответы DRF рендерятся после этого метода: засекаем время
+        до post-render callback."""
+        profile = getattr(request, 'profile', None)
+        if profile is not None:
+            started = time.perf_counter()
+            response.add_post_render_callback(
+                lambda response: profile.add('render', started))
+        return response
+
+    def record(self, request, profile, latency):
+        match = request.resolver_match
+        view_name = match.view_name if match else UNRESOLVED
+        budget = settings.PROFILING_QUERY_BUDGET
+        over_budget = budget is not None and profile.queries > budget
+        if over_budget:
+            logger.warning(
+                '%s %s: %d SQL-запросов при бюджете %d',
+                request.method, view_name, profile.queries, budget)
+        registry.record(view_name, {
+            'latency': latency, 'queries': profile.queries,
+            **profile.timings}, over_budget, profile.aliases)
+
+
+class ProfilingMixin:
+    """Замеряем проверку прав доступа и сериализацию, если запрос
+    выбран ProfilingMiddleware."""
+
+    def get_profile(self):
+        return getattr(self.request, 'profile', None)
+
+    def check_permissions(self, request):
+        profile = self.get_profile()
+        if profile is None:
+            return super().check_permissions(request)
+        started = time.perf_counter()
+        try:
+            return super().check_permissions(request)
+        finally:
+            profile.add('permission', started)
+
+    def check_object_permissions(self, request, obj):
+        profile = self.get_profile()
+        if profile is None:
+            return super().check_object_permissions(request, obj)
+        started = time.perf_counter()
+        try:
+            return super().check_object_permissions(request, obj)
+        finally:
+            profile.add('permission', started)
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        profile = self.get_profile()
+        if profile is not None:
+            to_representation = serializer.to_representation
+
+            def timed(instance):
+                started = time.perf_counter()
+                try:
+                    return to_representation(instance)
+                finally:
+                    profile.add('serializer', started)
+            serializer.to_representation = timed
+        return serializer
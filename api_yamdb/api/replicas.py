@@ -0,0 +1,110 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.permissions import SAFE_METHODS
+
+CACHE_ALIAS = 'replicas'
+PRIMARY = 'default'
+
+# База для чтения в текущем запросе. Объект общий для копий контекста,
+# поэтому выбор реплики из потока пула виден и остальным потокам
+# асинхронной вьюхи.
+read_routing = ContextVar('read_routing', default=None)
+
+
+class ReadRouting:
+    """Куда направлять чтение текущего запроса; None - в основную базу."""
+
+    alias = None
+
+
+def reads_replica():
+    """Читает ли текущий запрос реплику. Данные реплики могут отставать
+    от версий кеша каталога, поэтому такие ответы не получают ETag
+    и не попадают в кеш ответов."""
+    state = read_routing.get()
+    return state is not None and state.alias is not None
+
+
+def pin_key(user_id):
+    return f'replica_pin:{user_id}'
+
+
+def pin(user_id):
+    """После записи пользователь REPLICA_STICKY_SECONDS читает из основной
+    базы и видит свои изменения, даже если реплика отстаёт. Отметки
+    хранятся в кеше replicas, общем для всех воркеров."""
+    caches[CACHE_ALIAS].set(pin_key(user_id), True,
+                            settings.REPLICA_STICKY_SECONDS)
+
+
+def is_pinned(user_id):
+    return caches[CACHE_ALIAS].get(pin_key(user_id), False)
+
+
+@contextmanager
+def routing():
+    token = read_routing.set(ReadRouting())
+    try:
+        yield
+    finally:
+        read_routing.reset(token)
+
+
+class ReplicaRouter:
+    """Чтение в безопасных запросах вьюсетов с ReplicaReadMixin идёт
+    в реплику, выбранную для запроса; всё остальное - в основную базу."""
+
+    def db_for_read(self, model, **hints):
+        state = read_routing.get()
+        if state is None:
+            return None
+        return state.alias
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        """Реплики содержат те же данные, что и основная база."""
+        return True
+
+
+class ReplicaReadMixin:
+    """Чтение GET-запросов из реплик DATABASE_REPLICAS.
+
+    Реплика выбирается после аутентификации, поэтому проверка токена
+    и прав читает основную базу. Запросы пользователя в течение
+    REPLICA_STICKY_SECONDS после его успешной записи читают основную
+    базу (read-your-writes). Ответы из реплики отдаются без ETag
+    и Last-Modified и не кешируются: версия каталога уже может
+    учитывать запись, которой в реплике ещё нет."""
+
+    def dispatch(self, request, *args, **kwargs):
+        with routing():
+            return super().dispatch(request, *args, **kwargs)
+
+    async def adispatch(self, request, *args, **kwargs):
+        with routing():
+            return await super().adispatch(request, *args, **kwargs)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        state = read_routing.get()
+        replicas = settings.DATABASE_REPLICAS
+        if (state is None or not replicas
+                or request.method not in SAFE_METHODS
+                or (request.user.is_authenticated
+                    and is_pinned(request.user.id))):
+            return
+        state.alias = random.choice(replicas)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if (settings.DATABASE_REPLICAS
+                and request.method not in SAFE_METHODS
+                and response.status_code < 400
+                and request.user.is_authenticated):
+            pin(request.user.id)
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -1,12 +1,13 @@
 import datetime as dt
 
-from django.shortcuts import get_object_or_404
 from rest_framework import serializers
-from rest_framework.relations import SlugRelatedField
 from rest_framework.validators import UniqueTogetherValidator
 
+from api.bulk import CachedSlugRelatedField
+from api.fieldsets import SparseFieldsetMixin
+
 from reviews.models import (USER_ROLES, Category, Comment, Genre, Review,
-                            Title, User)
+                            Title, TitleStats, User)
 
 
 class GenreSerializer(serializers.ModelSerializer):
@@ -27,27 +28,57 @@ class CategorySerializer(serializers.ModelSerializer):
         lookup_field = 'slug'
 
 
-class TitleGETSerializer(serializers.ModelSerializer):
-    """Сериализатор для модели Title при GET запросах."""
+class TitleStatsSerializer(serializers.ModelSerializer):
+    """Сериализатор статистики оценок произведения."""
+
+    count = serializers.IntegerField(read_only=True)
+    mean = serializers.FloatField(read_only=True)
+    median = serializers.FloatField(read_only=True)
+    histogram = serializers.DictField(
+        child=serializers.IntegerField(), read_only=True)
+
+    class Meta:
+        model = TitleStats
+        fields = ('count', 'mean', 'median', 'histogram', 'last_review_at')
+
+
+class TitleGETSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """Сериализатор для модели Title при GET запросах.
+
+    ?expand=stats добавляет статистику оценок TitleStats."""
 
     category = CategorySerializer(read_only=True)
     genre = GenreSerializer(many=True, read_only=True)
     rating = serializers.IntegerField(read_only=True)
 
+    select_related_fields = ('category', 'stats')
+    prefetch_related_fields = ('genre',)
+    expandable_fields = {
+        'stats': (TitleStatsSerializer, {'read_only': True}),
+    }
+
     class Meta:
         model = Title
         fields = ('id', 'name', 'year', 'rating',
                   'description', 'genre', 'category')
 
 
+class TitleRankingSerializer(TitleGETSerializer):
+    """Сериализатор для titles/top/ и titles/trending/."""
+
+    class Meta(TitleGETSerializer.Meta):
+        fields = TitleGETSerializer.Meta.fields + (
+            'weighted_rating', 'review_velocity')
+
+
 class TitleSerializer(serializers.ModelSerializer):
     """Сериализатор для модели Title при небезопасных запросах."""
 
-    genre = SlugRelatedField(
+    genre = CachedSlugRelatedField(
         slug_field='slug',
         many=True,
         queryset=Genre.objects.all())
-    category = SlugRelatedField(
+    category = CachedSlugRelatedField(
         slug_field='slug',
         queryset=Category.objects.all())
 
@@ -57,7 +88,7 @@ class TitleSerializer(serializers.ModelSerializer):
 
     def validate_year(self, data):
         year_now = dt.date.today().year
-        if int(self.initial_data['year']) > year_now:
+        if data > year_now:
             raise serializers.ValidationError(
                 f'Год выпуска произведения не может быть больше {year_now}')
         return data
@@ -165,7 +196,23 @@ class ConfirmCodeCheck(serializers.ModelSerializer):
         fields = ('username', 'confirmation_code')
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class TitleShortSerializer(serializers.ModelSerializer):
+    """Произведение в отзыве при ?expand=title."""
+
+    class Meta:
+        model = Title
+        fields = ('id', 'name', 'year')
+
+
+class AuthorSerializer(serializers.ModelSerializer):
+    """Автор отзыва при ?expand=author."""
+
+    class Meta:
+        model = User
+        fields = ('username', 'first_name', 'last_name')
+
+
+class ReviewSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     title = serializers.SlugRelatedField(
         slug_field='name',
         read_only=True,
@@ -176,17 +223,11 @@ class ReviewSerializer(serializers.ModelSerializer):
         read_only=True
     )
 
-    def validate(self, data):
-        request = self.context['request']
-        if request.method == 'POST':
-            title_id = self.context['view'].kwargs["title_id"]
-            author = self.context['request'].user
-            title = get_object_or_404(Title, pk=title_id)
-            if Review.objects.filter(title=title, author=author).exists():
-                raise serializers.ValidationError(
-                    'Нельзя создавать несколько отзывов на произведение'
-                )
-        return data
+    select_related_fields = ('title', 'author')
+    expandable_fields = {
+        'title': (TitleShortSerializer, {'read_only': True}),
+        'author': (AuthorSerializer, {'read_only': True}),
+    }
 
     class Meta:
         model = Review
@@ -203,6 +244,8 @@ class CommentSerializer(serializers.ModelSerializer):
         read_only=True
     )
 
+    select_related_fields = ('review', 'author')
+
     class Meta:
         model = Comment
         fields = '__all__'
@@ -1,26 +1,39 @@
+from django.conf import settings
 from django.urls import include, path
-from rest_framework.routers import DefaultRouter
 
-from api.views import (CategoryViewSet, CommentViewSet, ConfirmCodeCheckView,
-                       GenreViewSet, ReviewViewSet, SignUpView, TitleViewSet,
-                       UserViewSet)
+from api.asynchronous import AsyncReadRouter
+from api.views import (CacheStatsView, CategoryViewSet, CommentViewSet,
+                       ConfirmCodeCheckView, ExportView, GenreViewSet,
+                       HealthView, MetricsView, ReviewViewSet, SignUpView,
+                       TitleViewSet, UserViewSet)
 
 app_name = 'api'
 
-router = DefaultRouter()
-router.register('titles', TitleViewSet)
-router.register('categories', CategoryViewSet)
-router.register('genres', GenreViewSet)
-router.register(r'users', UserViewSet)
-router.register(r'titles/(?P<title_id>\d+)/reviews', ReviewViewSet,
-                basename='review')
-router.register(
-    r'titles/(?P<title_id>\d+)/reviews/(?P<review_id>\d+)/comments',
-    CommentViewSet,
-    basename='comment')
 
-urlpatterns = [
-    path('v1/', include(router.urls)),
-    path('v1/auth/signup/', SignUpView.as_view(), name='signup'),
-    path('v1/auth/token/', ConfirmCodeCheckView.as_view(), name='token')
-]
+def get_urlpatterns(async_reads=False):
+    """Маршруты api; с async_reads=True чтение каталога, отзывов
+    и комментариев обрабатывают асинхронные вьюхи."""
+    router = AsyncReadRouter(async_reads=async_reads)
+    router.register('titles', TitleViewSet)
+    router.register('categories', CategoryViewSet)
+    router.register('genres', GenreViewSet)
+    router.register(r'users', UserViewSet)
+    router.register(r'titles/(?P<title_id>\d+)/reviews', ReviewViewSet,
+                    basename='review')
+    router.register(
+        r'titles/(?P<title_id>\d+)/reviews/(?P<review_id>\d+)/comments',
+        CommentViewSet,
+        basename='comment')
+    return [
+        path('v1/', include(router.urls)),
+        path('v1/auth/signup/', SignUpView.as_view(), name='signup'),
+        path('v1/auth/token/', ConfirmCodeCheckView.as_view(), name='token'),
+        path('v1/cache/stats/', CacheStatsView.as_view(),
+             name='cache-stats'),
+        path('v1/export/<slug:table>/', ExportView.as_view(), name='export'),
+        path('v1/metrics/', MetricsView.as_view(), name='metrics'),
+        path('v1/health/', HealthView.as_view(), name='health'),
+    ]
+
+
+urlpatterns = get_urlpatterns(settings.ASYNC_READ_VIEWS)
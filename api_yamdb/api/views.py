@@ -1,34 +1,53 @@
 from django.contrib.auth.tokens import default_token_generator
-from django.core.mail import send_mail
-from django.db.models import Avg
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, generics, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.permissions import AllowAny, IsAuthenticatedOrReadOnly
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import AccessToken
-
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
+
+from api.asynchronous import AsyncReadMixin
+from api.bulk import BulkWriteMixin
+from api.database import check_databases
+from api.cache import (CATALOGUE, USERS, CachedListMixin, CachedResponseMixin,
+                       ConditionalGetMixin, ConditionalListMixin, get_stats)
+from api.authentication import get_token_for_user
 from api.filters import TitleFilter
-from api.mixins import CreateListDestroyViewSet
-from api.pagination import UserPagination
+from api.mixins import (CreateListDestroyViewSet, NestedParentMixin,
+                        RelatedQuerySetMixin)
+from api.pagination import (PubDatePagination, TitlePagination, TopPagination,
+                            TrendingPagination, UserPagination)
 from api.permissions import IsAdmin, IsModerOrAdminOrAuthor, IsUser
+from api.profiling import ProfilingMixin, registry
+from api.replicas import ReplicaReadMixin
 from api.serializers import (CategorySerializer, CommentSerializer,
                              ConfirmCodeCheck, GenreSerializer,
                              ReviewSerializer, TitleGETSerializer,
-                             TitleSerializer, UserNotSafeSerializer,
+                             TitleRankingSerializer, TitleSerializer,
+                             TitleStatsSerializer,
+                             UserNotSafeSerializer,
                              UserSerializer, UserSignUp)
 from api_yamdb.settings import EMAIL_HOST_USER
-from reviews.models import Category, Genre, Review, Title, User
+from reviews.export import CONTENT_TYPES, EXPORT_TABLES, export_chunks
+from reviews.models import (Category, Comment, Genre, Review, Title,
+                            TitleStats, TitleTrigram, User)
+from reviews.outbox import enqueue_mail
+from reviews.search import normalize
 
 
-class TitleViewSet(viewsets.ModelViewSet):
+class TitleViewSet(BulkWriteMixin, ConditionalGetMixin, CachedResponseMixin,
+                   RelatedQuerySetMixin, ProfilingMixin, ReplicaReadMixin,
+                   AsyncReadMixin, viewsets.ModelViewSet):
     """Обрабатываем запросы о произведениях."""
 
-    queryset = Title.objects.annotate(
-        rating=Avg('reviews__score')).order_by('id')
+    queryset = Title.objects.order_by('id')
     permission_classes = (IsAdmin,)
-    pagination_class = UserPagination
+    pagination_class = TitlePagination
     filter_backends = (DjangoFilterBackend,)
     filterset_class = TitleFilter
     search_fields = ('=name',)
@@ -36,6 +55,8 @@ class TitleViewSet(viewsets.ModelViewSet):
     def get_serializer_class(self):
         """Определяем, какой сериализатор будет использован в зависимости
         от метода запроса."""
+        if self.action in ('top', 'trending'):
+            return TitleRankingSerializer
         if self.request.method in ['GET']:
             return TitleGETSerializer
         return TitleSerializer
@@ -47,22 +68,130 @@ class TitleViewSet(viewsets.ModelViewSet):
             return (IsAuthenticatedOrReadOnly(),)
         return super().get_permissions()
 
-
-class CategoryViewSet(CreateListDestroyViewSet):
+    @action(detail=True, methods=['get'])
+    def stats(self, request, pk=None):
+        """Гистограмма оценок, среднее, медиана и дата последнего отзыва
+        из предрассчитанной таблицы TitleStats."""
+        title = generics.get_object_or_404(
+            Title.objects.select_related('stats'), pk=pk)
+        try:
+            stats = title.stats
+        except TitleStats.DoesNotExist:
+            stats = TitleStats(title=title)
+        return Response(TitleStatsSerializer(stats).data)
+
+    @action(detail=False, methods=['get'], pagination_class=TopPagination)
+    def top(self, request):
+        """Произведения по убыванию байесовского рейтинга."""
+        return self.ranked_list(
+            self.get_queryset().filter(weighted_rating__isnull=False))
+
+    @action(detail=False, methods=['get'],
+            pagination_class=TrendingPagination)
+    def trending(self, request):
+        """Произведения по числу отзывов за скользящее окно."""
+        return self.ranked_list(
+            self.get_queryset().filter(review_velocity__gt=0))
+
+    def ranked_list(self, queryset):
+        """Страница рейтинга с фильтрами TitleFilter. Порядок задаёт
+        курсорная пагинация, страница читается по индексу."""
+        page = self.paginate_queryset(self.filter_queryset(queryset))
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    def after_bulk_save(self, objects):
+        """bulk_create не вызывает Title.save(), обновляем поисковый
+        индекс для всей пачки."""
+        for title in objects:
+            title.search_name = normalize(title.name)
+        Title.objects.bulk_update(objects, ['search_name'],
+                                  batch_size=self.bulk_batch_size)
+        TitleTrigram.reindex(objects)
+
+
+class CategoryViewSet(BulkWriteMixin, ConditionalListMixin, CachedListMixin,
+                      CreateListDestroyViewSet):
     """Обрабатываем запросы о категориях."""
 
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
+    bulk_unique_fields = ('slug',)
 
 
-class GenreViewSet(CreateListDestroyViewSet):
+class GenreViewSet(BulkWriteMixin, ConditionalListMixin, CachedListMixin,
+                   CreateListDestroyViewSet):
     """Обрабатываем запросы о жанрах."""
 
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
+    bulk_unique_fields = ('slug',)
+
+
+class CacheStatsView(APIView):
+    """Счётчики кеша каталога для администратора."""
+
+    permission_classes = (IsAdmin,)
+
+    def get(self, request):
+        return Response(get_stats())
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class HealthView(APIView):
+    """Проверка доступности баз данных для балансировщика
+    и мониторинга: 200, если все базы отвечают, иначе 503."""
+
+    authentication_classes = ()
+    permission_classes = (AllowAny,)
+
+    def get(self, request):
+        databases = check_databases()
+        healthy = all(database['ok'] for database in databases.values())
+        return Response(
+            {'status': 'ok' if healthy else 'unavailable',
+             'databases': databases},
+            status=(status.HTTP_200_OK if healthy
+                    else status.HTTP_503_SERVICE_UNAVAILABLE))
+
+
+class MetricsView(APIView):
+    """Метрики ProfilingMiddleware в текстовом формате Prometheus."""
+
+    permission_classes = (IsAdmin,)
+
+    def get(self, request):
+        return HttpResponse(registry.export(),
+                            content_type='text/plain; version=0.0.4; '
+                                         'charset=utf-8')
+
+
+class ExportView(APIView):
+    """Потоковая выгрузка таблицы целиком для администратора.
+
+    Формат задаётся параметром ?output=ndjson (по умолчанию) или
+    ?output=csv, файл совместим с командой import_data."""
+
+    permission_classes = (IsAdmin,)
+
+    def get(self, request, table):
+        if table not in EXPORT_TABLES:
+            raise NotFound(f'Таблица {table} не найдена.')
+        file_format = request.query_params.get('output', 'ndjson')
+        if file_format not in CONTENT_TYPES:
+            return Response(
+                {'output': f'Допустимые значения: '
+                           f'{", ".join(CONTENT_TYPES)}.'},
+                status=status.HTTP_400_BAD_REQUEST)
+        response = StreamingHttpResponse(
+            export_chunks(table, file_format),
+            content_type=CONTENT_TYPES[file_format])
+        response['Content-Disposition'] = (
+            f'attachment; filename="{table}.{file_format}"')
+        return response
+
+
+class UserViewSet(ProfilingMixin, ReplicaReadMixin,
+                  viewsets.ModelViewSet):
     """ViewSet для модели User."""
 
     queryset = User.objects.all()
@@ -90,8 +219,11 @@ class UserViewSet(viewsets.ModelViewSet):
     @action(methods=['GET', 'PATCH'], detail=False, url_path='me',
             permission_classes=(IsUser,))
     def user_self_profile(self, request):
-        """Получение и изменение информации пользователя о себе users/me."""
-        self_profile = get_object_or_404(User, username=request.user.username)
+        """Получение и изменение информации пользователя о себе users/me.
+
+        Пользователя ищем по id: имя из claims токена могло с тех пор
+        достаться другому пользователю."""
+        self_profile = get_object_or_404(User, pk=request.user.pk)
         if request.method == 'PATCH':
             serializer = self.get_serializer(self_profile, data=request.data,
                                              partial=True)
@@ -105,7 +237,7 @@ class UserViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class SignUpView(generics.CreateAPIView):
+class SignUpView(ProfilingMixin, generics.CreateAPIView):
     """Регистрация пользователя."""
 
     permission_classes = (AllowAny,)
@@ -118,8 +250,8 @@ class SignUpView(generics.CreateAPIView):
         if User.objects.filter(email=email, username=username).exists():
             user = User.objects.get(email=email)
             confirmation_code = default_token_generator.make_token(user)
-            send_mail('confirmation code', confirmation_code, EMAIL_HOST_USER,
-                      [email], fail_silently=False,)
+            enqueue_mail('confirmation code', confirmation_code,
+                         EMAIL_HOST_USER, email)
             return Response(status=status.HTTP_200_OK)
         else:
             serializer = self.serializer_class(data=request.data)
@@ -128,12 +260,12 @@ class SignUpView(generics.CreateAPIView):
                 usermail = serializer.validated_data.get('email')
                 user = User.objects.create(username=username, email=usermail)
                 confirmation_code = default_token_generator.make_token(user)
-                send_mail('confirmation code', confirmation_code,
-                          EMAIL_HOST_USER, [usermail], fail_silently=False,)
+                enqueue_mail('confirmation code', confirmation_code,
+                             EMAIL_HOST_USER, usermail)
                 return Response(serializer.data, status=status.HTTP_200_OK)
 
 
-class ConfirmCodeCheckView(generics.ListCreateAPIView):
+class ConfirmCodeCheckView(ProfilingMixin, generics.ListCreateAPIView):
     """Проверка пользователя и кода подтверждения."""
 
     permission_classes = (AllowAny,)
@@ -150,36 +282,87 @@ class ConfirmCodeCheckView(generics.ListCreateAPIView):
         user = get_object_or_404(User, username=username)
         if not default_token_generator.check_token(user, confirmation_code):
             return Response(status=status.HTTP_400_BAD_REQUEST)
-        return Response(f'token: {str(AccessToken.for_user(user))}',
+        return Response(f'token: {str(get_token_for_user(user))}',
                         status=status.HTTP_200_OK)
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(ConditionalGetMixin, RelatedQuerySetMixin, ProfilingMixin,
+                    NestedParentMixin, ReplicaReadMixin, AsyncReadMixin,
+                    viewsets.ModelViewSet):
     serializer_class = ReviewSerializer
     permission_classes = (IsModerOrAdminOrAuthor,)
-    pagination_class = UserPagination
+    pagination_class = PubDatePagination
+    parent_model = Title
+    parent_lookups = {'pk': 'title_id'}
+
+    def get_etag_scopes(self):
+        return [CATALOGUE, USERS, f'reviews:{self.kwargs.get("title_id")}']
 
     def get_queryset(self):
-        title = get_object_or_404(Title, pk=self.kwargs.get("title_id"))
-        return title.reviews.all()
+        """Для отзыва произведение, сам отзыв и его автор выбираются
+        одним запросом в get_object: несуществующее произведение даёт
+        тот же 404, что и чужой отзыв. Существование произведения
+        отдельно проверяем только для списка."""
+        if not self.detail:
+            self.get_parent()
+        return Review.objects.filter(title_id=self.kwargs.get("title_id"))
 
     def perform_create(self, serializer):
-        title_id = self.kwargs.get("title_id")
-        title = get_object_or_404(Title, id=title_id)
-        serializer.save(author=self.request.user, title=title)
-
-
-class CommentViewSet(viewsets.ModelViewSet):
+        """Повторный отзыв отсекает ограничение unique_review в базе:
+        проверка до вставки не защищает от параллельных запросов."""
+        title = self.get_parent()
+        try:
+            with transaction.atomic():
+                review = serializer.save(author=self.request.user,
+                                         title=title)
+                Title.update_rating(title.id, review.score, 1)
+                TitleStats.update_scores(title.id, added=review.score,
+                                         pub_date=review.pub_date)
+        except IntegrityError:
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [
+                'Нельзя создавать несколько отзывов на произведение']})
+
+    def perform_update(self, serializer):
+        """Прежнюю оценку перечитываем в транзакции с блокировкой строки:
+        иначе два параллельных изменения отзыва сдвинут агрегаты
+        от одной и той же прежней оценки."""
+        with transaction.atomic():
+            old_score = Review.objects.select_for_update().values_list(
+                'score', flat=True).get(pk=serializer.instance.pk)
+            review = serializer.save()
+            Title.update_rating(review.title_id, review.score - old_score, 0)
+            TitleStats.update_scores(review.title_id, added=review.score,
+                                     removed=old_score)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
+            Title.update_rating(instance.title_id, -instance.score, -1)
+            TitleStats.update_scores(instance.title_id,
+                                     removed=instance.score)
+
+
+class CommentViewSet(ConditionalGetMixin, RelatedQuerySetMixin,
+                     ProfilingMixin, NestedParentMixin, ReplicaReadMixin,
+                     AsyncReadMixin, viewsets.ModelViewSet):
     serializer_class = CommentSerializer
     permission_classes = (IsModerOrAdminOrAuthor,)
-    pagination_class = UserPagination
+    pagination_class = PubDatePagination
+    parent_model = Review
+    parent_lookups = {'pk': 'review_id', 'title_id': 'title_id'}
+
+    def get_etag_scopes(self):
+        return [USERS, f'reviews:{self.kwargs.get("title_id")}',
+                f'comments:{self.kwargs.get("review_id")}']
 
     def get_queryset(self):
-        review = get_object_or_404(Review, pk=self.kwargs.get("review_id"))
-        return review.comments.all()
+        """Комментарий выбираем одним запросом вместе с проверкой,
+        что отзыв относится к произведению из URL."""
+        if not self.detail:
+            self.get_parent()
+        return Comment.objects.filter(
+            review_id=self.kwargs.get("review_id"),
+            review__title_id=self.kwargs.get("title_id"))
 
     def perform_create(self, serializer):
-        title_id = self.kwargs.get('title_id')
-        review_id = self.kwargs.get('review_id')
-        review = get_object_or_404(Review, id=review_id, title=title_id)
-        serializer.save(author=self.request.user, review=review)
+        serializer.save(author=self.request.user, review=self.get_parent())
@@ -0,0 +1,97 @@
+"""Настройки базы данных из переменных окружения.
+
+Модуль импортируется из settings, поэтому не зависит от Django."""
+import os
+
+ENGINES = {
+    'sqlite': 'django.db.backends.sqlite3',
+    'postgresql': 'api.backends.postgresql',
+}
+
+# PRAGMA каждого нового соединения SQLite: переменная окружения и значение
+# по умолчанию. Пустое значение переменной оставляет настройку SQLite.
+SQLITE_PRAGMAS = (
+    # Читатели не блокируют писателя и наоборот.
+    ('journal_mode', 'SQLITE_JOURNAL_MODE', 'WAL'),
+    # В режиме WAL fsync только на контрольных точках.
+    ('synchronous', 'SQLITE_SYNCHRONOUS', 'NORMAL'),
+    # Сколько миллисекунд ждать блокировку записи вместо ошибки
+    # "database is locked".
+    ('busy_timeout', 'SQLITE_BUSY_TIMEOUT', '5000'),
+    # Чтение файла базы через mmap, байт.
+    ('mmap_size', 'SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)),
+)
+
+
+def flag(value):
+    return value in ('True', 'true', '1', 'yes')
+
+
+def database_config(default_name, env=None):
+    """Настройки соединения для DATABASES по переменным окружения.
+
+    DB_ENGINE выбирает sqlite (по умолчанию) или postgresql.
+    DB_CONN_MAX_AGE задаёт время жизни постоянных соединений в секундах,
+    DB_HEALTH_CHECKS - проверку постоянного соединения PostgreSQL
+    перед первым использованием в запросе (api.backends.postgresql;
+    соединение SQLite не разрывается). Для PostgreSQL за PgBouncer
+    в режиме транзакций задайте DB_PGBOUNCER=True."""
+    env = os.environ if env is None else env
+    engine = env.get('DB_ENGINE', 'sqlite')
+    engine = ENGINES.get(engine, engine)
+    config = {
+        'ENGINE': engine,
+        'CONN_MAX_AGE': int(env.get('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': flag(env.get('DB_HEALTH_CHECKS', 'True')),
+    }
+    if engine == ENGINES['sqlite']:
+        config['NAME'] = env.get('DB_NAME', default_name)
+        return config
+    config.update({
+        'NAME': env.get('DB_NAME', 'yamdb'),
+        'USER': env.get('POSTGRES_USER', 'postgres'),
+        'PASSWORD': env.get('POSTGRES_PASSWORD', ''),
+        'HOST': env.get('DB_HOST', 'localhost'),
+        'PORT': env.get('DB_PORT', '5432'),
+        'OPTIONS': {
+            'connect_timeout': int(env.get('DB_CONNECT_TIMEOUT', 5)),
+        },
+    })
+    if flag(env.get('DB_PGBOUNCER', 'False')):
+        # PgBouncer сам держит пул соединений с сервером и в режиме
+        # транзакций не сохраняет именованные курсоры между запросами.
+        config['DISABLE_SERVER_SIDE_CURSORS'] = True
+    return config
+
+
+def replica_configs(primary, env=None):
+    """Реплики для чтения из DB_REPLICAS: через запятую пути к файлам
+    SQLite или хосты PostgreSQL (host[:port]) с теми же настройками,
+    что и у основной базы. В тестах реплики указывают на основную
+    базу."""
+    env = os.environ if env is None else env
+    locations = [location.strip()
+                 for location in env.get('DB_REPLICAS', '').split(',')
+                 if location.strip()]
+    replicas = {}
+    for number, location in enumerate(locations, 1):
+        config = {**primary, 'TEST': {'MIRROR': 'default'}}
+        if primary['ENGINE'] == ENGINES['sqlite']:
+            config['NAME'] = location
+        else:
+            host, _, port = location.partition(':')
+            config.update(HOST=host, PORT=port or primary['PORT'],
+                          OPTIONS=dict(primary['OPTIONS']))
+        replicas[f'replica{number}'] = config
+    return replicas
+
+
+def sqlite_pragmas(env=None):
+    """PRAGMA для соединений SQLite по переменным окружения."""
+    env = os.environ if env is None else env
+    pragmas = {}
+    for pragma, variable, default in SQLITE_PRAGMAS:
+        value = env.get(variable, default)
+        if value:
+            pragmas[pragma] = value
+    return pragmas
@@ -3,6 +3,9 @@ from datetime import timedelta
 import os
 from dotenv import load_dotenv
 
+from api_yamdb.database import (database_config, replica_configs,
+                                sqlite_pragmas)
+
 load_dotenv()
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -33,6 +36,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -66,11 +70,59 @@ WSGI_APPLICATION = 'api_yamdb.wsgi.application'
 
 # Database
 
+# Движок и параметры соединения задаются переменными окружения
+# (DB_ENGINE, DB_NAME, DB_CONN_MAX_AGE и другие, см. api_yamdb/database.py),
+# по умолчанию - SQLite-файл с постоянными соединениями.
 DATABASES = {
+    'default': database_config(BASE_DIR / 'db.sqlite3'),
+}
+
+# Реплики для чтения (DB_REPLICAS): GET-запросы вьюсетов api читают
+# случайную реплику, кроме REPLICA_STICKY_SECONDS после записи
+# пользователя. Реплики SQLite обновляет команда sync_replicas.
+DATABASES.update(replica_configs(DATABASES['default']))
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['api.replicas.ReplicaRouter']
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', 10))
+
+# PRAGMA каждого нового соединения SQLite: WAL, synchronous=NORMAL,
+# busy_timeout и mmap_size (SQLITE_JOURNAL_MODE, SQLITE_SYNCHRONOUS,
+# SQLITE_BUSY_TIMEOUT, SQLITE_MMAP_SIZE).
+SQLITE_PRAGMAS = sqlite_pragmas()
+
+
+# Cache
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Кеш ответов каталога. locmem живёт в пределах процесса, поэтому
+    # при нескольких воркерах нужен общий бэкенд: файловый или Redis.
+    'catalogue': {
+        'BACKEND': os.getenv(
+            'CATALOGUE_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CATALOGUE_CACHE_LOCATION', 'catalogue'),
+        'TIMEOUT': int(os.getenv('CATALOGUE_CACHE_TIMEOUT', 300)),
+    },
+    # Версии JWT-токенов пользователей. Тоже должен быть общим для всех
+    # воркеров, иначе смена роли видна только в одном процессе.
+    'tokens': {
+        'BACKEND': os.getenv(
+            'TOKEN_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('TOKEN_CACHE_LOCATION', 'tokens'),
+    },
+    # Отметки read-your-writes для реплик. Должен быть общим для всех
+    # воркеров, иначе после записи следующий запрос, попавший в другой
+    # процесс, прочитает отстающую реплику.
+    'replicas': {
+        'BACKEND': os.getenv(
+            'REPLICA_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('REPLICA_CACHE_LOCATION', 'replicas'),
+    },
 }
 
 
@@ -98,7 +150,19 @@ REST_FRAMEWORK = {
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.StatelessJWTAuthentication',
+    ],
+
+    # JSON через orjson, если он установлен, иначе через json.
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+
+    'DEFAULT_PARSER_CLASSES': [
+        'api.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ],
 
 }
@@ -142,3 +206,24 @@ EMAIL_USE_TLS = False
 EMAIL_USE_SSL = True
 DEFAULT_FROM_EMAIL = os.getenv('EMAIL_ADDRESS')
 EMAIL_FILE_PATH = (BASE_DIR / 'sent_emails')
+# Письма ставятся в очередь и отправляются командой send_emails.
+# При True письмо отправляется сразу после постановки в очередь.
+EMAIL_QUEUE_EAGER = os.getenv('EMAIL_QUEUE_EAGER', 'False') == 'True'
+
+# Ранжирование произведений для /titles/top/ и /titles/trending/:
+# вес априорной средней оценки в байесовском рейтинге (в отзывах)
+# и ширина скользящего окна для подсчёта свежих отзывов (в днях).
+RANKING_PRIOR_VOTES = int(os.getenv('RANKING_PRIOR_VOTES', 10))
+RANKING_WINDOW_DAYS = int(os.getenv('RANKING_WINDOW_DAYS', 7))
+
+# Профилирование запросов api: доля замеряемых запросов от 0 (выключено)
+# до 1 и бюджет SQL-запросов, сверх которого пишется предупреждение.
+# Метрики доступны администратору на /api/v1/metrics/.
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', 0))
+PROFILING_QUERY_BUDGET = int(os.getenv('PROFILING_QUERY_BUDGET', 30))
+
+# Асинхронные list и retrieve каталога, отзывов и комментариев под ASGI.
+# asgi.py включает их по умолчанию; блокирующие вызовы выполняются
+# в пуле из ASYNC_EXECUTOR_WORKERS потоков.
+ASYNC_READ_VIEWS = os.getenv('ASYNC_READ_VIEWS', 'False') == 'True'
+ASYNC_EXECUTOR_WORKERS = int(os.getenv('ASYNC_EXECUTOR_WORKERS', 8))
@@ -1,6 +1,7 @@
 from django.contrib import admin
 
-from .models import Category, Comment, Genre, Review, Title, User
+from .models import (Category, Comment, Genre, OutgoingEmail, Review, Title,
+                     User)
 
 
 @admin.register(Title)
@@ -10,6 +11,7 @@ class TitleAdmin(admin.ModelAdmin):
     list_editable = ('category',)
     search_fields = ('name',)
     list_filter = ('year', 'category', 'genre')
+    readonly_fields = ('rating_sum', 'rating_count', 'rating')
 
     def title_genre(self, object):
         return ', '.join((genre.name for genre in object.genre.all()))
@@ -57,3 +59,17 @@ class CommentAdmin(admin.ModelAdmin):
     search_fields = ('review',)
     list_filter = ('review',)
     empty_value_display = '-пусто-'
+
+
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = (
+        'recipient',
+        'subject',
+        'created',
+        'attempts',
+        'sent_at',
+    )
+    search_fields = ('recipient',)
+    list_filter = ('sent_at',)
+    empty_value_display = '-пусто-'
@@ -0,0 +1,67 @@
+import csv
+import json
+import os
+from datetime import date, datetime
+
+from reviews.management.commands.import_data import FILE_MODEL, batched
+from reviews.models import User
+
+EXPORT_FORMATS = ('ndjson', 'csv')
+CONTENT_TYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+CHUNK_SIZE = 2000
+
+# Учётные данные не выгружаются: хеш пароля, код подтверждения
+# и версия токенов остаются только в базе.
+EXCLUDED_COLUMNS = {
+    User: ('password', 'confirmation_code', 'token_version'),
+}
+
+# Имя таблицы совпадает с именем csv-файла, который читает import_data.
+# Выгружаются все колонки модели, кроме EXCLUDED_COLUMNS.
+EXPORT_TABLES = {
+    os.path.splitext(os.path.basename(file))[0]: (
+        model, [field.attname for field in model._meta.concrete_fields
+                if field.attname not in EXCLUDED_COLUMNS.get(model, ())])
+    for file, dictionary in FILE_MODEL.items()
+    for model in dictionary
+}
+
+
+class Echo:
+    """Буфер для csv.writer, который просто возвращает записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+def to_primitive(value):
+    """Даты в ISO 8601 без потери микросекунд, остальное как есть."""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def export_chunks(name, file_format, chunk_size=CHUNK_SIZE):
+    """Построчно выгружаем таблицу в NDJSON или CSV.
+
+    Строки читаются из базы серверным курсором через iterator(), в
+    памяти держится не больше chunk_size строк. CSV начинается со
+    строки заголовка в формате import_data."""
+    model, fieldnames = EXPORT_TABLES[name]
+    rows = model.objects.order_by('pk').values_list(
+        *fieldnames).iterator(chunk_size=chunk_size)
+    if file_format == 'csv':
+        writer = csv.writer(Echo(), lineterminator='\n')
+        yield writer.writerow(fieldnames)
+
+        def encode(row):
+            return writer.writerow(
+                '' if value is None else to_primitive(value)
+                for value in row)
+    else:
+        def encode(row):
+            return json.dumps(
+                dict(zip(fieldnames, map(to_primitive, row))),
+                ensure_ascii=False) + '\n'
+    for batch in batched(rows, chunk_size):
+        yield ''.join(map(encode, batch))
@@ -0,0 +1,42 @@
+import os
+import time
+
+from django.core.management import BaseCommand
+
+from reviews.export import CHUNK_SIZE, EXPORT_FORMATS, EXPORT_TABLES
+from reviews.export import export_chunks
+
+
+class Command(BaseCommand):
+    """Выгрузка базы данных в файлы, которые читает import_data."""
+
+    help = ('Потоково выгружает таблицы в NDJSON или CSV. Файлы можно '
+            'загрузить обратно командой import_data --data-dir.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'output_dir', help='Каталог для выгруженных файлов.')
+        parser.add_argument(
+            '--format', choices=EXPORT_FORMATS, default='csv',
+            help='Формат файлов.')
+        parser.add_argument(
+            '--tables', nargs='+', choices=list(EXPORT_TABLES),
+            default=list(EXPORT_TABLES),
+            help='Какие таблицы выгрузить, по умолчанию все.')
+        parser.add_argument(
+            '--chunk-size', type=int, default=CHUNK_SIZE,
+            help='Количество строк, читаемых из базы за один раз.')
+
+    def handle(self, *args, **options):
+        os.makedirs(options['output_dir'], exist_ok=True)
+        for name in options['tables']:
+            started = time.monotonic()
+            path = os.path.join(options['output_dir'],
+                                f'{name}.{options["format"]}')
+            with open(path, 'w', newline='', encoding='utf-8') as file:
+                for chunk in export_chunks(name, options['format'],
+                                           options['chunk_size']):
+                    file.write(chunk)
+            self.stdout.write(self.style.SUCCESS(
+                f'Таблица {name} выгружена в {path} за '
+                f'{time.monotonic() - started:.2f} с'))
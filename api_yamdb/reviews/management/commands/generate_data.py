@@ -0,0 +1,281 @@
+import csv
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from io import StringIO
+from itertools import accumulate
+
+from django.core.management import BaseCommand, CommandError, call_command
+from django.db import transaction
+from django.utils import timezone
+
+from reviews.management.commands.import_data import (FILE_MODEL, batched,
+                                                     dependency_order,
+                                                     keep_auto_now,
+                                                     reset_sequences)
+from reviews.models import (Category, Comment, Genre, GenreTitle, Review,
+                            Title, User)
+from reviews.signals import catalogue_changed
+
+SYLLABLES = ('ба', 'ко', 'ри', 'ма', 'те', 'ло', 'ну', 'ша', 'ви', 'до',
+             'ка', 'ро', 'ми', 'су', 'на', 'зи', 'ле', 'го')
+WORDS = ('Отлично', 'Скучно', 'Неплохо', 'Сильно', 'Затянуто', 'Красиво',
+         'Смешно', 'Страшно', 'Пересмотрю', 'Не понял')
+
+
+def zipf_counts(total, size, exponent, cap):
+    """Распределяем total по size корзинам с весами 1 / rank ** exponent.
+
+    Ни одна корзина не получает больше cap: излишек самых популярных
+    корзин перераспределяется по остальным пропорционально весам."""
+    weights = [1 / rank ** exponent for rank in range(1, size + 1)]
+    total = min(total, size * cap)
+    rest = sum(weights)
+    capped = 0
+    while capped < size:
+        scale = (total - cap * capped) / rest
+        if weights[capped] * scale <= cap:
+            break
+        rest -= weights[capped]
+        capped += 1
+    counts = [cap if rank < capped else int(weight * scale)
+              for rank, weight in enumerate(weights)]
+    remainder = total - sum(counts)
+    for rank in range(capped, size):
+        if not remainder:
+            break
+        if counts[rank] < cap:
+            counts[rank] += 1
+            remainder -= 1
+    return counts
+
+
+class Dataset:
+    """Детерминированный по seed синтетический каталог.
+
+    Строки генерируются лениво в формате FILE_MODEL, у каждой таблицы
+    свой генератор случайных чисел, поэтому результат не зависит
+    от порядка чтения таблиц."""
+
+    def __init__(self, options, starts):
+        self.options = options
+        self.seed = options['seed']
+        self.starts = starts
+        self.until = datetime.combine(
+            options['until'], datetime.min.time(), tzinfo=timezone.utc)
+        self.user_ids = self.ids(User, options['users'])
+        self.title_ids = self.ids(Title, options['titles'])
+        self.category_ids = self.ids(Category, options['categories'])
+        self.genre_ids = self.ids(Genre, options['genres'])
+        # Активность пользователей - степенной закон по случайному рангу.
+        rng = self.rng('activity')
+        self.active_users = list(self.user_ids)
+        rng.shuffle(self.active_users)
+        self.activity = list(accumulate(
+            1 / rank ** options['user_skew']
+            for rank in range(1, len(self.active_users) + 1)))
+        self.review_counts = zipf_counts(
+            options['reviews'], len(self.title_ids), options['title_skew'],
+            len(self.user_ids))
+        self.review_total = sum(self.review_counts)
+
+    def ids(self, model, count):
+        return range(self.starts[model], self.starts[model] + count)
+
+    def rng(self, table):
+        return random.Random(f'{self.seed}:{table}')
+
+    def rows(self, model):
+        return {
+            Category: self.categories,
+            Genre: self.genres,
+            User: self.users,
+            Title: self.titles,
+            GenreTitle: self.genre_titles,
+            Review: self.reviews,
+            Comment: self.comments,
+        }[model]()
+
+    def categories(self):
+        for pk in self.category_ids:
+            yield {'id': pk, 'name': f'Категория {pk}',
+                   'slug': f'gen-category-{pk}'}
+
+    def genres(self):
+        for pk in self.genre_ids:
+            yield {'id': pk, 'name': f'Жанр {pk}', 'slug': f'gen-genre-{pk}'}
+
+    def users(self):
+        for pk in self.user_ids:
+            yield {'id': pk, 'username': f'gen_user{pk}',
+                   'email': f'gen_user{pk}@yamdb.fake', 'role': 'user',
+                   'bio': '', 'first_name': '', 'last_name': ''}
+
+    def titles(self):
+        rng = self.rng('titles')
+        for pk in self.title_ids:
+            words = (''.join(rng.choice(SYLLABLES)
+                             for _ in range(rng.randint(2, 4)))
+                     for _ in range(rng.randint(1, 3)))
+            yield {'id': pk, 'name': ' '.join(words).capitalize(),
+                   'year': rng.randint(1900, self.until.year),
+                   'category_id': rng.choice(self.category_ids)}
+
+    def genre_titles(self):
+        rng = self.rng('genre_title')
+        pk = self.starts[GenreTitle]
+        for title_id in self.title_ids:
+            for genre_id in rng.sample(self.genre_ids,
+                                       min(len(self.genre_ids),
+                                           rng.randint(1, 3))):
+                yield {'id': pk, 'title_id': title_id, 'genre_id': genre_id}
+                pk += 1
+
+    def pick_authors(self, rng, count):
+        """count разных авторов с учётом активности пользователей."""
+        if count * 2 > len(self.active_users):
+            return sorted(rng.sample(self.active_users, count))
+        authors = set()
+        for _ in range(5):
+            authors.update(rng.choices(
+                self.active_users, cum_weights=self.activity,
+                k=count - len(authors)))
+            if len(authors) == count:
+                break
+        while len(authors) < count:
+            authors.add(rng.choice(self.active_users))
+        return sorted(authors)
+
+    def pub_date(self, rng):
+        return self.until - timedelta(seconds=rng.randrange(365 * 86400))
+
+    def reviews(self):
+        """Число отзывов на произведение распределено по Ципфу, у
+        каждого произведения авторы разные (unique_review)."""
+        rng = self.rng('reviews')
+        counts = list(self.review_counts)
+        rng.shuffle(counts)
+        pk = self.starts[Review]
+        for title_id, count in zip(self.title_ids, counts):
+            for author_id in self.pick_authors(rng, count):
+                yield {'id': pk, 'title_id': title_id,
+                       'text': rng.choice(WORDS), 'author_id': author_id,
+                       'score': rng.randint(1, 10),
+                       'pub_date': self.pub_date(rng)}
+                pk += 1
+
+    def comments(self):
+        rng = self.rng('comments')
+        if not self.review_total:
+            return
+        for pk in self.ids(Comment, self.options['comments']):
+            author_id, = rng.choices(self.active_users,
+                                     cum_weights=self.activity)
+            yield {'id': pk,
+                   'review_id': (self.starts[Review]
+                                 + rng.randrange(self.review_total)),
+                   'text': rng.choice(WORDS), 'author_id': author_id,
+                   'pub_date': self.pub_date(rng)}
+
+
+class Command(BaseCommand):
+    """Генерация синтетических данных для нагрузочного тестирования."""
+
+    help = ('Генерирует пользователей, произведения, отзывы и комментарии '
+            'с реалистичным перекосом: число отзывов на произведение '
+            'распределено по Ципфу, активность пользователей - по '
+            'степенному закону. Пишет в базу пачками или в csv-файлы '
+            'для import_data --data-dir. Результат зависит только '
+            'от --seed и --until.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--titles', type=int, default=1000)
+        parser.add_argument('--reviews', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=10000)
+        parser.add_argument('--categories', type=int, default=10)
+        parser.add_argument('--genres', type=int, default=30)
+        parser.add_argument(
+            '--title-skew', type=float, default=1.1,
+            help='Показатель распределения Ципфа для отзывов '
+                 'на произведение.')
+        parser.add_argument(
+            '--user-skew', type=float, default=1.2,
+            help='Показатель степенного закона активности пользователей.')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument(
+            '--until', type=lambda value: datetime.strptime(
+                value, '%Y-%m-%d').date(),
+            default=timezone.now().date(),
+            help='Дата (ГГГГ-ММ-ДД), к которой относятся самые свежие '
+                 'отзывы, по умолчанию сегодня.')
+        parser.add_argument(
+            '--output-dir',
+            help='Записать csv-файлы в каталог вместо базы данных.')
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Количество строк в одной вставке.')
+
+    def handle(self, *args, **options):
+        if options['reviews'] and not (options['users']
+                                       and options['titles']):
+            raise CommandError('Для отзывов нужны пользователи '
+                               'и произведения.')
+        if options['comments'] and not options['reviews']:
+            raise CommandError('Для комментариев нужны отзывы.')
+        if options['output_dir']:
+            self.write_files(options)
+        else:
+            self.write_database(options)
+
+    def tables(self):
+        return dependency_order(FILE_MODEL)
+
+    def write_files(self, options):
+        os.makedirs(options['output_dir'], exist_ok=True)
+        dataset = Dataset(options, {
+            model: 1 for _, model, _ in self.tables()})
+        for file, model, fieldnames in self.tables():
+            started = time.monotonic()
+            path = os.path.join(options['output_dir'],
+                                os.path.basename(file))
+            total = 0
+            with open(path, 'w', newline='', encoding='utf-8') as csvfile:
+                writer = csv.writer(csvfile, lineterminator='\n')
+                writer.writerow(fieldnames)
+                for row in dataset.rows(model):
+                    writer.writerow(
+                        row[name].isoformat()
+                        if isinstance(row[name], datetime) else row[name]
+                        for name in fieldnames)
+                    total += 1
+            self.report(model, total, started)
+
+    def write_database(self, options):
+        """Добавляем данные к существующим, id продолжают счётчики."""
+        starts = {
+            model: (model.objects.order_by('-pk').values_list(
+                'pk', flat=True).first() or 0) + 1
+            for _, model, _ in self.tables()}
+        dataset = Dataset(options, starts)
+        for _, model, fieldnames in self.tables():
+            started = time.monotonic()
+            total = 0
+            with transaction.atomic(), keep_auto_now(model, fieldnames):
+                for batch in batched(dataset.rows(model),
+                                     options['batch_size']):
+                    model.objects.bulk_create(
+                        [model(**row) for row in batch])
+                    total += len(batch)
+                reset_sequences(model)
+                catalogue_changed.send(sender=model)
+            self.report(model, total, started)
+        for command in ('rebuild_ratings', 'rebuild_title_stats',
+                        'rebuild_rankings', 'rebuild_search_index'):
+            call_command(command, stdout=StringIO())
+
+    def report(self, model, total, started):
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'{model.__name__}: {total} строк за {elapsed:.2f} с'))
@@ -1,10 +1,28 @@
-from csv import DictReader
-from django.core.management import BaseCommand
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from csv import DictReader, reader
+from itertools import islice
+
+import django
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.management import BaseCommand, CommandError, call_command
+from django.core.management.color import no_style
+from django.db import connection, transaction
 
 from reviews.models import (Category, Comment, Genre, GenreTitle,
                             Title, Review, User)
+from reviews.signals import catalogue_changed
 
 
+# Колонки файлов static/data и generate_data. Загрузка берёт колонки
+# из заголовка файла, поэтому выгрузка export_data со всеми колонками
+# модели загружается без потерь.
 FILE_MODEL = {
     'static/data/category.csv':
         {Category: ('id', 'name', 'slug')},
@@ -24,35 +42,374 @@ FILE_MODEL = {
 }
 
 
+def model_dependencies(model):
+    """Модели, на которые ссылаются внешние ключи модели."""
+    return [field.related_model for field in model._meta.concrete_fields
+            if field.many_to_one or field.one_to_one]
+
+
+def dependency_order(file_model):
+    """Упорядочиваем файлы так, чтобы каждая модель загружалась после
+    моделей, на которые ссылаются её внешние ключи."""
+    entries = {
+        model: (file, fieldnames)
+        for file, dictionary in file_model.items()
+        for model, fieldnames in dictionary.items()
+    }
+    ordered = []
+    visiting = set()
+
+    def visit(model):
+        if model in ordered:
+            return
+        if model in visiting:
+            raise CommandError(
+                f'Циклическая зависимость между моделями: {model}.')
+        visiting.add(model)
+        for dependency in model_dependencies(model):
+            if dependency in entries and dependency is not model:
+                visit(dependency)
+        visiting.discard(model)
+        ordered.append(model)
+
+    for model in entries:
+        visit(model)
+    return [(entries[model][0], model, entries[model][1])
+            for model in ordered]
+
+
+def dependency_levels(file_model):
+    """Группируем файлы по уровням графа зависимостей: файлы одного
+    уровня не ссылаются друг на друга и могут загружаться параллельно."""
+    levels = {}
+    for file, model, fieldnames in dependency_order(file_model):
+        level = max((levels[dependency][0] + 1
+                     for dependency in model_dependencies(model)
+                     if dependency in levels and dependency is not model),
+                    default=0)
+        levels[model] = (level, (file, model, fieldnames))
+    grouped = [[] for _ in range(max(
+        (level for level, _ in levels.values()), default=-1) + 1)]
+    for level, entry in levels.values():
+        grouped[level].append(entry)
+    return grouped
+
+
+def header_fieldnames(file, model, header):
+    """Проверяем заголовок файла и приводим колонки к именам атрибутов
+    модели: category и category_id загружаются в category_id."""
+    if not header:
+        raise CommandError(
+            f'В {file} отсутствует строка с названием полей.')
+    fieldnames = []
+    for name in header:
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            field = None
+        if field is None or field.many_to_many or not field.concrete:
+            raise CommandError(f'В моделе {model} нет поля {name}.')
+        fieldnames.append(field.attname)
+    return fieldnames
+
+
+def read_fieldnames(file, model):
+    """Колонки файла: заголовок csv или ключи первого объекта NDJSON.
+    Выгрузка export_data содержит все колонки модели, файлы
+    static/data - только колонки из FILE_MODEL."""
+    header = None
+    with open(file, newline='', encoding='utf-8') as data:
+        if file.endswith('.ndjson'):
+            for line, text in enumerate(data, 1):
+                if text.strip():
+                    header = list(parse_ndjson_line(file, line, text))
+                    break
+        else:
+            header = next(reader(data), None)
+    return header_fieldnames(file, model, header)
+
+
+def read_rows(file, fieldnames):
+    """Лениво читаем строки файла с колонками fieldnames вместе
+    с номерами строк файла."""
+    if file.endswith('.ndjson'):
+        yield from read_ndjson(file, fieldnames)
+        return
+    with open(file, newline='', encoding='utf-8') as csvfile:
+        next(csvfile)
+        rows = DictReader(csvfile, fieldnames=fieldnames)
+        for row in rows:
+            yield rows.line_num + 1, row
+
+
+def parse_ndjson_line(file, line, text):
+    """Объект из строки NDJSON; всё остальное - ошибка с номером
+    строки."""
+    try:
+        row = json.loads(text)
+    except ValueError as error:
+        raise CommandError(f'{file}, строка {line}: {error}')
+    if not isinstance(row, dict):
+        raise CommandError(f'{file}, строка {line}: ожидается объект.')
+    return row
+
+
+def read_ndjson(file, fieldnames):
+    """Лениво читаем NDJSON, выгруженный командой export_data.
+
+    Колонки задаёт первый объект; у каждой следующей строки должны
+    быть те же ключи."""
+    header = None
+    with open(file, encoding='utf-8') as ndjson_file:
+        for line, text in enumerate(ndjson_file, 1):
+            if not text.strip():
+                continue
+            row = parse_ndjson_line(file, line, text)
+            if header is None:
+                header = list(row)
+            elif row.keys() != set(header):
+                raise CommandError(
+                    f'{file}, строка {line}: ключи '
+                    f'{", ".join(row)} не совпадают с первой строкой '
+                    f'({", ".join(header)}).')
+            yield line, dict(zip(fieldnames, (row[key] for key in header)))
+
+
+def convert_rows(file, model, fieldnames, rows):
+    """Приводим значения строк (номер строки, строка) к python-типам
+    полей модели; пустая строка в nullable-поле становится None."""
+    fields = {name: model._meta.get_field(name) for name in fieldnames}
+    for line, row in rows:
+        try:
+            yield {
+                name: (None if value == '' and fields[name].null
+                       else fields[name].to_python(value))
+                for name, value in row.items()
+            }
+        except ValidationError as error:
+            raise CommandError(f'{file}, строка {line}: {error.messages}')
+
+
+def data_file(file, options):
+    """Путь к файлу с учётом --data-dir и --format."""
+    if not options.get('data_dir'):
+        return os.path.join(settings.BASE_DIR, file)
+    name = os.path.splitext(os.path.basename(file))[0]
+    return os.path.join(options['data_dir'], f'{name}.{options["format"]}')
+
+
+def parse_batch(file, model_label, fieldnames, rows):
+    """Приводим пачку строк к python-типам в процессе-воркере.
+
+    Возвращает строки пачки и время разбора."""
+    started = time.monotonic()
+    model = apps.get_model(model_label)
+    rows = list(convert_rows(file, model, fieldnames, rows))
+    return rows, time.monotonic() - started
+
+
+def parse_batches(parsers, file, model, fieldnames, batch_size, window):
+    """Разбираем файл пачками по batch_size строк в пуле процессов.
+
+    Файл читается по мере загрузки, и в работе одновременно не больше
+    window пачек, поэтому в памяти держится не больше window * batch_size
+    строк файла. Пачки возвращаются по порядку вместе со временем
+    разбора."""
+    pending = deque()
+    try:
+        for batch in batched(read_rows(file, fieldnames), batch_size):
+            pending.append(parsers.submit(
+                parse_batch, file, model._meta.label, fieldnames, batch))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def batched(iterable, size):
+    """Разбиваем итератор на списки не длиннее size."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+@contextmanager
+def keep_auto_now(model, fieldnames):
+    """Сохраняем даты из файла вместо auto_now_add на время загрузки."""
+    fields = [field for field in model._meta.concrete_fields
+              if getattr(field, 'auto_now_add', False)
+              and field.attname in fieldnames]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def reset_sequences(model):
+    """Сдвигаем счётчик первичного ключа после вставки явных id."""
+    statements = connection.ops.sequence_reset_sql(no_style(), [model])
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def upsert(model, objects, fieldnames, batch_size):
+    """Обновляем существующие по id записи и создаём недостающие."""
+    pk = model._meta.pk
+    for obj in objects:
+        obj.pk = pk.to_python(obj.pk)
+    existing = set(model.objects.filter(
+        pk__in=[obj.pk for obj in objects]).values_list('pk', flat=True))
+    update_fields = [name for name in fieldnames if name != pk.attname]
+    to_update = [obj for obj in objects if obj.pk in existing]
+    if to_update and update_fields:
+        model.objects.bulk_update(to_update, update_fields,
+                                  batch_size=batch_size)
+    model.objects.bulk_create(
+        [obj for obj in objects if obj.pk not in existing],
+        batch_size=batch_size)
+
+
 class Command(BaseCommand):
     """Загрузка базы данных из csv файла."""
 
+    help = ('Потоково загружает csv-файлы из static/data пачками, '
+            'в отдельной транзакции на каждый файл.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Количество строк в одной вставке.')
+        parser.add_argument(
+            '--mode', choices=('replace', 'upsert'), default='replace',
+            help='replace - очистить таблицу и загрузить заново, '
+                 'upsert - обновить записи по id и добавить новые.')
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Количество процессов для разбора файлов. При значении '
+                 'больше 1 независимые файлы загружаются параллельно.')
+        parser.add_argument(
+            '--data-dir',
+            help='Каталог с файлами, например выгрузкой export_data. '
+                 'По умолчанию static/data.')
+        parser.add_argument(
+            '--format', choices=('csv', 'ndjson'), default='csv',
+            help='Формат файлов в --data-dir.')
+
     def handle(self, *args, **options):
-        for file, dictionary in FILE_MODEL.items():
-            for model, fieldnames in dictionary.items():
-                with open(file, newline='') as csvfile:
-
-                    # проверка на наличие и соответвие полей в csv-файле.
-                    model_field_names = [field.name for field
-                                         in model._meta.fields]
-                    csv_field_names = (csvfile.readline().replace('_id', '')
-                                       .split(','))
-                    if not csv_field_names:
-                        raise ValueError(
-                            f'В {file} отсутствует строка с названием полей.')
-                    for i in csv_field_names:
-                        if not i.rstrip('\n|\r') in model_field_names:
-                            raise NameError(f'В моделе {model} нет поля {i}.')
-
-                    fields = DictReader(csvfile, fieldnames=fieldnames)
-                    record = []
-                    for row in fields:
-                        records = model(**row)
-                        record.append(records)
-                if model.objects.exists():
-                    model.objects.all().delete()
-                    self.stdout.write(self.style.SUCCESS(
-                        f'Данные модели {model} удалены!'))
-                model.objects.bulk_create(record)
+        if options['workers'] > 1:
+            self.run_pipeline(options)
+        else:
+            for file, model, _ in dependency_order(FILE_MODEL):
+                file = data_file(file, options)
+                fieldnames = read_fieldnames(file, model)
+                self.load_file(model, fieldnames, convert_rows(
+                    file, model, fieldnames, read_rows(file, fieldnames)),
+                    options)
+        call_command('rebuild_ratings', stdout=self.stdout)
+        call_command('rebuild_title_stats', stdout=self.stdout)
+        call_command('rebuild_rankings', stdout=self.stdout)
+        call_command('rebuild_search_index', stdout=self.stdout)
+
+    def run_pipeline(self, options):
+        """Разбираем файлы пачками в пуле процессов и загружаем их
+        по уровням графа зависимостей: пачка записывается, пока следующие
+        ещё разбираются."""
+        started = time.monotonic()
+        levels = dependency_levels(FILE_MODEL)
+        # SQLite допускает только одного писателя за раз.
+        load_workers = 1 if connection.vendor == 'sqlite' else max(
+            len(level) for level in levels)
+        timings = []
+        with ProcessPoolExecutor(options['workers'],
+                                 initializer=django.setup) as parsers:
+            with ThreadPoolExecutor(load_workers) as loaders:
+                for number, level in enumerate(levels):
+                    level_started = time.monotonic()
+                    loads = [
+                        (file, model, loaders.submit(
+                            self.load_parsed, parsers,
+                            data_file(file, options), model, options))
+                        for file, model, _ in level
+                    ]
+                    for file, model, load in loads:
+                        total, parse_time, load_time = load.result()
+                        timings.append(
+                            (number, file, total, parse_time, load_time))
+                    self.stdout.write(
+                        f'Уровень {number} загружен за '
+                        f'{time.monotonic() - level_started:.2f} с')
+        self.write_timings(timings, time.monotonic() - started)
+
+    def load_parsed(self, parsers, file, model, options):
+        """Загружаем файл в своём соединении по мере разбора пачек.
+        Время загрузки включает ожидание разбора."""
+        parse_times = []
+
+        def rows(fieldnames):
+            for batch, parse_time in parse_batches(
+                    parsers, file, model, fieldnames, options['batch_size'],
+                    2 * options['workers']):
+                parse_times.append(parse_time)
+                yield from batch
+
+        try:
+            fieldnames = read_fieldnames(file, model)
+            load_started = time.monotonic()
+            total = self.load_file(model, fieldnames, rows(fieldnames),
+                                   options)
+            return total, sum(parse_times), time.monotonic() - load_started
+        finally:
+            connection.close()
+
+    def write_timings(self, timings, elapsed):
+        self.stdout.write('Уровень  Файл                         '
+                          'Строк  Разбор, с  Загрузка, с')
+        for number, file, total, parse_time, load_time in timings:
+            self.stdout.write(
+                f'{number:<8} {os.path.basename(file):<28} {total:>5} '
+                f'{parse_time:>10.2f} {load_time:>12.2f}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Все файлы загружены за {elapsed:.2f} с'))
+
+    def load_file(self, model, fieldnames, rows, options):
+        batch_size = options['batch_size']
+        started = time.monotonic()
+        total = 0
+        with transaction.atomic(), keep_auto_now(model, fieldnames):
+            if options['mode'] == 'replace' and model.objects.exists():
+                model.objects.all().delete()
                 self.stdout.write(self.style.SUCCESS(
-                    f'Данные модели {model} загружены!))'))
+                    f'Данные модели {model} удалены!'))
+            for batch in batched(rows, batch_size):
+                objects = [model(**row) for row in batch]
+                if options['mode'] == 'upsert':
+                    upsert(model, objects, fieldnames, batch_size)
+                else:
+                    model.objects.bulk_create(objects, batch_size=batch_size)
+                total += len(objects)
+                if options['verbosity'] > 1:
+                    self.stdout.write(
+                        f'{model.__name__}: {total} строк, '
+                        f'{self.rate(total, started):.0f} строк/с')
+            reset_sequences(model)
+            catalogue_changed.send(sender=model)
+        self.stdout.write(self.style.SUCCESS(
+            f'Данные модели {model} загружены: {total} строк за '
+            f'{time.monotonic() - started:.2f} с '
+            f'({self.rate(total, started):.0f} строк/с)'))
+        return total
+
+    @staticmethod
+    def rate(total, started):
+        elapsed = time.monotonic() - started
+        return total / elapsed if elapsed else 0
@@ -0,0 +1,23 @@
+from django.core.management import BaseCommand
+from django.db import transaction
+
+from reviews.models import Title
+from reviews.signals import catalogue_changed
+
+
+class Command(BaseCommand):
+    """Пересчёт ранжирования произведений."""
+
+    help = ('Пересчитывает байесовский рейтинг со свежей средней оценкой '
+            'и число отзывов за скользящее окно у всех произведений. '
+            'Запускается периодически, например раз в час: отзывы '
+            'выпадают из окна без записи в базу.')
+
+    def handle(self, *args, **options):
+        mean = Title.mean_score(refresh=True)
+        with transaction.atomic():
+            total = Title.objects.update(**Title.ranking_values(mean))
+            catalogue_changed.send(sender=Title)
+        self.stdout.write(self.style.SUCCESS(
+            f'Ранжирование пересчитано у {total} произведений, '
+            f'средняя оценка {mean:.2f}.'))
@@ -0,0 +1,73 @@
+from math import isclose
+
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from reviews.models import Review, Title
+from reviews.signals import catalogue_changed
+
+RATING_FIELDS = ('rating_sum', 'rating_count', 'rating')
+
+
+def compute_rating(total, count):
+    """Средняя оценка по сумме и количеству отзывов."""
+    return total / count if count else None
+
+
+def is_stale(title, total, count):
+    """Проверяем, расходятся ли сохранённые агрегаты с отзывами."""
+    rating = compute_rating(total, count)
+    if (title.rating_sum, title.rating_count) != (total, count):
+        return True
+    if rating is None or title.rating is None:
+        return rating is not title.rating
+    return not isclose(title.rating, rating)
+
+
+class Command(BaseCommand):
+    """Пересчёт денормализованного рейтинга произведений."""
+
+    help = ('Пересчитывает сумму, количество оценок и рейтинг произведений '
+            'одним сгруппированным запросом по отзывам.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Только проверить агрегаты, ничего не изменяя.')
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Размер пачки при чтении и обновлении произведений.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        aggregates = {
+            row['title']: (row['total'], row['count'])
+            for row in Review.objects.order_by().values('title').annotate(
+                total=Sum('score'), count=Count('id'))
+        }
+        stale = []
+        titles = Title.objects.only('id', *RATING_FIELDS).order_by('id')
+        for title in titles.iterator(chunk_size=batch_size):
+            total, count = aggregates.get(title.id, (0, 0))
+            if is_stale(title, total, count):
+                title.rating_sum = total
+                title.rating_count = count
+                title.rating = compute_rating(total, count)
+                stale.append(title)
+
+        if options['check']:
+            if stale:
+                raise CommandError(
+                    f'Рейтинг не актуален у {len(stale)} произведений: '
+                    + ', '.join(str(title.id) for title in stale[:20]))
+            self.stdout.write(self.style.SUCCESS('Рейтинги актуальны.'))
+            return
+
+        with transaction.atomic():
+            Title.objects.bulk_update(stale, RATING_FIELDS,
+                                      batch_size=batch_size)
+            if stale:
+                catalogue_changed.send(sender=Title)
+        self.stdout.write(self.style.SUCCESS(
+            f'Рейтинг пересчитан у {len(stale)} произведений.'))
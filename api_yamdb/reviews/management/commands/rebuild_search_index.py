@@ -0,0 +1,37 @@
+from django.core.management import BaseCommand
+from django.db import transaction
+
+from reviews.models import Title, TitleTrigram
+from reviews.search import normalize
+
+
+class Command(BaseCommand):
+    """Пересборка поискового индекса названий произведений."""
+
+    help = ('Заполняет search_name и триграммы названий для всех '
+            'произведений, например после массовой загрузки.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Количество произведений в одной пачке.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        titles = Title.objects.only('id', 'name', 'search_name')
+        last_id = 0
+        total = 0
+        while True:
+            batch = list(titles.filter(id__gt=last_id)
+                         .order_by('id')[:batch_size])
+            if not batch:
+                break
+            for title in batch:
+                title.search_name = normalize(title.name)
+            with transaction.atomic():
+                Title.objects.bulk_update(batch, ['search_name'])
+                TitleTrigram.reindex(batch)
+            last_id = batch[-1].id
+            total += len(batch)
+        self.stdout.write(self.style.SUCCESS(
+            f'Поисковый индекс пересобран для {total} произведений.'))
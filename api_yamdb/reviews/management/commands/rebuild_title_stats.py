@@ -0,0 +1,22 @@
+from django.core.management import BaseCommand
+from django.db import transaction
+
+from reviews.models import TitleStats
+
+
+class Command(BaseCommand):
+    """Пересчёт статистики оценок произведений."""
+
+    help = ('Пересчитывает гистограммы оценок и даты последних отзывов '
+            'всех произведений одним сгруппированным запросом по отзывам.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Размер пачки при вставке строк статистики.')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            total = TitleStats.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Статистика пересчитана у {total} произведений.'))
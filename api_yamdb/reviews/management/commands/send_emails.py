@@ -0,0 +1,48 @@
+import time
+
+from django.core.management import BaseCommand
+
+from reviews.outbox import send_queued
+
+
+class Command(BaseCommand):
+    """Отправка писем из очереди."""
+
+    help = ('Отправляет письма из очереди пачками через одно '
+            'SMTP-соединение, повторяя неудачные попытки с задержкой.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=100,
+            help='Количество писем на одно SMTP-соединение.')
+        parser.add_argument(
+            '--max-attempts', type=int, default=5,
+            help='После стольких неудачных попыток письмо не отправляется.')
+        parser.add_argument(
+            '--backoff', type=int, default=60,
+            help='Базовая задержка перед повторной попыткой, в секундах.')
+        parser.add_argument(
+            '--lease', type=int, default=300,
+            help='На сколько секунд забранные письма скрываются от других '
+                 'отправителей; неотмеченные за это время отправляются '
+                 'повторно.')
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Работать постоянно, ожидая новые письма.')
+        parser.add_argument(
+            '--interval', type=float, default=5,
+            help='Пауза между проверками пустой очереди при --loop.')
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = send_queued(options['batch_size'],
+                                       options['max_attempts'],
+                                       options['backoff'],
+                                       lease=options['lease'])
+            if sent or failed:
+                self.stdout.write(self.style.SUCCESS(
+                    f'Отправлено писем: {sent}, с ошибкой: {failed}'))
+                continue
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
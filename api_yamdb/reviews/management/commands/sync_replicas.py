@@ -0,0 +1,33 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    """Копирование основной базы SQLite в реплики для чтения."""
+
+    help = ('Копирует основную базу SQLite в файлы реплик DB_REPLICAS '
+            'через backup API. Нужна для проверки маршрутизации чтения '
+            'на одной машине: между запусками реплики отстают, как при '
+            'асинхронной репликации. Реплики PostgreSQL обновляет '
+            'потоковая репликация сервера.')
+
+    def handle(self, *args, **options):
+        primary = connections['default']
+        if primary.vendor != 'sqlite':
+            raise CommandError('Команда работает только с SQLite.')
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError('Реплики не настроены (DB_REPLICAS).')
+        primary.ensure_connection()
+        for alias in settings.DATABASE_REPLICAS:
+            replica = connections[alias]
+            replica.close()
+            target = sqlite3.connect(replica.settings_dict['NAME'])
+            try:
+                primary.connection.backup(target)
+            finally:
+                target.close()
+            self.stdout.write(self.style.SUCCESS(
+                f'{alias}: скопирована основная база.'))
@@ -0,0 +1,49 @@
+# Generated by Django 3.2.25 on 2026-10-18 16:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+from reviews.search import normalize, trigrams
+
+
+def fill_search_index(apps, schema_editor):
+    Title = apps.get_model('reviews', 'Title')
+    TitleTrigram = apps.get_model('reviews', 'TitleTrigram')
+    for title in Title.objects.only('id', 'name').iterator():
+        title.search_name = normalize(title.name)
+        title.save(update_fields=['search_name'])
+        TitleTrigram.objects.bulk_create(
+            TitleTrigram(title_id=title.id, trigram=trigram)
+            for trigram in trigrams(title.search_name))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0003_outgoingemail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='title',
+            name='search_name',
+            field=models.CharField(blank=True, editable=False, max_length=256, verbose_name='Название для поиска'),
+        ),
+        migrations.CreateModel(
+            name='TitleTrigram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trigram', models.CharField(max_length=3)),
+                ('title', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trigrams', to='reviews.title')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='titletrigram',
+            index=models.Index(fields=['trigram', 'title'], name='title_trigram_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='titletrigram',
+            constraint=models.UniqueConstraint(fields=('title', 'trigram'), name='unique_title_trigram'),
+        ),
+        migrations.RunPython(fill_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 3.2.25 on 2026-10-18 17:03
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+
+def fill_ranking(apps, schema_editor):
+    Review = apps.get_model('reviews', 'Review')
+    Title = apps.get_model('reviews', 'Title')
+    totals = Title.objects.aggregate(
+        total=Sum('rating_sum'), count=Sum('rating_count'))
+    if not totals['count']:
+        return
+    mean = totals['total'] / totals['count']
+    prior = settings.RANKING_PRIOR_VOTES
+    since = timezone.now() - timedelta(days=settings.RANKING_WINDOW_DAYS)
+    velocity = dict(
+        Review.objects.order_by().filter(pub_date__gte=since)
+        .values('title').annotate(count=Count('id'))
+        .values_list('title', 'count'))
+    titles = list(Title.objects.filter(rating_count__gt=0))
+    for title in titles:
+        title.weighted_rating = (
+            (title.rating_sum + prior * mean) / (title.rating_count + prior))
+        title.review_velocity = velocity.get(title.id, 0)
+    Title.objects.bulk_update(
+        titles, ['weighted_rating', 'review_velocity'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0007_title_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='title',
+            name='review_velocity',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Отзывов за последние дни'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='weighted_rating',
+            field=models.FloatField(blank=True, editable=False, null=True, verbose_name='Взвешенный рейтинг'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['-weighted_rating', 'id'], name='title_weighted_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['-review_velocity', 'id'], name='title_review_velocity_idx'),
+        ),
+        migrations.RunPython(fill_ranking, migrations.RunPython.noop),
+    ]
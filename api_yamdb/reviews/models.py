@@ -1,7 +1,21 @@
+from datetime import timedelta
+
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
+from django.core.cache import cache
 from django.core.validators import (MaxValueValidator, MinValueValidator,
                                     RegexValidator)
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import (Case, Count, ExpressionWrapper, F, FloatField,
+                              IntegerField, Max, OuterRef, Q, Subquery, Sum,
+                              Value, When)
+from django.db.models.functions import Cast, Coalesce
+from django.utils import timezone
+
+from reviews.search import normalize, trigrams
+
+RANKING_MEAN_KEY = 'ranking:mean'
+RANKING_MEAN_TIMEOUT = 600
 
 USER_ROLES = (
     ('user', 'Пользователь'),
@@ -80,13 +94,154 @@ class Title(models.Model):
         through='GenreTitle',
         verbose_name='Жанр',
         related_name='titles')
+    rating_sum = models.PositiveIntegerField(
+        verbose_name='Сумма оценок',
+        default=0)
+    rating_count = models.PositiveIntegerField(
+        verbose_name='Количество оценок',
+        default=0)
+    rating = models.FloatField(
+        verbose_name='Рейтинг',
+        null=True,
+        blank=True)
+    search_name = models.CharField(
+        max_length=256,
+        verbose_name='Название для поиска',
+        blank=True,
+        editable=False)
+    weighted_rating = models.FloatField(
+        verbose_name='Взвешенный рейтинг',
+        null=True,
+        blank=True,
+        editable=False)
+    review_velocity = models.PositiveIntegerField(
+        verbose_name='Отзывов за последние дни',
+        default=0,
+        editable=False)
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        """Обновляем поисковый индекс при изменении названия."""
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'name' not in update_fields:
+            return super().save(*args, **kwargs)
+        self.search_name = normalize(self.name)
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'search_name'}
+        super().save(*args, **kwargs)
+        TitleTrigram.reindex([self])
+
     class Meta:
         verbose_name = 'Произведение'
         verbose_name_plural = 'Произведения'
+        indexes = [
+            models.Index(fields=['year'], name='title_year_idx'),
+            # /titles/top/ и /titles/trending/ читают индекс по порядку.
+            models.Index(fields=['-weighted_rating', 'id'],
+                         name='title_weighted_rating_idx'),
+            models.Index(fields=['-review_velocity', 'id'],
+                         name='title_review_velocity_idx'),
+        ]
+
+    @classmethod
+    def update_rating(cls, title_id, score_delta, count_delta):
+        """Инкрементально обновляем сумму, количество оценок, рейтинг
+        и позицию произведения в /titles/top/ и /titles/trending/
+        одним UPDATE.
+
+        Вызывается внутри транзакции при создании, изменении и удалении
+        отзыва, поэтому рейтинг не приходится агрегировать при чтении.
+        Правые части SET в SQLite и PostgreSQL видят значения строки
+        до изменения, поэтому рейтинг считается по сумме и количеству
+        с уже прибавленными приращениями."""
+        if not score_delta and not count_delta:
+            return
+        rating_sum = F('rating_sum') + score_delta
+        rating_count = F('rating_count') + count_delta
+        cls.objects.filter(pk=title_id).update(
+            rating_sum=rating_sum,
+            rating_count=rating_count,
+            rating=Case(
+                When(rating_count=-count_delta, then=None),
+                default=ExpressionWrapper(
+                    Cast(rating_sum, FloatField()) / rating_count,
+                    output_field=FloatField()),
+                output_field=FloatField()),
+            **cls.ranking_values(score_delta=score_delta,
+                                 count_delta=count_delta))
+
+    @classmethod
+    def mean_score(cls, refresh=False):
+        """Средняя оценка по всем отзывам - априорное значение
+        байесовского рейтинга. Кешируется, чтобы запись отзыва не
+        агрегировала таблицу произведений каждый раз."""
+        mean = None if refresh else cache.get(RANKING_MEAN_KEY)
+        if mean is None:
+            totals = cls.objects.aggregate(
+                total=Sum('rating_sum'), count=Sum('rating_count'))
+            mean = (totals['total'] / totals['count']
+                    if totals['count'] else 0.0)
+            cache.set(RANKING_MEAN_KEY, mean, RANKING_MEAN_TIMEOUT)
+        return mean
+
+    @classmethod
+    def ranking_values(cls, mean=None, score_delta=0, count_delta=0):
+        """Выражения для UPDATE байесовского рейтинга
+        (sum + m * C) / (count + m) и числа отзывов за скользящее окно.
+        score_delta и count_delta - приращения суммы и количества
+        оценок, которые тот же UPDATE вносит в строку."""
+        if mean is None:
+            mean = cls.mean_score()
+        prior = settings.RANKING_PRIOR_VOTES
+        since = timezone.now() - timedelta(days=settings.RANKING_WINDOW_DAYS)
+        recent = (Review.objects.order_by()
+                  .filter(title=OuterRef('pk'), pub_date__gte=since)
+                  .values('title').annotate(count=Count('id'))
+                  .values('count'))
+        return {
+            'weighted_rating': Case(
+                When(rating_count=-count_delta, then=None),
+                default=ExpressionWrapper(
+                    (Cast(F('rating_sum') + score_delta, FloatField())
+                     + prior * mean)
+                    / (F('rating_count') + count_delta + prior),
+                    output_field=FloatField()),
+                output_field=FloatField()),
+            'review_velocity': Coalesce(
+                Subquery(recent, output_field=IntegerField()), 0),
+        }
+
+
+class TitleTrigram(models.Model):
+    """Триграммы названий произведений для поиска по подстроке."""
+
+    title = models.ForeignKey(
+        Title,
+        on_delete=models.CASCADE,
+        related_name='trigrams')
+    trigram = models.CharField(max_length=3)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['trigram', 'title'],
+                         name='title_trigram_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['title', 'trigram'],
+                name='unique_title_trigram'
+            )
+        ]
+
+    @classmethod
+    def reindex(cls, titles):
+        """Пересобираем триграммы произведений по их search_name."""
+        cls.objects.filter(title__in=titles).delete()
+        cls.objects.bulk_create(
+            cls(title_id=title.pk, trigram=trigram)
+            for title in titles for trigram in trigrams(title.search_name))
 
 
 class GenreTitle(models.Model):
@@ -95,6 +250,12 @@ class GenreTitle(models.Model):
     genre = models.ForeignKey(Genre, on_delete=models.CASCADE)
     title = models.ForeignKey(Title, on_delete=models.CASCADE)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['genre', 'title'],
+                         name='genre_title_genre_idx'),
+        ]
+
     def __str__(self):
         return f'{self.genre} {self.title}'
 
@@ -110,6 +271,8 @@ class User(AbstractUser):
     confirmation_code = models.CharField(max_length=200,
                                          verbose_name='Код подтверждения',
                                          blank=True)
+    token_version = models.PositiveIntegerField(
+        verbose_name='Версия токенов', default=0, editable=False)
 
     class Meta:
         """Уникальность полей в модели User."""
@@ -120,6 +283,9 @@ class User(AbstractUser):
                 name='unique_user'
             )
         ]
+        indexes = [
+            models.Index(fields=['role'], name='user_role_idx'),
+        ]
 
     @property
     def is_user(self):
@@ -137,6 +303,22 @@ class User(AbstractUser):
         return self.is_admin
 
 
+class ClaimsUser(User):
+    """Пользователь, собранный из claims access-токена без запроса к БД.
+
+    Содержит только id, username, role и is_superuser, поэтому
+    сохранять его запрещено."""
+
+    class Meta:
+        proxy = True
+
+    def save(self, *args, **kwargs):
+        raise TypeError('ClaimsUser нельзя сохранять в базу данных.')
+
+    def delete(self, *args, **kwargs):
+        raise TypeError('ClaimsUser нельзя удалять из базы данных.')
+
+
 class Review(models.Model):
     title = models.ForeignKey(
         Title,
@@ -177,11 +359,153 @@ class Review(models.Model):
                 name='unique_review'
             )
         ]
+        indexes = [
+            # Список отзывов: WHERE title_id = ? ORDER BY pub_date, id.
+            models.Index(fields=['title', 'pub_date', 'id'],
+                         name='review_title_pub_date_idx'),
+        ]
 
     def __str__(self):
         return self.text
 
 
+SCORES = range(1, 11)
+
+
+class TitleStats(models.Model):
+    """Гистограмма оценок и дата последнего отзыва произведения.
+
+    Обновляется инкрементально при записи отзывов, поэтому статистику
+    не приходится считать по таблице отзывов при чтении."""
+
+    title = models.OneToOneField(
+        Title,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Произведение'
+    )
+    score_1 = models.PositiveIntegerField(default=0)
+    score_2 = models.PositiveIntegerField(default=0)
+    score_3 = models.PositiveIntegerField(default=0)
+    score_4 = models.PositiveIntegerField(default=0)
+    score_5 = models.PositiveIntegerField(default=0)
+    score_6 = models.PositiveIntegerField(default=0)
+    score_7 = models.PositiveIntegerField(default=0)
+    score_8 = models.PositiveIntegerField(default=0)
+    score_9 = models.PositiveIntegerField(default=0)
+    score_10 = models.PositiveIntegerField(default=0)
+    last_review_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Дата последнего отзыва'
+    )
+
+    class Meta:
+        verbose_name = 'Статистика оценок'
+        verbose_name_plural = 'Статистика оценок'
+
+    def __str__(self):
+        return f'Статистика {self.title_id}'
+
+    @property
+    def histogram(self):
+        return {score: getattr(self, f'score_{score}') for score in SCORES}
+
+    @property
+    def count(self):
+        return sum(self.histogram.values())
+
+    @property
+    def mean(self):
+        count = self.count
+        if not count:
+            return None
+        return sum(score * number
+                   for score, number in self.histogram.items()) / count
+
+    @property
+    def median(self):
+        """Медиана по гистограмме: среднее двух центральных оценок."""
+        count = self.count
+        if not count:
+            return None
+        middle = []
+        seen = 0
+        for score, number in self.histogram.items():
+            seen += number
+            for position in {(count - 1) // 2, count // 2}:
+                if seen > position >= seen - number:
+                    middle.append(score)
+        return sum(middle) / len(middle)
+
+    @classmethod
+    def update_scores(cls, title_id, added=None, removed=None,
+                      pub_date=None):
+        """Сдвигаем счётчики оценок одним UPDATE.
+
+        added - оценка нового или изменённого отзыва, removed - оценка
+        удалённого или прежняя оценка изменённого. Если строки ещё нет
+        (первый отзыв на произведение), она строится по отзывам
+        произведения. Когда два первых отзыва записываются одновременно,
+        строку вставляет первая транзакция, а вторая получает
+        IntegrityError и применяет к этой строке свой UPDATE."""
+        changes = {}
+        if added == removed:
+            added = removed = None
+        if added is not None:
+            changes[f'score_{added}'] = F(f'score_{added}') + 1
+        if removed is not None:
+            changes[f'score_{removed}'] = F(f'score_{removed}') - 1
+        if pub_date is not None:
+            changes['last_review_at'] = Case(
+                When(last_review_at__gt=pub_date, then=F('last_review_at')),
+                default=Value(pub_date))
+        elif removed is not None and added is None:
+            changes['last_review_at'] = Subquery(
+                Review.objects.filter(title_id=OuterRef('title_id'))
+                .order_by('-pub_date').values('pub_date')[:1])
+        if not changes:
+            return
+        stats = cls.objects.filter(title_id=title_id)
+        if stats.update(**changes):
+            return
+        row = next(iter(cls.score_rows([title_id])), {})
+        row.pop('title', None)
+        try:
+            with transaction.atomic():
+                cls.objects.create(title_id=title_id, **row)
+        except IntegrityError:
+            stats.update(**changes)
+
+    @staticmethod
+    def score_rows(title_ids=None):
+        """Гистограмма и дата последнего отзыва по отзывам произведений
+        одним сгруппированным запросом."""
+        reviews = Review.objects.order_by()
+        if title_ids is not None:
+            reviews = reviews.filter(title_id__in=title_ids)
+        return reviews.values('title').annotate(
+            last_review_at=Max('pub_date'),
+            **{f'score_{score}': Count('id', filter=Q(score=score))
+               for score in SCORES})
+
+    @classmethod
+    def rebuild(cls, title_ids=None, batch_size=1000):
+        """Пересчитываем статистику одним сгруппированным запросом
+        по отзывам. Без title_ids пересчитываются все произведения."""
+        stats = cls.objects.all()
+        if title_ids is not None:
+            stats = stats.filter(title_id__in=title_ids)
+        objects = [
+            cls(title_id=row.pop('title'), **row)
+            for row in cls.score_rows(title_ids).iterator()]
+        stats.delete()
+        cls.objects.bulk_create(objects, batch_size=batch_size,
+                                ignore_conflicts=True)
+        return len(objects)
+
+
 class Comment(models.Model):
     review = models.ForeignKey(
         Review,
@@ -208,6 +532,64 @@ class Comment(models.Model):
         ordering = ['pub_date']
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            # Список комментариев: WHERE review_id = ? ORDER BY pub_date, id.
+            models.Index(fields=['review', 'pub_date', 'id'],
+                         name='comment_review_pub_date_idx'),
+        ]
 
     def __str__(self):
         return self.text
+
+
+class OutgoingEmail(models.Model):
+    """Письмо в очереди на отправку."""
+
+    subject = models.CharField(
+        max_length=200,
+        verbose_name='Тема'
+    )
+    body = models.TextField(
+        verbose_name='Текст письма'
+    )
+    from_email = models.CharField(
+        max_length=254,
+        verbose_name='Отправитель',
+        blank=True
+    )
+    recipient = models.EmailField(
+        verbose_name='Получатель'
+    )
+    created = models.DateTimeField(
+        verbose_name='Дата постановки в очередь',
+        auto_now_add=True
+    )
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name='Количество попыток',
+        default=0
+    )
+    next_attempt_at = models.DateTimeField(
+        verbose_name='Следующая попытка',
+        default=timezone.now
+    )
+    sent_at = models.DateTimeField(
+        verbose_name='Дата отправки',
+        null=True,
+        blank=True
+    )
+    last_error = models.TextField(
+        verbose_name='Последняя ошибка',
+        blank=True
+    )
+
+    class Meta:
+        ordering = ['id']
+        verbose_name = 'Письмо'
+        verbose_name_plural = 'Очередь писем'
+        indexes = [
+            models.Index(fields=['sent_at', 'next_attempt_at'],
+                         name='outgoing_email_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.subject} -> {self.recipient}'
@@ -0,0 +1,87 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from reviews.models import OutgoingEmail
+
+UPDATE_FIELDS = ('attempts', 'next_attempt_at', 'sent_at', 'last_error')
+
+
+def enqueue_mail(subject, body, from_email, recipient):
+    """Ставим письмо в очередь вместо синхронной отправки по SMTP.
+
+    С настройкой EMAIL_QUEUE_EAGER письмо отправляется сразу после
+    фиксации транзакции."""
+    email = OutgoingEmail.objects.create(
+        subject=subject, body=body, from_email=from_email or '',
+        recipient=recipient)
+    if getattr(settings, 'EMAIL_QUEUE_EAGER', False):
+        transaction.on_commit(lambda: send_queued(pks=[email.pk]))
+    return email
+
+
+def mark_failed(email, error, now, backoff):
+    """Откладываем следующую попытку с экспоненциальной задержкой."""
+    email.attempts += 1
+    email.last_error = str(error)
+    email.next_attempt_at = now + timedelta(
+        seconds=backoff * 2 ** (email.attempts - 1))
+
+
+def claim(queue, batch_size, now, lease):
+    """Забираем пачку писем короткой транзакцией: next_attempt_at
+    сдвигается на lease секунд, и другие отправители их пропускают.
+    Если процесс упадёт до отметки об отправке, письма снова попадут
+    в очередь по истечении lease."""
+    with transaction.atomic():
+        emails = list(queue.select_for_update(skip_locked=True)
+                      .order_by('id')[:batch_size])
+        for email in emails:
+            email.next_attempt_at = now + timedelta(seconds=lease)
+        OutgoingEmail.objects.bulk_update(emails, ['next_attempt_at'])
+    return emails
+
+
+def send_queued(batch_size=100, max_attempts=5, backoff=60, pks=None,
+                lease=300):
+    """Отправляем пачку писем из очереди через одно SMTP-соединение.
+
+    Письма забираются и отмечаются отправленными в двух коротких
+    транзакциях, а SMTP-обмен идёт между ними без блокировок в базе.
+    Возвращает количество отправленных и неотправленных писем."""
+    now = timezone.now()
+    queue = OutgoingEmail.objects.filter(
+        sent_at__isnull=True, attempts__lt=max_attempts,
+        next_attempt_at__lte=now)
+    if pks is not None:
+        queue = queue.filter(pk__in=pks)
+    emails = claim(queue, batch_size, now, lease)
+    if not emails:
+        return 0, 0
+    sent = 0
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as error:
+        for email in emails:
+            mark_failed(email, error, now, backoff)
+    else:
+        for email in emails:
+            message = EmailMessage(email.subject, email.body,
+                                   email.from_email or None,
+                                   [email.recipient], connection=connection)
+            try:
+                message.send()
+            except Exception as error:
+                mark_failed(email, error, now, backoff)
+                continue
+            email.attempts += 1
+            email.sent_at = timezone.now()
+            sent += 1
+        connection.close()
+    with transaction.atomic():
+        OutgoingEmail.objects.bulk_update(emails, UPDATE_FIELDS)
+    return sent, len(emails) - sent
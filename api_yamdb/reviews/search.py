@@ -0,0 +1,9 @@
+def normalize(text):
+    """Приводим строку к виду для поиска: нижний регистр, одиночные
+    пробелы."""
+    return ' '.join(text.casefold().split())
+
+
+def trigrams(text):
+    """Множество триграмм нормализованной строки."""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
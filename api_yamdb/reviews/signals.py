@@ -0,0 +1,5 @@
+from django.dispatch import Signal
+
+# Отправляется массовыми операциями (bulk_create, update), которые
+# не вызывают post_save и post_delete для отдельных объектов.
+catalogue_changed = Signal()
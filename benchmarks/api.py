@@ -0,0 +1,434 @@
+"""Нагрузочный бенчмарк эндпоинтов api.
+
+Наполняет базу синтетическим каталогом на нескольких масштабах и
+прогоняет сценарии через тестовый клиент Django, настоящий
+WSGI-сервер в фоновом потоке и ASGI-сервер на asyncio с асинхронными
+вьюхами чтения. Результат - JSON с p50/p95/p99, пропускной
+способностью и средним числом SQL-запросов на запрос, который можно
+сравнивать между коммитами. Сеть не нужна.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.api --scales small medium --requests 200 \\
+        --output bench.json
+
+Сравнение WSGI и ASGI при большом числе параллельных клиентов:
+
+    python -m benchmarks.api --drivers wsgi asgi --concurrency 64 \\
+        --scenarios titles_list reviews_list comments_list
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import sqlite3
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.client import HTTPConnection
+from http import HTTPStatus
+from itertools import count
+from types import ModuleType
+from urllib.parse import unquote, urlencode
+
+from benchmarks.common import dump, setup_django, summarize
+from benchmarks.seed import SCALES, seed_catalogue, seed_users
+
+DRIVERS = ('client', 'wsgi', 'asgi')
+
+
+class ClientDriver:
+    """Запросы через тестовый клиент Django, без сети."""
+
+    concurrent = False
+
+    def __init__(self):
+        from rest_framework.test import APIClient
+
+        self.client = APIClient()
+
+    def request(self, method, path, data=None, token=None):
+        extra = {'HTTP_AUTHORIZATION': f'Bearer {token}'} if token else {}
+        if method == 'GET':
+            return self.client.get(path, **extra).status_code
+        return self.client.post(
+            path, data=data, format='json', **extra).status_code
+
+    def close(self):
+        pass
+
+
+class HTTPDriver:
+    """Запросы по HTTP к серверу в фоновом потоке.
+
+    На каждый запрос открывается новое соединение, как у клиента
+    без keep-alive."""
+
+    concurrent = True
+
+    def request(self, method, path, data=None, token=None):
+        headers = {'Content-Type': 'application/json'}
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+        body = None if data is None else json.dumps(data)
+        connection = HTTPConnection(self.host, self.port, timeout=60)
+        try:
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            return response.status
+        finally:
+            connection.close()
+
+
+class WSGIDriver(HTTPDriver):
+    """WSGI-сервер Django с потоком на каждое соединение."""
+
+    def __init__(self):
+        from django.core.servers.basehttp import (
+            ThreadedWSGIServer, WSGIRequestHandler,
+            get_internal_wsgi_application)
+
+        class QuietHandler(WSGIRequestHandler):
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadedWSGIServer(('127.0.0.1', 0), QuietHandler)
+        self.server.set_app(get_internal_wsgi_application())
+        self.host, self.port = self.server.server_address[:2]
+        threading.Thread(target=self.server.serve_forever,
+                         daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def async_urlconf():
+    """Корневые маршруты с асинхронными вьюхами чтения api."""
+    from django.urls import include, path
+
+    from api.urls import get_urlpatterns
+
+    urlconf = ModuleType('async_urls')
+    urlconf.urlpatterns = [
+        path('api/', include((get_urlpatterns(async_reads=True), 'api'),
+                             namespace='api')),
+    ]
+    return urlconf
+
+
+class ASGIDriver(HTTPDriver):
+    """Минимальный HTTP/1.1-сервер на asyncio с ASGI-приложением Django.
+
+    Все соединения обслуживает один цикл событий; асинхронные вьюхи
+    выполняют блокирующие вызовы в пуле потоков api.asynchronous.
+    Маршруты с асинхронным чтением подключаются через request.urlconf,
+    поэтому WSGI-драйвер в том же процессе работает с обычными."""
+
+    def __init__(self):
+        from django.core.handlers.asgi import ASGIRequest
+
+        from api.asynchronous import ASGIHandler
+
+        class Request(ASGIRequest):
+            urlconf = async_urlconf()
+
+        class Handler(ASGIHandler):
+            request_class = Request
+
+        self.app = Handler()
+        self.loop = asyncio.new_event_loop()
+        self.server = self.loop.run_until_complete(asyncio.start_server(
+            self.handle, '127.0.0.1', 0, backlog=1024))
+        self.host, self.port = self.server.sockets[0].getsockname()[:2]
+        self.thread = threading.Thread(target=self.loop.run_forever,
+                                       daemon=True)
+        self.thread.start()
+
+    async def handle(self, reader, writer):
+        try:
+            method, target, _ = (await reader.readline()).decode(
+                'latin-1').split()
+            headers = []
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, value = line.decode('latin-1').split(':', 1)
+                headers.append((name.strip().lower().encode('latin-1'),
+                                value.strip().encode('latin-1')))
+            length = int(dict(headers).get(b'content-length', 0))
+            body = await reader.readexactly(length) if length else b''
+            path, _, query = target.partition('?')
+            scope = {
+                'type': 'http', 'asgi': {'version': '3.0'},
+                'http_version': '1.1', 'method': method, 'scheme': 'http',
+                'path': unquote(path), 'raw_path': path.encode(),
+                'query_string': query.encode(), 'root_path': '',
+                'headers': headers, 'server': (self.host, self.port),
+                'client': writer.get_extra_info('peername')[:2],
+            }
+            messages = [{'type': 'http.request', 'body': body}]
+
+            async def receive():
+                if messages:
+                    return messages.pop()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    status = message['status']
+                    lines = [f'HTTP/1.1 {status} '
+                             f'{HTTPStatus(status).phrase}'.encode()]
+                    lines.extend(b'%s: %s' % header
+                                 for header in message['headers'])
+                    lines.append(b'Connection: close')
+                    writer.write(b'\r\n'.join(lines) + b'\r\n\r\n')
+                else:
+                    writer.write(message.get('body', b''))
+
+            await self.app(scope, receive, send)
+            await writer.drain()
+        finally:
+            writer.close()
+
+    def close(self):
+        async def stop():
+            self.server.close()
+            await self.server.wait_closed()
+            # Обработчики соединений дописывают ответы и закрывают их;
+            # зависшие отменяем, чтобы не закрыть цикл с живыми задачами.
+            tasks = asyncio.all_tasks() - {asyncio.current_task()}
+            if tasks:
+                _, pending = await asyncio.wait(tasks, timeout=5)
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+            await self.loop.shutdown_asyncgens()
+
+        asyncio.run_coroutine_threadsafe(stop(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+
+def titles_list(context, rng, total):
+    return [('GET', f'/api/v1/titles/?page={rng.randint(1, 20)}')
+            for _ in range(total)]
+
+
+def titles_filter(context, rng, total):
+    from benchmarks.search import QUERIES
+
+    filters = (
+        lambda: {'genre': f'genre-{rng.randrange(30)}'},
+        lambda: {'category': f'category-{rng.randrange(10)}'},
+        lambda: {'year': rng.randint(1900, 2020)},
+        lambda: {'name': rng.choice(QUERIES)},
+    )
+    return [('GET', f'/api/v1/titles/?{urlencode(rng.choice(filters)())}')
+            for _ in range(total)]
+
+
+def reviews_list(context, rng, total):
+    return [('GET', f'/api/v1/titles/{rng.choice(context["reviews"])[1]}'
+                    f'/reviews/')
+            for _ in range(total)]
+
+
+def reviews_create(context, rng, total):
+    """Каждый новый автор пишет один отзыв, поэтому unique_review
+    не срабатывает."""
+    from api.authentication import get_token_for_user
+    from reviews.models import User
+
+    writers = User.objects.filter(pk__in=seed_users(total, rng))
+    return [('POST', f'/api/v1/titles/{rng.choice(context["titles"])}'
+                     f'/reviews/',
+             {'text': 'Бенчмарк', 'score': rng.randint(1, 10)},
+             str(get_token_for_user(writer)))
+            for writer in writers]
+
+
+def comments_list(context, rng, total):
+    requests = []
+    for _ in range(total):
+        review_id, title_id = rng.choice(context['reviews'])
+        requests.append(
+            ('GET', f'/api/v1/titles/{title_id}/reviews/{review_id}'
+                    f'/comments/'))
+    return requests
+
+
+def auth_signup(context, rng, total):
+    prefix = f'signup{next(context["runs"])}x'
+    context['signup_prefix'] = prefix
+    return [('POST', '/api/v1/auth/signup/',
+             {'username': f'{prefix}{number}',
+              'email': f'{prefix}{number}@yamdb.fake'})
+            for number in range(total)]
+
+
+def auth_token(context, rng, total):
+    """Коды подтверждения считаем заранее, вне замера."""
+    from django.contrib.auth.tokens import default_token_generator
+    from reviews.models import User
+
+    users = User.objects.filter(
+        username__startswith=context['signup_prefix'])[:total]
+    return [('POST', '/api/v1/auth/token/',
+             {'username': user.username,
+              'confirmation_code': default_token_generator.make_token(user)})
+            for user in users]
+
+
+SCENARIOS = {
+    'titles_list': titles_list,
+    'titles_filter': titles_filter,
+    'reviews_list': reviews_list,
+    'reviews_create': reviews_create,
+    'comments_list': comments_list,
+    'auth_signup': auth_signup,
+    'auth_token': auth_token,
+}
+
+
+def mean_queries():
+    """Среднее число SQL-запросов по данным ProfilingMiddleware."""
+    from api.profiling import registry
+
+    histograms = [histogram for (metric, _), histogram
+                  in registry.histograms.items() if metric == 'queries']
+    total = sum(histogram.count for histogram in histograms)
+    if not total:
+        return None
+    return round(sum(histogram.sum for histogram in histograms) / total, 2)
+
+
+def queries_by_alias(requests):
+    """Среднее число SQL-запросов на запрос по алиасам баз данных."""
+    from api.profiling import registry
+
+    totals = {}
+    for (_, alias), total in registry.alias_queries.items():
+        totals[alias] = totals.get(alias, 0) + total
+    return {alias: round(total / requests, 2)
+            for alias, total in sorted(totals.items())} if requests else {}
+
+
+def run_scenario(driver, requests, concurrency):
+    from api.profiling import registry
+
+    def send(request):
+        started = time.perf_counter()
+        status = driver.request(*request)
+        return (time.perf_counter() - started) * 1000, status
+
+    registry.reset()
+    started = time.perf_counter()
+    if driver.concurrent and concurrency > 1:
+        with ThreadPoolExecutor(concurrency) as pool:
+            results = list(pool.map(send, requests))
+    else:
+        results = [send(request) for request in requests]
+    elapsed = time.perf_counter() - started
+    result = summarize([timing for timing, _ in results], elapsed)
+    result['requests'] = len(results)
+    result['errors'] = sum(status >= 400 for _, status in results)
+    result['queries_mean'] = mean_queries()
+    result['queries_by_alias'] = queries_by_alias(len(results))
+    return result
+
+
+def run_driver(name, context, args):
+    from django.core.cache import caches
+
+    for cache in caches.all():
+        cache.clear()
+    driver = {'client': ClientDriver, 'wsgi': WSGIDriver,
+              'asgi': ASGIDriver}[name]()
+    rng = random.Random(args.seed)
+    try:
+        for request in titles_list(context, rng, args.warmup):
+            driver.request(*request)
+        return {
+            scenario: run_scenario(
+                driver, SCENARIOS[scenario](context, rng, args.requests),
+                args.concurrency)
+            for scenario in args.scenarios
+        }
+    finally:
+        driver.close()
+
+
+def metadata(args):
+    import django
+    from django.conf import settings
+
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+            check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'requests': args.requests,
+        'concurrency': args.concurrency,
+        'async_workers': settings.ASYNC_EXECUTOR_WORKERS,
+        'seed': args.seed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', nargs='+', choices=list(SCALES),
+                        default=['small', 'medium'])
+    parser.add_argument('--drivers', nargs='+', choices=DRIVERS,
+                        default=list(DRIVERS))
+    parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS),
+                        default=list(SCENARIOS))
+    parser.add_argument('--requests', type=int, default=200,
+                        help='Запросов в каждом сценарии.')
+    parser.add_argument('--concurrency', type=int, default=1,
+                        help='Параллельных клиентов для WSGI- и '
+                             'ASGI-серверов.')
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output')
+    args = parser.parse_args()
+    if 'auth_token' in args.scenarios and 'auth_signup' not in args.scenarios:
+        parser.error('Сценарий auth_token использует пользователей '
+                     'из auth_signup.')
+
+    setup_django()
+    from django.conf import settings
+    from django.core.management import call_command
+
+    # Число запросов к базе собирает ProfilingMiddleware.
+    settings.PROFILING_SAMPLE_RATE = 1
+    settings.PROFILING_QUERY_BUDGET = None
+    results = {'meta': metadata(args), 'results': {}}
+    for scale in args.scales:
+        call_command('flush', interactive=False, verbosity=0)
+        started = time.perf_counter()
+        context = seed_catalogue(scale, random.Random(args.seed))
+        context['runs'] = count()
+        results['results'][scale] = {
+            'seed_seconds': round(time.perf_counter() - started, 2),
+            **{driver: run_driver(driver, context, args)
+               for driver in args.drivers},
+        }
+    dump(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
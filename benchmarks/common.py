@@ -0,0 +1,65 @@
+"""Общая подготовка окружения для бенчмарков."""
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent / 'api_yamdb'
+sys.path.insert(0, str(PROJECT_DIR))
+
+
+def setup_django(db_path=None):
+    """Настраиваем Django на чистой временной базе и применяем миграции."""
+    import django
+    from django.core.management import call_command
+
+    if db_path is None:
+        db_path = os.path.join(tempfile.mkdtemp(prefix='yamdb-bench-'),
+                               'bench.sqlite3')
+    os.environ['BENCH_DB_PATH'] = str(db_path)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+    django.setup()
+    call_command('migrate', verbosity=0)
+    return db_path
+
+
+def measure(func, repeat):
+    """Время выполнения func в миллисекундах: p50, p95, p99 и среднее."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return summarize(timings)
+
+
+def summarize(timings, elapsed=None):
+    """Перцентили по списку времён в миллисекундах и, если известно
+    общее время прогона в секундах, пропускная способность."""
+    timings = sorted(timings)
+    result = {
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'p99_ms': round(percentile(timings, 99), 3),
+        'mean_ms': round(statistics.mean(timings), 3),
+    }
+    if elapsed:
+        result['throughput_rps'] = round(len(timings) / elapsed, 1)
+    return result
+
+
+def percentile(sorted_values, percent):
+    index = min(len(sorted_values) - 1,
+                int(round(percent / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def dump(results, output=None):
+    """Печатаем результаты в JSON и при необходимости сохраняем в файл."""
+    text = json.dumps(results, ensure_ascii=False, indent=2)
+    print(text)
+    if output:
+        Path(output).write_text(text + '\n', encoding='utf-8')
@@ -0,0 +1,108 @@
+"""Пропускная способность параллельной записи отзывов по профилям базы.
+
+Каждый профиль запускается в отдельном процессе со своими переменными
+окружения (api_yamdb/database.py): база создаётся заново, писатели
+параллельно создают отзывы через WSGI-сервер. Профиль postgresql
+использует DB_NAME, POSTGRES_USER, POSTGRES_PASSWORD, DB_HOST и DB_PORT
+из окружения и очищает эту базу, поэтому нужна отдельная база.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.database --profiles sqlite-default sqlite-tuned \\
+        --writers 16 --reviews 1000
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+
+from benchmarks.common import dump, setup_django
+
+PROFILES = {
+    # Настройки SQLite и Django по умолчанию: журнал отката,
+    # synchronous=FULL, соединение на каждый запрос.
+    'sqlite-default': {
+        'DB_ENGINE': 'sqlite', 'DB_CONN_MAX_AGE': '0',
+        'DB_HEALTH_CHECKS': 'False', 'SQLITE_JOURNAL_MODE': '',
+        'SQLITE_SYNCHRONOUS': '', 'SQLITE_BUSY_TIMEOUT': '',
+        'SQLITE_MMAP_SIZE': '',
+    },
+    # Профиль по умолчанию: WAL, synchronous=NORMAL, busy_timeout,
+    # mmap и постоянные соединения.
+    'sqlite-tuned': {'DB_ENGINE': 'sqlite'},
+    'postgresql-default': {
+        'DB_ENGINE': 'postgresql', 'DB_CONN_MAX_AGE': '0',
+        'DB_HEALTH_CHECKS': 'False',
+    },
+    'postgresql-persistent': {'DB_ENGINE': 'postgresql'},
+}
+
+
+def run_profile(args):
+    """Выполняется в дочернем процессе с переменными окружения профиля."""
+    setup_django()
+    from django.conf import settings
+    from django.core.management import call_command
+
+    from api.database import check_databases
+    from benchmarks.api import WSGIDriver, reviews_create, run_scenario
+    from benchmarks.seed import seed_catalogue
+
+    settings.PROFILING_SAMPLE_RATE = 1
+    settings.PROFILING_QUERY_BUDGET = None
+    call_command('flush', interactive=False, verbosity=0)
+    rng = random.Random(args.seed)
+    context = seed_catalogue('small', rng)
+    driver = WSGIDriver()
+    try:
+        result = run_scenario(
+            driver, reviews_create(context, rng, args.reviews),
+            args.writers)
+    finally:
+        driver.close()
+    result['database'] = check_databases()['default']
+    result['sqlite_pragmas'] = settings.SQLITE_PRAGMAS
+    print(json.dumps(result))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profiles', nargs='+', choices=list(PROFILES),
+                        default=['sqlite-default', 'sqlite-tuned'])
+    parser.add_argument('--writers', type=int, default=16,
+                        help='Параллельных писателей.')
+    parser.add_argument('--reviews', type=int, default=1000,
+                        help='Отзывов в каждом профиле.')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output')
+    parser.add_argument('--run', choices=list(PROFILES),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.run:
+        return run_profile(args)
+
+    results = {'meta': {'writers': args.writers, 'reviews': args.reviews,
+                        'seed': args.seed},
+               'results': {}}
+    for profile in args.profiles:
+        command = [sys.executable, '-m', 'benchmarks.database',
+                   '--run', profile, '--writers', str(args.writers),
+                   '--reviews', str(args.reviews), '--seed', str(args.seed)]
+        finished = subprocess.run(
+            command, env={**os.environ, **PROFILES[profile]},
+            capture_output=True, text=True)
+        if finished.returncode:
+            results['results'][profile] = {
+                'error': finished.stderr.strip().splitlines()[-1:]}
+            continue
+        results['results'][profile] = json.loads(
+            finished.stdout.strip().splitlines()[-1])
+    dump(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Сравнение JSONRenderer/JSONParser DRF и FastJSONRenderer/FastJSONParser
+на страницах произведений с жанрами и отзывов с датами.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.render --page-sizes 10 100 1000
+"""
+import argparse
+import random
+from io import BytesIO
+
+from benchmarks.common import dump, measure, setup_django
+from benchmarks.seed import seed_catalogue
+
+
+def pages(page_size):
+    """Данные страниц так, как их отдают вьюсеты."""
+    from api.serializers import ReviewSerializer, TitleGETSerializer
+    from reviews.models import Review, Title
+
+    titles = Title.objects.select_related('category').prefetch_related(
+        'genre').order_by('id')[:page_size]
+    reviews = Review.objects.select_related('title', 'author').order_by(
+        'pub_date', 'id')[:page_size]
+    return {
+        'titles': {'results': TitleGETSerializer(titles, many=True).data},
+        'reviews': {'results': ReviewSerializer(reviews, many=True).data},
+    }
+
+
+def compare(data, repeat):
+    from rest_framework.parsers import JSONParser
+    from rest_framework.renderers import JSONRenderer
+
+    from api.parsers import FastJSONParser
+    from api.renderers import FastJSONRenderer
+
+    rendered = JSONRenderer().render(data)
+    return {
+        'bytes': len(rendered),
+        'identical': FastJSONRenderer().render(data) == rendered,
+        'render_json': measure(lambda: JSONRenderer().render(data), repeat),
+        'render_fast': measure(
+            lambda: FastJSONRenderer().render(data), repeat),
+        'parse_json': measure(
+            lambda: JSONParser().parse(BytesIO(rendered)), repeat),
+        'parse_fast': measure(
+            lambda: FastJSONParser().parse(BytesIO(rendered)), repeat),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--page-sizes', type=int, nargs='+',
+                        default=[10, 100, 1000])
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    setup_django()
+    seed_catalogue('small', random.Random(args.seed))
+    from api import renderers
+
+    results = {'orjson': getattr(renderers.orjson, '__version__', None)}
+    for page_size in args.page_sizes:
+        results[page_size] = {
+            name: compare(data, args.repeat)
+            for name, data in pages(page_size).items()}
+    dump(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""Сравнение фильтрации произведений через icontains и индекс триграмм.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.search --sizes 10000 100000 1000000
+"""
+import argparse
+import random
+
+from benchmarks.common import dump, measure, setup_django
+
+SYLLABLES = ('ба', 'ко', 'ри', 'ма', 'те', 'ло', 'ну', 'ша', 'ви', 'до',
+             'ka', 'ro', 'mi', 'te', 'su', 'na', 'lo', 'zi')
+QUERIES = ('коришате', 'мало', 'ka ro', 'суна', 'ва', 'шаласу')
+
+
+def random_name(rng):
+    words = (''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+             for _ in range(rng.randint(1, 4)))
+    return ' '.join(words).capitalize()
+
+
+def seed_titles(count, rng, batch_size=5000):
+    """Быстро добавляем произведения вместе с их триграммами."""
+    from reviews.models import Category, Genre, GenreTitle, Title, TitleTrigram
+    from reviews.search import normalize
+
+    if not Category.objects.exists():
+        Category.objects.bulk_create(
+            Category(name=f'Категория {i}', slug=f'category-{i}')
+            for i in range(10))
+        Genre.objects.bulk_create(
+            Genre(name=f'Жанр {i}', slug=f'genre-{i}') for i in range(30))
+    categories = list(Category.objects.values_list('id', flat=True))
+    genres = list(Genre.objects.values_list('id', flat=True))
+    next_id = (Title.objects.order_by('-id').values_list(
+        'id', flat=True).first() or 0) + 1
+    for start in range(0, count, batch_size):
+        titles = []
+        for _ in range(min(batch_size, count - start)):
+            name = random_name(rng)
+            titles.append(Title(id=next_id, name=name,
+                                search_name=normalize(name),
+                                year=rng.randint(1900, 2020),
+                                category_id=rng.choice(categories)))
+            next_id += 1
+        Title.objects.bulk_create(titles)
+        TitleTrigram.reindex(titles)
+        GenreTitle.objects.bulk_create(
+            GenreTitle(title_id=title.pk, genre_id=genre)
+            for title in titles for genre in rng.sample(genres, 2))
+
+
+def run_queries(repeat):
+    from api.filters import TitleFilter
+    from reviews.models import Title
+
+    results = {}
+    for query in QUERIES:
+        def legacy():
+            queryset = Title.objects.filter(name__icontains=query)
+            queryset.count()
+            list(queryset.order_by('id')[:10])
+
+        def indexed():
+            queryset = TitleFilter(
+                {'name': query}, queryset=Title.objects.all()).qs
+            queryset.count()
+            list(queryset.order_by('id')[:10])
+
+        results[query] = {
+            'icontains': measure(legacy, repeat),
+            'trigram_index': measure(indexed, repeat),
+        }
+
+    def legacy_genre():
+        queryset = Title.objects.filter(genre__slug__icontains='genre-1')
+        queryset.count()
+        list(queryset.order_by('id')[:10])
+
+    def indexed_genre():
+        queryset = TitleFilter(
+            {'genre': 'genre-1'}, queryset=Title.objects.all()).qs
+        queryset.count()
+        list(queryset.order_by('id')[:10])
+
+    results['genre=genre-1'] = {
+        'icontains': measure(legacy_genre, repeat),
+        'slug_index': measure(indexed_genre, repeat),
+    }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[10000, 100000, 1000000])
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    setup_django()
+    rng = random.Random(args.seed)
+    results = {}
+    seeded = 0
+    for size in sorted(args.sizes):
+        seed_titles(size - seeded, rng)
+        seeded = size
+        results[size] = run_queries(args.repeat)
+    dump(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
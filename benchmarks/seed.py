@@ -0,0 +1,81 @@
+"""Быстрое наполнение базы синтетическим каталогом для бенчмарков."""
+from io import StringIO
+
+from benchmarks.search import seed_titles
+
+SCALES = {
+    'small': {'users': 200, 'titles': 1000, 'reviews': 5000,
+              'comments': 5000},
+    'medium': {'users': 2000, 'titles': 10000, 'reviews': 50000,
+               'comments': 50000},
+    'large': {'users': 20000, 'titles': 100000, 'reviews': 500000,
+              'comments': 500000},
+}
+
+
+def next_id(model):
+    return (model.objects.order_by('-id').values_list(
+        'id', flat=True).first() or 0) + 1
+
+
+def seed_users(count, rng, batch_size=5000):
+    from reviews.models import User
+
+    start = next_id(User)
+    User.objects.bulk_create(
+        (User(id=pk, username=f'bench{pk}', email=f'bench{pk}@yamdb.fake',
+              password='!', role='user')
+         for pk in range(start, start + count)),
+        batch_size=batch_size)
+    return list(range(start, start + count))
+
+
+def seed_reviews(count, rng, users, titles, batch_size=5000):
+    """Отзывы с уникальными парами (произведение, автор)."""
+    from reviews.models import Review
+
+    pairs = set(Review.objects.values_list('title_id', 'author_id'))
+    pk = next_id(Review)
+    reviews = []
+    limit = min(count, len(users) * len(titles) - len(pairs))
+    while len(reviews) < limit:
+        pair = (rng.choice(titles), rng.choice(users))
+        if pair in pairs:
+            continue
+        pairs.add(pair)
+        reviews.append(Review(id=pk, title_id=pair[0], author_id=pair[1],
+                              text=f'Отзыв {pk}', score=rng.randint(1, 10)))
+        pk += 1
+    Review.objects.bulk_create(reviews, batch_size=batch_size)
+    return [(review.id, review.title_id) for review in reviews]
+
+
+def seed_comments(count, rng, users, reviews, batch_size=5000):
+    from reviews.models import Comment
+
+    start = next_id(Comment)
+    Comment.objects.bulk_create(
+        (Comment(id=pk, review_id=rng.choice(reviews)[0],
+                 author_id=rng.choice(users), text=f'Комментарий {pk}')
+         for pk in range(start, start + count)),
+        batch_size=batch_size)
+
+
+def seed_catalogue(scale, rng):
+    """Наполняем пустую базу и пересчитываем денормализованные данные.
+
+    Возвращает id пользователей, произведений и пары (отзыв,
+    произведение) для построения запросов."""
+    from django.core.management import call_command
+    from reviews.models import Title
+
+    sizes = SCALES[scale]
+    users = seed_users(sizes['users'], rng)
+    seed_titles(sizes['titles'], rng)
+    titles = list(Title.objects.values_list('id', flat=True))
+    reviews = seed_reviews(sizes['reviews'], rng, users, titles)
+    seed_comments(sizes['comments'], rng, users, reviews)
+    for command in ('rebuild_ratings', 'rebuild_title_stats',
+                    'rebuild_rankings'):
+        call_command(command, stdout=StringIO())
+    return {'users': users, 'titles': titles, 'reviews': reviews}
@@ -0,0 +1,11 @@
+"""Настройки для бенчмарков: отдельная база, без отладки."""
+import os
+
+from api_yamdb.database import database_config
+from api_yamdb.settings import *  # noqa: F401,F403
+
+DEBUG = False
+
+DATABASES = {
+    'default': database_config(os.getenv('BENCH_DB_PATH', 'bench.sqlite3')),
+}
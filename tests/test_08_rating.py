@@ -0,0 +1,61 @@
+from http import HTTPStatus
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from reviews.models import Review, Title
+from tests.utils import create_reviews
+
+
+@pytest.mark.django_db(transaction=True)
+class Test08RatingAPI:
+
+    def test_01_rating_follows_review_changes(self, admin_client, admin,
+                                              user_client, user):
+        author_map = {admin: admin_client, user: user_client}
+        reviews, titles = create_reviews(admin_client, author_map)
+        title_id = titles[0]['id']
+        url = f'/api/v1/titles/{title_id}/reviews/'
+
+        title = Title.objects.get(pk=title_id)
+        assert (title.rating_sum, title.rating_count) == (10, 2), (
+            'Проверьте, что при создании отзыва обновляются сумма и '
+            'количество оценок произведения.'
+        )
+
+        response = user_client.patch(
+            f'{url}{reviews[1]["id"]}/', data={'score': 9})
+        assert response.status_code == HTTPStatus.OK
+        response = admin_client.get(f'/api/v1/titles/{title_id}/')
+        assert response.json().get('rating') == 7, (
+            'Проверьте, что при изменении оценки отзыва пересчитывается '
+            'рейтинг произведения.'
+        )
+
+        admin_client.delete(f'{url}{reviews[0]["id"]}/')
+        user_client.delete(f'{url}{reviews[1]["id"]}/')
+        response = admin_client.get(f'/api/v1/titles/{title_id}/')
+        assert response.json().get('rating') is None, (
+            'Проверьте, что после удаления всех отзывов рейтинг '
+            'произведения равен `None`.'
+        )
+
+    def test_02_rebuild_ratings_command(self, admin_client, admin,
+                                        user_client, user):
+        author_map = {admin: admin_client, user: user_client}
+        _, titles = create_reviews(admin_client, author_map)
+        title_id = titles[0]['id']
+        Review.objects.filter(title_id=title_id).update(score=1)
+
+        with pytest.raises(CommandError):
+            call_command('rebuild_ratings', '--check')
+        call_command('rebuild_ratings')
+        call_command('rebuild_ratings', '--check')
+
+        title = Title.objects.get(pk=title_id)
+        assert (title.rating_sum, title.rating_count, title.rating) == (
+            2, 2, 1.0
+        ), (
+            'Проверьте, что команда `rebuild_ratings` пересчитывает '
+            'агрегаты рейтинга по отзывам.'
+        )
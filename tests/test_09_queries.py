@@ -0,0 +1,55 @@
+import pytest
+
+from reviews.models import Comment, Genre, Review, Title
+from tests.utils import check_constant_queries, create_comments
+
+
+@pytest.mark.django_db(transaction=True)
+class Test09QueriesAPI:
+
+    def test_01_titles_list_queries(self, client, admin_client, admin,
+                                    user_client, user):
+        _, _, titles = create_comments(
+            admin_client, {admin: admin_client, user: user_client})
+        title = Title.objects.get(pk=titles[0]['id'])
+        genres = list(Genre.objects.all())
+
+        def add_titles():
+            for idx in range(8):
+                new_title = Title.objects.create(
+                    name=f'title {idx}', year=2000,
+                    category=title.category)
+                new_title.genre.set(genres)
+
+        check_constant_queries(client, '/api/v1/titles/', add_titles)
+
+    def test_02_reviews_list_queries(self, client, admin_client, admin,
+                                     user_client, user, django_user_model):
+        _, _, titles = create_comments(
+            admin_client, {admin: admin_client, user: user_client})
+        title_id = titles[0]['id']
+
+        def add_reviews():
+            for idx in range(5):
+                author = django_user_model.objects.create(
+                    username=f'reviewer{idx}',
+                    email=f'reviewer{idx}@yamdb.fake')
+                Review.objects.create(title_id=title_id, author=author,
+                                      text=f'review {idx}', score=5)
+
+        check_constant_queries(
+            client, f'/api/v1/titles/{title_id}/reviews/', add_reviews)
+
+    def test_03_comments_list_queries(self, client, admin_client, admin,
+                                      user_client, user):
+        _, reviews, titles = create_comments(
+            admin_client, {admin: admin_client, user: user_client})
+        url = (f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+               f'{reviews[0]["id"]}/comments/')
+
+        def add_comments():
+            for idx in range(5):
+                Comment.objects.create(review_id=reviews[0]['id'],
+                                       author=user, text=f'comment {idx}')
+
+        check_constant_queries(client, url, add_comments)
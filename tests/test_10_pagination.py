@@ -0,0 +1,77 @@
+from http import HTTPStatus
+
+import pytest
+
+from reviews.models import Review, Title
+from tests.utils import create_reviews
+
+
+@pytest.mark.django_db(transaction=True)
+class Test10PaginationAPI:
+
+    def test_01_titles_cursor_mode(self, client, admin_client):
+        for idx in range(12):
+            Title.objects.create(name=f'title {idx}', year=2000)
+        url = '/api/v1/titles/'
+
+        response = client.get(url, {'pagination': 'cursor'})
+        assert response.status_code == HTTPStatus.OK
+        data = response.json()
+        assert 'count' not in data, (
+            f'Проверьте, что в курсорном режиме `{url}` не возвращает '
+            'ключ `count`.'
+        )
+        assert len(data['results']) == 10
+        assert 'cursor=' in data['next'], (
+            f'Проверьте, что в курсорном режиме ссылка `next` для `{url}` '
+            'содержит параметр `cursor`.'
+        )
+
+        response = client.get(data['next'])
+        data_next = response.json()
+        ids = [title['id'] for title in data['results'] + data_next['results']]
+        assert ids == sorted(Title.objects.values_list('id', flat=True)), (
+            f'Проверьте, что курсорная пагинация `{url}` возвращает все '
+            'произведения по возрастанию `id` без повторов.'
+        )
+        assert data_next['next'] is None
+
+        response = client.get(url)
+        assert response.json()['count'] == 12, (
+            f'Проверьте, что без параметров `{url}` по-прежнему использует '
+            'постраничную пагинацию с ключом `count`.'
+        )
+
+    def test_02_reviews_skip_count(self, client, admin_client, admin,
+                                   user_client, user, moderator,
+                                   moderator_client):
+        author_map = {
+            admin: admin_client,
+            user: user_client,
+            moderator: moderator_client
+        }
+        _, titles = create_reviews(admin_client, author_map)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+
+        response = client.get(url, {'count': 'false'})
+        assert response.status_code == HTTPStatus.OK
+        data = response.json()
+        assert 'count' not in data, (
+            f'Проверьте, что с параметром `count=false` ответ `{url}` '
+            'не содержит ключ `count`.'
+        )
+        assert len(data['results']) == 3
+        assert data['next'] is None and data['previous'] is None
+
+        response = client.get(url, {'count': 'false', 'page': 2})
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+        response = client.get(url, {'pagination': 'cursor'})
+        ids = [review['id'] for review in response.json()['results']]
+        assert ids == list(
+            Review.objects.filter(title_id=titles[0]['id'])
+            .order_by('pub_date', 'id').values_list('id', flat=True)
+        ), (
+            f'Проверьте, что курсорная пагинация `{url}` упорядочивает '
+            'отзывы по `pub_date`, `id`.'
+        )
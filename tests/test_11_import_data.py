@@ -0,0 +1,99 @@
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from reviews.management.commands.import_data import (FILE_MODEL,
+                                                     dependency_levels,
+                                                     parse_batches)
+from reviews.models import (Category, Comment, Genre, GenreTitle, Review,
+                            Title, User)
+
+
+@pytest.mark.django_db(transaction=True)
+class Test11ImportData:
+
+    def test_01_import_is_idempotent(self):
+        call_command('import_data', '--batch-size', '10', stdout=StringIO())
+        counts = [model.objects.count() for model in
+                  (Category, Title, GenreTitle, Review, Comment)]
+        assert all(counts), (
+            'Проверьте, что команда `import_data` загружает данные '
+            'из всех csv-файлов.'
+        )
+        pub_date = Review.objects.get(pk=1).pub_date
+
+        call_command('import_data', '--mode', 'upsert', stdout=StringIO())
+        assert counts == [model.objects.count() for model in
+                          (Category, Title, GenreTitle, Review, Comment)], (
+            'Проверьте, что повторная загрузка в режиме `upsert` '
+            'не создаёт дубликатов.'
+        )
+        assert Review.objects.get(pk=1).pub_date == pub_date, (
+            'Проверьте, что `import_data` сохраняет `pub_date` из файла.'
+        )
+
+        category = Category.objects.create(name='Новая', slug='new')
+        assert category.pk > max(
+            Category.objects.exclude(pk=category.pk)
+            .values_list('pk', flat=True)
+        ), (
+            'Проверьте, что после загрузки с явными `id` счётчик '
+            'первичного ключа сдвигается.'
+        )
+
+    def test_02_dependency_levels(self):
+        levels = [{model for _, model, _ in level}
+                  for level in dependency_levels(FILE_MODEL)]
+        assert levels == [
+            {Category, Genre, User}, {Title}, {GenreTitle, Review}, {Comment}
+        ], (
+            'Проверьте, что файлы группируются по уровням графа '
+            'внешних ключей моделей.'
+        )
+
+    def test_03_pipeline_import(self):
+        output = StringIO()
+        call_command('import_data', '--workers', '2', stdout=output)
+        assert Comment.objects.exists() and Review.objects.exists(), (
+            'Проверьте, что `import_data --workers` загружает все файлы.'
+        )
+        assert 'Разбор, с' in output.getvalue(), (
+            'Проверьте, что `import_data --workers` выводит сводку '
+            'по времени этапов.'
+        )
+
+    def test_04_pipeline_parses_bounded_batches(self, tmp_path):
+        data = tmp_path / 'title.csv'
+        data.write_text('id,name,year\n' + ''.join(
+            f'{number},Произведение {number},{2000 + number}\n'
+            for number in range(1, 8)), encoding='utf-8')
+        submitted = []
+
+        class Parsers(ThreadPoolExecutor):
+            def submit(self, fn, *args):
+                submitted.append(args[3])
+                return super().submit(fn, *args)
+
+        consumed = []
+        with Parsers(2) as parsers:
+            for rows, _ in parse_batches(parsers, str(data), Title,
+                                         ['id', 'name', 'year'], 2, 2):
+                assert len(submitted) - len(consumed) <= 2, (
+                    'Проверьте, что `import_data --workers` держит в работе '
+                    'не больше заданного числа пачек.'
+                )
+                consumed.append(rows)
+        assert [len(rows) for rows in consumed] == [2, 2, 2, 1]
+        assert [row['year'] for rows in consumed for row in rows] == list(
+            range(2001, 2008)), (
+            'Проверьте, что пачки загружаются в порядке файла.'
+        )
+
+        data.write_text('id,name,year\n1,А,2001\n2,Б,2002\n3,В,год\n',
+                        encoding='utf-8')
+        with ThreadPoolExecutor(2) as parsers:
+            with pytest.raises(CommandError, match='строка 4'):
+                list(parse_batches(parsers, str(data), Title,
+                                   ['id', 'name', 'year'], 2, 2))
@@ -0,0 +1,50 @@
+from http import HTTPStatus
+
+import pytest
+
+from reviews.models import Title
+from tests.utils import create_reviews, create_single_review
+
+
+@pytest.mark.django_db(transaction=True)
+class Test12CacheAPI:
+
+    def test_01_catalogue_cache_hit_and_invalidation(self, client,
+                                                     admin_client, admin,
+                                                     user_client, user,
+                                                     moderator_client):
+        _, titles = create_reviews(admin_client, {admin: admin_client})
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+
+        response = client.get(url)
+        assert response['X-Cache'] == 'MISS'
+        response = client.get(url)
+        assert response['X-Cache'] == 'HIT', (
+            f'Проверьте, что повторный GET-запрос к `{url}` '
+            'обслуживается из кеша.'
+        )
+
+        create_single_review(user_client, titles[0]['id'], 'text', 1)
+        response = client.get(url)
+        assert response['X-Cache'] == 'MISS'
+        assert response.json()['rating'] == 3, (
+            'Проверьте, что новый отзыв сбрасывает кеш каталога и '
+            'ответ содержит актуальный рейтинг.'
+        )
+
+        Title.objects.get(pk=titles[0]['id']).genre.clear()
+        response = client.get(url)
+        assert response.json()['genre'] == [], (
+            'Проверьте, что изменение жанров произведения сбрасывает кеш.'
+        )
+
+        response = client.get('/api/v1/titles/', {'year': 1984})
+        assert response['X-Cache'] == 'MISS', (
+            'Проверьте, что параметры запроса входят в ключ кеша.'
+        )
+
+        response = admin_client.get('/api/v1/cache/stats/')
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()['hits'] >= 1
+        response = moderator_client.get('/api/v1/cache/stats/')
+        assert response.status_code == HTTPStatus.FORBIDDEN
@@ -0,0 +1,63 @@
+from http import HTTPStatus
+
+import pytest
+
+from tests.utils import create_comments, create_single_comment
+
+
+@pytest.mark.django_db(transaction=True)
+class Test13ConditionalGetAPI:
+
+    def test_01_reviews_etag(self, client, admin_client, admin,
+                             user_client, user):
+        _, _, titles = create_comments(admin_client, {admin: admin_client})
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+
+        response = client.get(url)
+        etag = response.get('ETag')
+        assert etag and response.get('Last-Modified'), (
+            f'Проверьте, что ответ на GET-запрос к `{url}` содержит '
+            'заголовки `ETag` и `Last-Modified`.'
+        )
+
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.NOT_MODIFIED, (
+            f'Проверьте, что GET-запрос к `{url}` с совпадающим '
+            '`If-None-Match` возвращает ответ со статусом 304.'
+        )
+        assert not response.content
+
+        response = client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+        review_id = client.get(url).json()['results'][0]['id']
+        admin_client.patch(f'{url}{review_id}/', data={'text': 'new'})
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что после изменения отзыва `ETag` списка '
+            'отзывов меняется.'
+        )
+        assert response['ETag'] != etag
+
+    def test_02_comments_etag(self, client, admin_client, admin,
+                              user_client, user):
+        _, reviews, titles = create_comments(
+            admin_client, {admin: admin_client})
+        url = (f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+               f'{reviews[0]["id"]}/comments/')
+        etag = client.get(url)['ETag']
+
+        create_single_comment(
+            user_client, titles[0]['id'], reviews[0]['id'], 'comment')
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что новый комментарий меняет `ETag` списка '
+            'комментариев.'
+        )
+        assert len(response.json()['results']) == 2
+
+        response = client.get(
+            f'{url}{response.json()["results"][0]["id"]}/',
+            HTTP_IF_NONE_MATCH='*')
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
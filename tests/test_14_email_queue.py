@@ -0,0 +1,81 @@
+from http import HTTPStatus
+
+import pytest
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.db import connection
+
+from reviews.models import OutgoingEmail
+from reviews.outbox import send_queued
+
+
+@pytest.mark.django_db(transaction=True)
+class Test14EmailQueue:
+
+    def test_01_signup_enqueues_email(self, client, settings):
+        settings.EMAIL_QUEUE_EAGER = False
+        outbox_before_count = len(mail.outbox)
+        response = client.post('/api/v1/auth/signup/', data={
+            'email': 'queued@yamdb.fake', 'username': 'queued'})
+        assert response.status_code == HTTPStatus.OK
+        assert len(mail.outbox) == outbox_before_count, (
+            'Проверьте, что `/api/v1/auth/signup/` не отправляет письмо '
+            'синхронно, а ставит его в очередь.'
+        )
+        assert OutgoingEmail.objects.filter(
+            recipient='queued@yamdb.fake', sent_at__isnull=True).exists()
+
+        call_command('send_emails')
+        assert len(mail.outbox) == outbox_before_count + 1, (
+            'Проверьте, что команда `send_emails` отправляет письма '
+            'из очереди.'
+        )
+        assert 'queued@yamdb.fake' in mail.outbox[-1].to
+        assert not OutgoingEmail.objects.filter(
+            sent_at__isnull=True).exists()
+
+    def test_02_failed_email_is_retried_later(self, settings):
+        settings.EMAIL_BACKEND = 'tests.test_14_email_queue.BrokenBackend'
+        email = OutgoingEmail.objects.create(
+            subject='code', body='123', recipient='retry@yamdb.fake')
+        assert send_queued() == (0, 1)
+        email.refresh_from_db()
+        assert email.attempts == 1 and email.last_error, (
+            'Проверьте, что неудачная попытка отправки сохраняется.'
+        )
+        assert send_queued() == (0, 0), (
+            'Проверьте, что повторная попытка откладывается.'
+        )
+
+    def test_03_sends_outside_transaction(self, settings):
+        settings.EMAIL_BACKEND = 'tests.test_14_email_queue.CheckingBackend'
+        CheckingBackend.checks = []
+        for number in range(2):
+            OutgoingEmail.objects.create(
+                subject='code', body='123',
+                recipient=f'lease{number}@yamdb.fake')
+        assert send_queued() == (2, 0)
+        assert CheckingBackend.checks == [(False, (0, 0))] * 2, (
+            'Проверьте, что письма отправляются вне транзакции, а забранные '
+            'письма не достаются другому отправителю.'
+        )
+        assert not OutgoingEmail.objects.filter(
+            sent_at__isnull=True).exists()
+
+
+class CheckingBackend(EmailBackend):
+    """Во время отправки проверяет, что транзакция не открыта и что
+    параллельный отправитель не видит забранных писем."""
+
+    checks = []
+
+    def send_messages(self, messages):
+        self.checks.append((connection.in_atomic_block, send_queued()))
+        return super().send_messages(messages)
+
+
+class BrokenBackend(EmailBackend):
+
+    def send_messages(self, messages):
+        raise OSError('SMTP недоступен')
@@ -0,0 +1,66 @@
+import pytest
+from django.core.management import call_command
+
+from reviews.models import Category, Genre, Title, TitleTrigram
+
+
+@pytest.mark.django_db(transaction=True)
+class Test15TitleSearchAPI:
+
+    def create_titles(self):
+        category = Category.objects.create(name='Фильм', slug='movie')
+        genres = [Genre.objects.create(name='Драма', slug='drama'),
+                  Genre.objects.create(name='Драматургия', slug='dramaturgy')]
+        shawshank = Title.objects.create(
+            name='Побег из Шоушенка', year=1994, category=category)
+        shawshank.genre.set(genres)
+        Title.objects.create(name='Побеги бамбука', year=2000)
+        Title.objects.create(name='Зелёная миля', year=1999)
+        return shawshank
+
+    def test_01_name_search_uses_trigrams(self, client):
+        shawshank = self.create_titles()
+        assert TitleTrigram.objects.filter(title=shawshank).exists(), (
+            'Проверьте, что при сохранении произведения строится '
+            'индекс триграмм названия.'
+        )
+        url = '/api/v1/titles/'
+
+        names = [title['name'] for title in
+                 client.get(url, {'name': 'шоушенК'}).json()['results']]
+        assert names == ['Побег из Шоушенка'], (
+            'Проверьте, что фильтр `name` ищет по подстроке без учёта '
+            'регистра.'
+        )
+        response = client.get(url, {'name': 'побег'})
+        assert response.json()['count'] == 2
+        response = client.get(url, {'name': 'по'})
+        assert response.json()['count'] == 2
+        response = client.get(url, {'name': 'побегиз'})
+        assert response.json()['count'] == 0
+
+    def test_02_slug_filters_are_deduplicated(self, client):
+        self.create_titles()
+        url = '/api/v1/titles/'
+
+        response = client.get(url, {'genre': 'drama'})
+        assert response.json()['count'] == 1
+        response = client.get(url, {'genre': 'dram'})
+        assert response.json()['count'] == 1, (
+            'Проверьте, что фильтр `genre` не дублирует произведения '
+            'с несколькими подходящими жанрами.'
+        )
+        response = client.get(url, {'category': 'movie'})
+        assert response.json()['count'] == 1
+        response = client.get(url, {'category': 'mov'})
+        assert response.json()['count'] == 1
+
+    def test_03_rebuild_search_index(self, client):
+        shawshank = self.create_titles()
+        Title.objects.filter(pk=shawshank.pk).update(name='Форрест Гамп')
+        call_command('rebuild_search_index', '--batch-size', '2')
+        response = client.get('/api/v1/titles/', {'name': 'гамп'})
+        assert response.json()['count'] == 1, (
+            'Проверьте, что команда `rebuild_search_index` пересобирает '
+            'индекс по текущим названиям.'
+        )
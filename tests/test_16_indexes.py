@@ -0,0 +1,45 @@
+import pytest
+from django.db import connection
+
+from api.filters import TitleFilter
+from reviews.models import Category, Comment, Genre, Review, Title, User
+
+FULL_SCAN_MARKERS = ('SCAN ', 'TEMP B-TREE')
+
+
+def query_shapes():
+    """Запросы в том виде, в котором их строят вьюсеты и фильтры."""
+    titles = Title.objects.order_by('id')
+    return {
+        'ReviewViewSet.list': Review.objects.filter(
+            title_id=1).select_related('title', 'author'),
+        'ReviewViewSet.list (cursor)': Review.objects.filter(
+            title_id=1).order_by('pub_date', 'id'),
+        'CommentViewSet.list': Comment.objects.filter(
+            review_id=1).select_related('review', 'author'),
+        'CommentViewSet.list (cursor)': Comment.objects.filter(
+            review_id=1).order_by('pub_date', 'id'),
+        'TitleFilter year': TitleFilter(
+            {'year': 1994}, queryset=titles).qs,
+        'TitleFilter category': TitleFilter(
+            {'category': 'movie'}, queryset=titles).qs,
+        'TitleFilter genre': TitleFilter(
+            {'genre': 'drama'}, queryset=titles).qs,
+        'UserViewSet role': User.objects.filter(role='admin'),
+    }
+
+
+@pytest.mark.django_db
+@pytest.mark.skipif(connection.vendor != 'sqlite',
+                    reason='Разбор плана рассчитан на EXPLAIN QUERY PLAN '
+                           'SQLite.')
+def test_hot_queries_use_indexes():
+    Category.objects.create(name='Фильм', slug='movie')
+    Genre.objects.create(name='Драма', slug='drama')
+    for name, queryset in query_shapes().items():
+        plan = queryset.explain()
+        for marker in FULL_SCAN_MARKERS:
+            assert marker not in plan, (
+                f'Запрос `{name}` выполняется без подходящего индекса '
+                f'({marker.strip()}):\n{plan}'
+            )
@@ -0,0 +1,86 @@
+from http import HTTPStatus
+
+import pytest
+from django.contrib.auth.tokens import default_token_generator
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+
+def obtain_client(client, user):
+    response = client.post('/api/v1/auth/token/', data={
+        'username': user.username,
+        'confirmation_code': default_token_generator.make_token(user),
+    })
+    assert response.status_code == HTTPStatus.OK
+    token = response.json().split('token: ')[1]
+    api_client = APIClient()
+    api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+    return api_client
+
+
+@pytest.mark.django_db(transaction=True)
+class Test17TokenClaims:
+
+    def test_01_auth_without_user_query(self, client, admin):
+        admin_client = obtain_client(client, admin)
+        with CaptureQueriesContext(connection) as queries:
+            response = admin_client.post(
+                '/api/v1/categories/', data={'name': 'Фильм', 'slug': 'films'})
+        assert response.status_code == HTTPStatus.CREATED
+        user_queries = [query['sql'] for query in queries
+                        if '"reviews_user"' in query['sql']]
+        assert not user_queries, (
+            'Проверьте, что токен из `/api/v1/auth/token/` позволяет '
+            'аутентифицироваться без запроса пользователя к БД: '
+            f'{user_queries}'
+        )
+
+    def test_02_role_change_revokes_claims(self, client, admin, user,
+                                           admin_client):
+        promoted_client = obtain_client(client, user)
+        demoted_client = obtain_client(client, admin)
+        data = {'name': 'Фильм', 'slug': 'films'}
+
+        response = promoted_client.post('/api/v1/categories/', data=data)
+        assert response.status_code == HTTPStatus.FORBIDDEN
+
+        admin_client.patch(f'/api/v1/users/{user.username}/',
+                           data={'role': 'admin'})
+        response = promoted_client.post('/api/v1/categories/', data=data)
+        assert response.status_code == HTTPStatus.CREATED, (
+            'Проверьте, что после смены роли права по ранее выданному '
+            'токену определяются по актуальной роли.'
+        )
+
+        promoted_client.patch(f'/api/v1/users/{admin.username}/',
+                              data={'role': 'user'})
+        response = demoted_client.delete('/api/v1/categories/films/')
+        assert response.status_code == HTTPStatus.FORBIDDEN, (
+            'Проверьте, что после понижения роли claims ранее выданного '
+            'токена больше не дают прав администратора.'
+        )
+
+        promoted_client.delete(f'/api/v1/users/{admin.username}/')
+        response = demoted_client.get('/api/v1/titles/')
+        assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+    def test_03_rename_keeps_token_bound_to_user(self, client, user,
+                                                 django_user_model):
+        old_client = obtain_client(client, user)
+        old_username = user.username
+        response = old_client.patch('/api/v1/users/me/',
+                                    data={'username': 'renamed'})
+        assert response.status_code == HTTPStatus.OK
+        newcomer = django_user_model.objects.create_user(
+            username=old_username, email='newcomer@yamdb.fake',
+            bio='Чужой профиль')
+
+        response = old_client.get('/api/v1/users/me/')
+        assert response.json()['username'] == 'renamed', (
+            'Проверьте, что после смены имени старый токен не даёт '
+            'доступа к профилю нового пользователя с прежним именем.'
+        )
+        old_client.patch('/api/v1/users/me/', data={'bio': 'Изменено'})
+        newcomer.refresh_from_db()
+        assert newcomer.bio == 'Чужой профиль'
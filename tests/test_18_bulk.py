@@ -0,0 +1,136 @@
+import json
+from http import HTTPStatus
+
+import pytest
+from django.db import NotSupportedError, connection
+from django.test.utils import CaptureQueriesContext
+
+from api.bulk import set_pks
+from reviews.models import Genre, GenreTitle, Title
+from tests.utils import create_categories, create_genre
+
+
+@pytest.mark.django_db(transaction=True)
+class Test18BulkAPI:
+
+    def test_01_genres_bulk_modes(self, admin_client, user_client):
+        url = '/api/v1/genres/bulk/'
+        data = [{'name': 'Драма', 'slug': 'drama'},
+                {'name': 'Комедия', 'slug': 'comedy'},
+                {'name': 'Ещё драма', 'slug': 'drama'},
+                {'name': 'Плохой', 'slug': ':-)'}]
+
+        response = user_client.post(url, data=data, format='json')
+        assert response.status_code == HTTPStatus.FORBIDDEN
+
+        response = admin_client.post(url, data=data, format='json')
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            f'Проверьте, что POST-запрос к `{url}` в режиме `atomic` '
+            'отклоняет всю пачку при ошибке в одном из элементов.'
+        )
+        assert [error['index'] for error in response.json()['errors']] == [
+            2, 3]
+        assert not Genre.objects.exists()
+
+        response = admin_client.post(f'{url}?mode=best-effort', data=data,
+                                     format='json')
+        assert response.status_code == HTTPStatus.CREATED, (
+            f'Проверьте, что POST-запрос к `{url}` в режиме `best-effort` '
+            'сохраняет корректные элементы.'
+        )
+        assert response.json()['results'] == ['drama', 'comedy']
+        assert len(response.json()['errors']) == 2
+
+        ndjson = '\n'.join(json.dumps(item) for item in [
+            {'name': 'Ужасы', 'slug': 'horror'},
+            {'name': 'Вестерн', 'slug': 'western'}])
+        response = admin_client.post(url, data=ndjson,
+                                     content_type='application/x-ndjson')
+        assert response.status_code == HTTPStatus.CREATED, (
+            f'Проверьте, что `{url}` принимает NDJSON.'
+        )
+        assert Genre.objects.count() == 4
+
+        response = admin_client.patch(url, data=[
+            {'slug': 'drama', 'name': 'Драма!'}], format='json')
+        assert response.status_code == HTTPStatus.OK
+        assert Genre.objects.get(slug='drama').name == 'Драма!'
+
+    def test_02_titles_bulk_create_and_update(self, admin_client, client):
+        genres = create_genre(admin_client)
+        categories = create_categories(admin_client)
+        url = '/api/v1/titles/bulk/'
+        data = [
+            {'name': f'Произведение {idx}', 'year': 2000 + idx,
+             'genre': [genres[0]['slug'], genres[idx % 2 + 1]['slug']],
+             'category': categories[idx % 2]['slug']}
+            for idx in range(20)
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            response = admin_client.post(url, data=data, format='json')
+        assert response.status_code == HTTPStatus.CREATED
+        assert len(queries) < 20, (
+            f'Проверьте, что `{url}` загружает жанры и категории '
+            'одним запросом на пачку, а не на каждый элемент.'
+        )
+        ids = response.json()['results']
+        assert Title.objects.filter(id__in=ids).count() == 20
+        assert GenreTitle.objects.filter(title_id__in=ids).count() == 40
+
+        response = client.get('/api/v1/titles/', {'name': 'произведение 7'})
+        assert response.json()['count'] == 1, (
+            'Проверьте, что массово созданные произведения попадают '
+            'в поисковый индекс.'
+        )
+
+        response = admin_client.patch(url, data=[
+            {'id': ids[0], 'genre': [genres[2]['slug']], 'year': 1999},
+            {'id': 0, 'year': 1999}], format='json')
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        response = admin_client.patch(f'{url}?mode=best-effort', data=[
+            {'id': ids[0], 'genre': [genres[2]['slug']], 'year': 1999},
+            {'id': 0, 'year': 1999}], format='json')
+        assert response.status_code == HTTPStatus.OK
+        title = Title.objects.get(pk=ids[0])
+        assert title.year == 1999
+        assert [genre.slug for genre in title.genre.all()] == [
+            genres[2]['slug']]
+
+    def test_03_set_pks(self, monkeypatch):
+        genres = [Genre(name='Драма', slug='drama'),
+                  Genre(name='Комедия', slug='comedy')]
+        Genre.objects.bulk_create(genres)
+        Genre.objects.create(name='Вставлен позже', slug='later')
+        set_pks(Genre, genres, ('slug',))
+        assert [genre.pk for genre in genres] == list(
+            Genre.objects.filter(slug__in=['drama', 'comedy'])
+            .order_by('pk').values_list('pk', flat=True)), (
+            'Проверьте, что id после bulk_create находятся по slug, '
+            'а не по последним строкам таблицы.'
+        )
+
+        titles = [Title(name='Произведение', year=2000)]
+        Title.objects.bulk_create(titles)
+        monkeypatch.setattr(connection, 'vendor', 'mysql')
+        with pytest.raises(NotSupportedError):
+            set_pks(Title, titles)
+        monkeypatch.undo()
+        set_pks(Title, titles)
+        assert titles[0].pk == Title.objects.get().pk
+
+    def test_04_ndjson_malformed_lines(self, admin_client):
+        url = '/api/v1/genres/bulk/'
+        for body, line in (
+                ('{"name": "Драма", "slug": "drama"}\n[1, 2]\n', 2),
+                ('{"name": "Драма", "slug": "drama"}\n\n"genre"\n', 3),
+                ('{"name": "Драма", "slug": "drama"}\n{"name": \n', 2)):
+            response = admin_client.post(
+                url, data=body, content_type='application/x-ndjson')
+            assert response.status_code == HTTPStatus.BAD_REQUEST, (
+                'Проверьте, что строка NDJSON, которая не является '
+                'объектом, даёт ответ 400.'
+            )
+            assert f'строка {line}' in response.json()['detail'], (
+                'Проверьте, что ошибка NDJSON указывает номер строки.'
+            )
+        assert not Genre.objects.exists()
@@ -0,0 +1,124 @@
+import csv
+import json
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from api.asynchronous import ASGIHandler
+from reviews.models import Comment, GenreTitle, Review, Title, User
+from tests.utils import asgi_request, create_categories, create_reviews
+
+
+@pytest.mark.django_db(transaction=True)
+class Test19Export:
+
+    @pytest.mark.parametrize('file_format', ['csv', 'ndjson'])
+    def test_01_export_is_reimportable(self, tmp_path, file_format):
+        call_command('import_data', stdout=StringIO())
+        models = (User, Title, GenreTitle, Review, Comment)
+        counts = [model.objects.count() for model in models]
+        review = Review.objects.values('id', 'pub_date', 'text').get(pk=1)
+        Title.objects.filter(pk=1).update(description='Описание')
+        title = Title.objects.values().get(pk=1)
+
+        call_command('export_data', str(tmp_path), '--format', file_format,
+                     '--chunk-size', '7', stdout=StringIO())
+        assert (tmp_path / f'review.{file_format}').exists(), (
+            'Проверьте, что `export_data` создаёт файл на каждую таблицу.'
+        )
+        Comment.objects.all().delete()
+        Review.objects.all().delete()
+
+        call_command('import_data', '--data-dir', str(tmp_path),
+                     '--format', file_format, stdout=StringIO())
+        assert counts == [model.objects.count() for model in models], (
+            'Проверьте, что выгрузку `export_data` можно загрузить '
+            'обратно командой `import_data`.'
+        )
+        assert Review.objects.values(
+            'id', 'pub_date', 'text').get(pk=1) == review
+        assert Title.objects.values().get(pk=1) == title, (
+            'Проверьте, что выгрузка содержит все колонки модели и '
+            'загружается без потерь.'
+        )
+
+    def test_02_export_endpoint(self, admin_client, user_client, user,
+                                moderator, moderator_client):
+        reviews, _ = create_reviews(
+            admin_client, {user: user_client, moderator: moderator_client})
+        url = '/api/v1/export/review/'
+
+        response = user_client.get(url)
+        assert response.status_code == HTTPStatus.FORBIDDEN, (
+            f'Проверьте, что `{url}` доступен только администратору.'
+        )
+        response = admin_client.get('/api/v1/export/unknown/')
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+        response = admin_client.get(url)
+        assert response.status_code == HTTPStatus.OK
+        assert response.streaming, (
+            f'Проверьте, что `{url}` отдаёт данные потоком.'
+        )
+        rows = [json.loads(line) for line in b''.join(
+            response.streaming_content).decode().splitlines()]
+        assert [row['id'] for row in rows] == [
+            review['id'] for review in reviews]
+        assert set(rows[0]) == {
+            'id', 'title_id', 'text', 'author_id', 'score', 'pub_date'}
+
+        response = admin_client.get(url, {'output': 'csv'})
+        assert response['Content-Type'] == 'text/csv'
+        lines = list(csv.reader(StringIO(b''.join(
+            response.streaming_content).decode())))
+        assert lines[0] == [
+            'id', 'title_id', 'text', 'author_id', 'score', 'pub_date']
+        assert len(lines) == len(reviews) + 1
+
+    def test_03_export_under_asgi(self, admin_client, token_admin):
+        categories = create_categories(admin_client)
+        status, body = asgi_request(
+            ASGIHandler(), 'GET', '/api/v1/export/category/',
+            headers=[(b'authorization',
+                      f'Bearer {token_admin["access"]}'.encode())])
+        assert status == HTTPStatus.OK
+        rows = [json.loads(line) for line in body.decode().splitlines()]
+        assert [row['slug'] for row in rows] == [
+            category['slug'] for category in categories], (
+            'Проверьте, что под ASGI выгрузка отдаёт все строки таблицы.'
+        )
+
+    def test_04_import_rejects_malformed_ndjson(self, tmp_path):
+        call_command('export_data', str(tmp_path), '--format', 'ndjson',
+                     stdout=StringIO())
+        first = '{"id": 1, "name": "Фильм", "slug": "movie"}\n'
+        for body, line in ((first + '[1, "Книга", "book"]\n', 2),
+                           (first + '\n{"id": 2, "name": "Книга"}\n', 3),
+                           (first + '{"id": 2, "name": "Книга", '
+                            '"slug": "book", "extra": 1}\n', 2),
+                           ('"category"\n', 1)):
+            (tmp_path / 'category.ndjson').write_text(body,
+                                                      encoding='utf-8')
+            with pytest.raises(CommandError, match=f'строка {line}:'):
+                call_command('import_data', '--data-dir', str(tmp_path),
+                             '--format', 'ndjson', stdout=StringIO())
+
+    def test_05_users_export_without_credentials(self, admin_client, user):
+        response = admin_client.get('/api/v1/export/users/')
+        assert response.status_code == HTTPStatus.OK
+        rows = [json.loads(line) for line in b''.join(
+            response.streaming_content).decode().splitlines()]
+        assert user.username in [row['username'] for row in rows]
+        for column in ('password', 'confirmation_code', 'token_version'):
+            assert all(column not in row for row in rows), (
+                f'Проверьте, что выгрузка пользователей не содержит '
+                f'колонку {column}.'
+            )
+        response = admin_client.get('/api/v1/export/users/',
+                                    {'output': 'csv'})
+        header = next(csv.reader(StringIO(b''.join(
+            response.streaming_content).decode())))
+        assert not {'password', 'confirmation_code',
+                    'token_version'} & set(header)
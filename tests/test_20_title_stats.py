@@ -0,0 +1,114 @@
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from reviews.models import Review, TitleStats
+from tests.utils import create_reviews
+
+
+@pytest.mark.django_db(transaction=True)
+class Test20TitleStats:
+
+    def test_01_stats_follow_review_changes(self, admin_client, admin,
+                                            user_client, user,
+                                            moderator_client, moderator,
+                                            client):
+        author_map = {admin: admin_client, user: user_client,
+                      moderator: moderator_client}
+        reviews, titles = create_reviews(admin_client, author_map)
+        title_id = titles[0]['id']
+        url = f'/api/v1/titles/{title_id}/stats/'
+        reviews_url = f'/api/v1/titles/{title_id}/reviews/'
+
+        user_client.patch(f'{reviews_url}{reviews[1]["id"]}/',
+                          data={'score': 9})
+        moderator_client.patch(f'{reviews_url}{reviews[2]["id"]}/',
+                               data={'score': 1})
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+        assert response.status_code == HTTPStatus.OK
+        assert len(queries) == 1, (
+            f'Проверьте, что `{url}` читает статистику одним запросом '
+            'без обращения к таблице отзывов.'
+        )
+        data = response.json()
+        assert data['count'] == 3
+        assert data['mean'] == 5
+        assert data['median'] == 5
+        assert data['histogram'] == {
+            str(score): int(score in (1, 5, 9)) for score in range(1, 11)
+        }, (
+            'Проверьте, что гистограмма обновляется при изменении оценки.'
+        )
+        last_review = Review.objects.latest('pub_date')
+        assert data['last_review_at'] is not None
+
+        moderator_client.delete(f'{reviews_url}{reviews[2]["id"]}/')
+        data = user_client.get(url).json()
+        assert (data['count'], data['mean'], data['median']) == (2, 7, 7)
+        assert last_review.pk == reviews[2]['id']
+        assert data['last_review_at'] != response.json()['last_review_at'], (
+            'Проверьте, что после удаления последнего отзыва дата '
+            'последнего отзыва пересчитывается.'
+        )
+
+        admin_client.delete(f'{reviews_url}{reviews[0]["id"]}/')
+        user_client.delete(f'{reviews_url}{reviews[1]["id"]}/')
+        data = user_client.get(url).json()
+        assert (data['count'], data['mean'], data['median'],
+                data['last_review_at']) == (0, None, None, None)
+
+        response = user_client.get(f'/api/v1/titles/{titles[1]["id"]}/stats/')
+        assert response.json()['count'] == 0, (
+            'Проверьте, что для произведения без отзывов статистика пустая.'
+        )
+        for url in ('/api/v1/titles/100500/stats/',
+                    '/api/v1/titles/abc/stats/'):
+            response = user_client.get(url)
+            assert response.status_code == HTTPStatus.NOT_FOUND, (
+                f'Проверьте, что `{url}` отвечает 404.'
+            )
+
+    def test_02_rebuild_title_stats_command(self, admin_client, admin,
+                                            user_client, user):
+        author_map = {admin: admin_client, user: user_client}
+        _, titles = create_reviews(admin_client, author_map)
+        title_id = titles[0]['id']
+        expected = TitleStats.objects.get(title_id=title_id)
+        TitleStats.objects.all().delete()
+        Review.objects.filter(author=user).update(score=2)
+
+        call_command('rebuild_title_stats', stdout=StringIO())
+        stats = TitleStats.objects.get(title_id=title_id)
+        assert stats.histogram == {**expected.histogram, 2: 1, 5: 1}, (
+            'Проверьте, что команда `rebuild_title_stats` пересчитывает '
+            'гистограммы по отзывам.'
+        )
+        assert stats.last_review_at == expected.last_review_at
+        assert stats.median == 3.5
+
+    def test_03_concurrent_first_reviews(self, admin_client, admin,
+                                         monkeypatch):
+        _, titles = create_reviews(admin_client, {admin: admin_client})
+        title_id = titles[0]['id']
+        TitleStats.objects.all().delete()
+        stale_rows = TitleStats.score_rows
+
+        def concurrent_insert(title_ids=None):
+            # Пока эта транзакция считала отзывы, другая вставила строку
+            # статистики со своим первым отзывом и зафиксировалась.
+            rows = list(stale_rows(title_ids))
+            TitleStats.objects.create(title_id=title_id, score_9=1)
+            return rows
+
+        monkeypatch.setattr(TitleStats, 'score_rows', concurrent_insert)
+        TitleStats.update_scores(title_id, added=7)
+        stats = TitleStats.objects.get(title_id=title_id)
+        assert (stats.histogram[9], stats.histogram[7]) == (1, 1), (
+            'Проверьте, что оценка второго из одновременных первых '
+            'отзывов не теряется.'
+        )
@@ -0,0 +1,96 @@
+from datetime import timedelta
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.utils import timezone
+
+from reviews.models import Review, Title
+from tests.utils import create_single_review, create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test21Ranking:
+
+    @pytest.fixture
+    def ranked_titles(self, admin_client, admin, user_client, user,
+                      moderator_client, moderator, settings):
+        settings.RANKING_PRIOR_VOTES = 3
+        titles, categories, genres = create_titles(admin_client)
+        first, second = titles[0]['id'], titles[1]['id']
+        third = Title.objects.create(name='Провал', year=2000).id
+        create_single_review(user_client, first, 'Отлично', 9)
+        create_single_review(moderator_client, first, 'Отлично', 9)
+        create_single_review(admin_client, first, 'Отлично', 9)
+        create_single_review(user_client, second, 'Шедевр', 10)
+        create_single_review(user_client, third, 'Ужас', 1)
+        call_command('rebuild_rankings', stdout=StringIO())
+        return titles, categories, genres
+
+    def test_01_top(self, client, moderator_client, ranked_titles):
+        titles, categories, genres = ranked_titles
+        url = '/api/v1/titles/top/'
+        response = client.get(url)
+        assert response.status_code == HTTPStatus.OK
+        results = response.json()['results']
+        assert [title['id'] for title in results[:2]] == [
+            titles[0]['id'], titles[1]['id']
+        ], (
+            f'Проверьте, что `{url}` учитывает количество оценок: '
+            'три высоких оценки весят больше одной отличной.'
+        )
+        # Средняя оценка 7.6, вес априорной оценки - 3 отзыва.
+        assert [title['weighted_rating'] for title in results] == [
+            pytest.approx((27 + 3 * 7.6) / 6),
+            pytest.approx((10 + 3 * 7.6) / 4),
+            pytest.approx((1 + 3 * 7.6) / 4),
+        ]
+
+        create_single_review(moderator_client, titles[1]['id'], 'Так', 1)
+        results = client.get(url).json()['results']
+        assert results[1]['weighted_rating'] == pytest.approx(
+            (11 + 3 * 7.6) / 5), (
+            'Проверьте, что байесовский рейтинг пересчитывается '
+            'при записи отзыва.'
+        )
+
+        response = client.get(url, {'category': categories[1]['slug']})
+        assert [title['id'] for title in response.json()['results']] == [
+            titles[1]['id']
+        ], f'Проверьте, что `{url}` фильтруется по slug категории.'
+        response = client.get(url, {'genre': genres[0]['slug']})
+        assert [title['id'] for title in response.json()['results']] == [
+            titles[0]['id']
+        ], f'Проверьте, что `{url}` фильтруется по slug жанра.'
+
+    def test_02_trending(self, client, ranked_titles):
+        titles, _, _ = ranked_titles
+        url = '/api/v1/titles/trending/'
+        results = client.get(url).json()['results']
+        assert [(title['id'], title['review_velocity'])
+                for title in results[:2]] == [
+            (titles[0]['id'], 3), (titles[1]['id'], 1)
+        ]
+
+        Review.objects.filter(title_id=titles[0]['id']).update(
+            pub_date=timezone.now() - timedelta(days=30))
+        call_command('rebuild_rankings', stdout=StringIO())
+        results = client.get(url).json()['results']
+        assert titles[0]['id'] not in [title['id'] for title in results], (
+            'Проверьте, что `rebuild_rankings` убирает из окна '
+            'устаревшие отзывы.'
+        )
+
+    @pytest.mark.skipif(connection.vendor != 'sqlite',
+                        reason='Разбор плана рассчитан на EXPLAIN QUERY '
+                               'PLAN SQLite.')
+    def test_03_ranking_reads_index(self):
+        for ordering in (('-weighted_rating', 'id'),
+                         ('-review_velocity', 'id')):
+            plan = Title.objects.order_by(*ordering)[:10].explain()
+            assert 'TEMP B-TREE' not in plan, (
+                f'Проверьте, что сортировка {ordering} читает индекс '
+                f'без сортировки всей таблицы:\n{plan}'
+            )
@@ -0,0 +1,65 @@
+import logging
+from http import HTTPStatus
+
+import pytest
+
+from api.profiling import registry
+from tests.utils import create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test22Profiling:
+
+    @pytest.fixture(autouse=True)
+    def clean_registry(self):
+        registry.reset()
+        yield
+        registry.reset()
+
+    def test_01_metrics_endpoint(self, admin_client, user_client, client,
+                                 settings):
+        create_titles(admin_client)
+        settings.PROFILING_SAMPLE_RATE = 1
+        settings.PROFILING_QUERY_BUDGET = 100
+        client.get('/api/v1/titles/')
+        client.get('/api/v1/titles/')
+
+        url = '/api/v1/metrics/'
+        response = user_client.get(url)
+        assert response.status_code == HTTPStatus.FORBIDDEN, (
+            f'Проверьте, что `{url}` доступен только администратору.'
+        )
+        response = admin_client.get(url)
+        assert response.status_code == HTTPStatus.OK
+        assert response['Content-Type'].startswith('text/plain')
+        metrics = response.content.decode()
+        for name in ('latency_seconds', 'queries', 'sql_seconds',
+                     'serializer_seconds', 'render_seconds',
+                     'permission_seconds'):
+            assert (f'yamdb_request_{name}_count{{view="api:title-list"}} 2'
+                    in metrics), (
+                f'Проверьте, что `{url}` отдаёт гистограмму `{name}` '
+                'по имени URL.'
+            )
+        assert ('yamdb_request_latency_seconds_bucket'
+                '{view="api:title-list",le="+Inf"} 2') in metrics
+        assert 'yamdb_query_budget_exceeded_total' not in metrics
+
+    def test_02_sampling_and_budget(self, client, settings, caplog):
+        settings.PROFILING_SAMPLE_RATE = 0
+        client.get('/api/v1/titles/')
+        assert 'api:title-list' not in registry.export(), (
+            'Проверьте, что при PROFILING_SAMPLE_RATE = 0 запросы '
+            'не замеряются.'
+        )
+
+        settings.PROFILING_SAMPLE_RATE = 1
+        settings.PROFILING_QUERY_BUDGET = 0
+        with caplog.at_level(logging.WARNING, logger='api.profiling'):
+            client.get('/api/v1/titles/', {'year': 1984})
+        assert 'api:title-list' in caplog.text, (
+            'Проверьте, что запрос сверх бюджета SQL-запросов '
+            'пишется в лог с предупреждением.'
+        )
+        assert ('yamdb_query_budget_exceeded_total{view="api:title-list"} 1'
+                in registry.export())
@@ -0,0 +1,71 @@
+from collections import Counter
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db.models import Sum
+
+from reviews.management.commands.generate_data import zipf_counts
+from reviews.models import Comment, GenreTitle, Review, Title, User
+
+OPTIONS = ('--users', '60', '--titles', '40', '--reviews', '600',
+           '--comments', '100', '--until', '2022-01-01')
+
+
+@pytest.mark.django_db(transaction=True)
+class Test23GenerateData:
+
+    def test_01_zipf_counts(self):
+        counts = zipf_counts(1000, 50, 1.1, 60)
+        assert sum(counts) == 1000
+        assert max(counts) == 60, (
+            'Проверьте, что число отзывов на произведение не превышает '
+            'числа пользователей.'
+        )
+        assert counts == sorted(counts, reverse=True)
+        assert counts[0] > 10 * counts[-1]
+
+    def test_02_csv_is_deterministic_and_importable(self, tmp_path):
+        first, second, other = (tmp_path / 'first', tmp_path / 'second',
+                                tmp_path / 'other')
+        for path, seed in ((first, '1'), (second, '1'), (other, '2')):
+            call_command('generate_data', *OPTIONS, '--seed', seed,
+                         '--output-dir', str(path), stdout=StringIO())
+        review_csv = (first / 'review.csv').read_text(encoding='utf-8')
+        assert review_csv == (second / 'review.csv').read_text(
+            encoding='utf-8'), (
+            'Проверьте, что `generate_data` с одинаковым --seed '
+            'генерирует одинаковые данные.'
+        )
+        assert review_csv != (other / 'review.csv').read_text(
+            encoding='utf-8')
+
+        call_command('import_data', '--data-dir', str(first),
+                     stdout=StringIO())
+        assert (User.objects.count(), Title.objects.count(),
+                Review.objects.count(), Comment.objects.count()) == (
+            60, 40, 600, 100), (
+            'Проверьте, что csv-файлы `generate_data` загружаются '
+            'командой `import_data`.'
+        )
+
+    def test_03_database_mode(self, admin):
+        call_command('generate_data', *OPTIONS, stdout=StringIO())
+        assert User.objects.count() == 61, (
+            'Проверьте, что `generate_data` добавляет данные '
+            'к существующим.'
+        )
+        pairs = Review.objects.values_list('title_id', 'author_id')
+        assert len(set(pairs)) == len(pairs) == 600
+        per_title = Counter(title_id for title_id, _ in pairs)
+        assert max(per_title.values()) >= 5 * 600 / 40 / 2, (
+            'Проверьте, что отзывы распределены по произведениям '
+            'неравномерно.'
+        )
+        per_user = Counter(author_id for _, author_id in pairs)
+        assert max(per_user.values()) > 3 * min(per_user.values())
+        assert GenreTitle.objects.exists()
+        assert Title.objects.aggregate(
+            total=Sum('rating_count'))['total'] == 600, (
+            'Проверьте, что после генерации пересчитываются рейтинги.'
+        )
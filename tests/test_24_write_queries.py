@@ -0,0 +1,123 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api.authentication import get_token_for_user
+from reviews.models import Comment, Review, Title
+from tests.utils import create_titles
+
+# Запросов к базе на каждый путь записи, включая BEGIN. Проверка автора,
+# отзыва и произведения укладывается в один SELECT, остальное - сама
+# запись и инкрементальные агрегаты: один UPDATE рейтинга и ранжирования
+# произведения и один UPDATE статистики оценок. Первый отзыв
+# на произведение строит строку статистики: SELECT и INSERT в точке
+# сохранения, чтобы одновременный первый отзыв не потерял оценку.
+WRITE_QUERIES = {
+    'first review create': 9,
+    'review create': 5,
+    'review update': 6,
+    'review delete': 6,
+    'comment create': 2,
+    'comment update': 2,
+    'comment delete': 3,
+}
+
+
+def claims_client(user):
+    """Клиент с токеном, из которого пользователь восстанавливается
+    без обращения к базе."""
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION=f'Bearer {get_token_for_user(user)}')
+    return client
+
+
+@pytest.fixture
+def assert_queries(django_assert_num_queries):
+    """Запрос с проверкой точного числа SQL-запросов из WRITE_QUERIES."""
+    def request(name, method, url, data=None, status=HTTPStatus.OK,
+                client=None):
+        with django_assert_num_queries(WRITE_QUERIES[name]):
+            response = getattr(client, method)(url, data=data,
+                                               format='json')
+        assert response.status_code == status, response.content
+        return response
+    return request
+
+
+@pytest.mark.django_db(transaction=True)
+class Test24WriteQueries:
+
+    def test_01_review_and_comment_write_paths(self, admin_client, user,
+                                               moderator, django_user_model,
+                                               assert_queries):
+        titles, _, _ = create_titles(admin_client)
+        # Средняя оценка байесовского рейтинга кешируется, её пересчёт
+        # не входит в путь записи.
+        Title.mean_score(refresh=True)
+        author, stranger = claims_client(user), claims_client(moderator)
+        reviews_url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+
+        response = assert_queries(
+            'first review create', 'post', reviews_url,
+            {'text': 'Отзыв', 'score': 7}, HTTPStatus.CREATED, author)
+        review_url = f'{reviews_url}{response.json()["id"]}/'
+        response = assert_queries(
+            'review create', 'post', reviews_url,
+            {'text': 'Второй отзыв', 'score': 9}, HTTPStatus.CREATED,
+            stranger)
+        stranger_review_url = f'{reviews_url}{response.json()["id"]}/'
+
+        with CaptureQueriesContext(connection) as queries:
+            response = author.post(reviews_url,
+                                   data={'text': 'Ещё', 'score': 1})
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert 'non_field_errors' in response.json()
+        statements = [query['sql'] for query in queries.captured_queries]
+        assert not any(sql.startswith('SELECT (1) AS "a"')
+                       for sql in statements), (
+            'Проверьте, что повторный отзыв отсекается ограничением '
+            '`unique_review` в базе, а не отдельной проверкой exists().'
+        )
+        assert sum(sql.startswith('SELECT "reviews_title"')
+                   for sql in statements) == 1, (
+            'Проверьте, что произведение из URL загружается один раз '
+            'за запрос.'
+        )
+        assert Review.objects.get(author=user).score == 7
+        assert_queries('review update', 'patch', review_url, {'score': 3},
+                       client=author)
+
+        other = claims_client(django_user_model.objects.create_user(
+            username='other', email='other@yamdb.fake', role='user'))
+        with CaptureQueriesContext(connection) as queries:
+            response = other.patch(review_url, data={'score': 1})
+        assert response.status_code == HTTPStatus.FORBIDDEN
+        assert len(queries) == 1, (
+            'Проверьте, что право на изменение чужого отзыва проверяется '
+            'по author_id без загрузки пользователя.'
+        )
+        other_url = (f'/api/v1/titles/{titles[1]["id"]}/reviews/'
+                     f'{review_url.rstrip("/").rsplit("/", 1)[1]}/')
+        with CaptureQueriesContext(connection) as queries:
+            response = author.patch(other_url, data={'score': 1})
+        assert response.status_code == HTTPStatus.NOT_FOUND
+        assert len(queries) == 1
+
+        comments_url = f'{review_url}comments/'
+        response = assert_queries(
+            'comment create', 'post', comments_url, {'text': 'Комментарий'},
+            HTTPStatus.CREATED, stranger)
+        comment_url = f'{comments_url}{response.json()["id"]}/'
+        assert_queries('comment update', 'patch', comment_url,
+                       {'text': 'Правка'}, client=stranger)
+        assert_queries('comment delete', 'delete', comment_url,
+                       status=HTTPStatus.NO_CONTENT, client=stranger)
+        assert_queries('review delete', 'delete', review_url,
+                       status=HTTPStatus.NO_CONTENT, client=author)
+        assert_queries('review delete', 'delete', stranger_review_url,
+                       status=HTTPStatus.NO_CONTENT, client=stranger)
+        assert not Review.objects.exists() and not Comment.objects.exists()
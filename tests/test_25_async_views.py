@@ -0,0 +1,159 @@
+import asyncio
+from http import HTTPStatus
+from types import ModuleType
+
+import pytest
+from django.core.cache import caches
+from django.urls import include, path, resolve
+
+from api.asynchronous import ASGIHandler
+from api.profiling import registry
+from api.urls import get_urlpatterns
+from tests.utils import asgi_request, create_comments
+
+
+def async_urlconf():
+    urlconf = ModuleType('async_urls')
+    urlconf.urlpatterns = [
+        path('api/', include((get_urlpatterns(async_reads=True), 'api'),
+                             namespace='api')),
+    ]
+    return urlconf
+
+
+@pytest.mark.django_db(transaction=True)
+class Test25AsyncViews:
+
+    @pytest.fixture
+    def catalogue(self, admin_client, user_client, moderator_client, admin,
+                  user, moderator):
+        authors_map = {admin: admin_client, moderator: moderator_client,
+                       user: user_client}
+        comments, reviews, titles = create_comments(admin_client,
+                                                    authors_map)
+        title_id = titles[0]['id']
+        review_id = reviews[0]['id']
+        reviews_url = f'/api/v1/titles/{title_id}/reviews/'
+        comments_url = f'{reviews_url}{review_id}/comments/'
+        return {
+            'title_id': title_id,
+            'review_id': review_id,
+            'urls': [
+                '/api/v1/titles/',
+                '/api/v1/titles/?page=2',
+                '/api/v1/titles/?year=1984',
+                '/api/v1/titles/?pagination=cursor',
+                f'/api/v1/titles/{title_id}/',
+                '/api/v1/categories/',
+                '/api/v1/genres/?count=false',
+                reviews_url,
+                f'{reviews_url}{review_id}/',
+                comments_url,
+                f'{comments_url}{comments[0]["id"]}/',
+                '/api/v1/titles/?page=99',
+                '/api/v1/titles/?page=0',
+                '/api/v1/titles/999/reviews/',
+                f'/api/v1/titles/{titles[1]["id"]}/reviews/{review_id}/'
+                f'comments/',
+            ],
+        }
+
+    def test_01_routes(self, settings):
+        settings.ROOT_URLCONF = async_urlconf()
+        for url in ('/api/v1/titles/', '/api/v1/titles/1/',
+                    '/api/v1/categories/', '/api/v1/genres/',
+                    '/api/v1/titles/1/reviews/', '/api/v1/titles/1/reviews/1/',
+                    '/api/v1/titles/1/reviews/1/comments/',
+                    '/api/v1/titles/1/reviews/1/comments/1/'):
+            assert asyncio.iscoroutinefunction(resolve(url).func), (
+                f'Проверьте, что при ASYNC_READ_VIEWS `{url}` обрабатывает '
+                'асинхронная вьюха.'
+            )
+        for url in ('/api/v1/titles/1/stats/', '/api/v1/users/',
+                    '/api/v1/auth/signup/'):
+            assert not asyncio.iscoroutinefunction(resolve(url).func), (
+                f'Проверьте, что `{url}` остаётся синхронным.'
+            )
+
+    def test_02_same_responses(self, client, user_client, settings,
+                               catalogue):
+        expected = {}
+        for url in catalogue['urls']:
+            response = client.get(url)
+            expected[url] = (response.status_code, response.json())
+        for cache in caches.all():
+            cache.clear()
+
+        settings.ROOT_URLCONF = async_urlconf()
+        for api_client in (client, user_client):
+            for url in catalogue['urls']:
+                response = api_client.get(url)
+                assert (response.status_code,
+                        response.json()) == expected[url], (
+                    f'Проверьте, что асинхронная вьюха `{url}` отдаёт тот '
+                    'же ответ, что и синхронная.'
+                )
+        response = client.get('/api/v1/titles/')
+        assert response['X-Cache'] == 'HIT'
+        response = client.get(f'/api/v1/titles/{catalogue["title_id"]}/',
+                              HTTP_IF_NONE_MATCH=response['ETag'])
+        assert response.status_code == HTTPStatus.OK
+        etag = response['ETag']
+        response = client.get(f'/api/v1/titles/{catalogue["title_id"]}/',
+                              HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.NOT_MODIFIED, (
+            'Проверьте, что асинхронная вьюха поддерживает If-None-Match.'
+        )
+
+    def test_03_writes_and_permissions(self, client, admin_client,
+                                       user_client, settings, catalogue):
+        settings.ROOT_URLCONF = async_urlconf()
+        url = f'/api/v1/titles/{catalogue["title_id"]}/reviews/'
+        response = client.post(url, data={'text': 'Текст', 'score': 5})
+        assert response.status_code == HTTPStatus.UNAUTHORIZED
+        response = admin_client.post(
+            '/api/v1/categories/', data={'name': 'Игры', 'slug': 'games'})
+        assert response.status_code == HTTPStatus.CREATED, (
+            'Проверьте, что запись через маршрут с асинхронным чтением '
+            'обрабатывает синхронная вьюха.'
+        )
+        response = user_client.delete(
+            f'{url}{catalogue["review_id"]}/')
+        assert response.status_code == HTTPStatus.FORBIDDEN
+        response = client.get('/api/v1/categories/')
+        assert response.json()['count'] == 3
+        response = client.put(f'/api/v1/titles/{catalogue["title_id"]}/',
+                              data={}, content_type='application/json')
+        assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+    def test_04_profiling(self, client, settings, catalogue):
+        registry.reset()
+        settings.ROOT_URLCONF = async_urlconf()
+        settings.PROFILING_SAMPLE_RATE = 1
+        client.get(f'/api/v1/titles/{catalogue["title_id"]}/reviews/')
+        histogram = registry.histograms[('queries', 'api:review-list')]
+        registry.reset()
+        assert histogram.count == 1
+        assert histogram.sum >= 3, (
+            'Проверьте, что запросы к базе из пула потоков асинхронной '
+            'вьюхи попадают в замеры ProfilingMiddleware.'
+        )
+
+    def test_05_profiling_sync_views_under_asgi(self, settings):
+        registry.reset()
+        settings.PROFILING_SAMPLE_RATE = 1
+        data = b'{"username": "asgi", "email": "asgi@yamdb.fake"}'
+        status, body = asgi_request(
+            ASGIHandler(), 'POST', '/api/v1/auth/signup/', body=data,
+            headers=[(b'content-type', b'application/json'),
+                     (b'content-length', str(len(data)).encode())])
+        settings.PROFILING_SAMPLE_RATE = 0
+        histograms = dict(registry.histograms)
+        registry.reset()
+        assert status == HTTPStatus.OK, body
+        histogram = histograms[('queries', 'api:signup')]
+        assert histogram.count == 1
+        assert histogram.sum > 0, (
+            'Проверьте, что под ASGI SQL-запросы синхронных вьюх попадают '
+            'в замеры ProfilingMiddleware.'
+        )
@@ -0,0 +1,141 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+
+from api.database import HealthCheckMixin
+from api_yamdb.database import database_config, sqlite_pragmas
+
+
+class Test26DatabaseConfig:
+
+    def test_01_sqlite_default(self):
+        config = database_config('db.sqlite3', env={})
+        assert config['ENGINE'] == 'django.db.backends.sqlite3'
+        assert config['NAME'] == 'db.sqlite3'
+        assert config['CONN_MAX_AGE'] > 0, (
+            'Проверьте, что по умолчанию соединения постоянные.'
+        )
+        assert config['CONN_HEALTH_CHECKS'] is True
+        assert sqlite_pragmas(env={}) == {
+            'journal_mode': 'WAL', 'synchronous': 'NORMAL',
+            'busy_timeout': '5000', 'mmap_size': str(256 * 1024 * 1024)}
+        assert sqlite_pragmas(env={'SQLITE_MMAP_SIZE': '',
+                                   'SQLITE_BUSY_TIMEOUT': '100'}) == {
+            'journal_mode': 'WAL', 'synchronous': 'NORMAL',
+            'busy_timeout': '100'}
+
+    def test_02_postgresql(self):
+        env = {'DB_ENGINE': 'postgresql', 'DB_NAME': 'yamdb',
+               'POSTGRES_USER': 'yamdb', 'POSTGRES_PASSWORD': 'secret',
+               'DB_HOST': 'db', 'DB_PORT': '6432', 'DB_CONN_MAX_AGE': '300',
+               'DB_HEALTH_CHECKS': 'False'}
+        config = database_config('db.sqlite3', env=env)
+        assert config['ENGINE'] == 'api.backends.postgresql'
+        assert (config['NAME'], config['USER'], config['PASSWORD'],
+                config['HOST'], config['PORT']) == (
+            'yamdb', 'yamdb', 'secret', 'db', '6432')
+        assert config['CONN_MAX_AGE'] == 300
+        assert config['CONN_HEALTH_CHECKS'] is False
+        assert 'DISABLE_SERVER_SIDE_CURSORS' not in config
+        config = database_config(
+            'db.sqlite3', env={**env, 'DB_PGBOUNCER': 'True'})
+        assert config['DISABLE_SERVER_SIDE_CURSORS'] is True, (
+            'Проверьте, что за PgBouncer отключаются серверные курсоры.'
+        )
+
+    @pytest.mark.django_db
+    def test_03_sqlite_pragmas(self, tmp_path, settings):
+        settings.SQLITE_PRAGMAS = sqlite_pragmas(env={})
+        wrapper = DatabaseWrapper(
+            {**connection.settings_dict,
+             'NAME': str(tmp_path / 'pragmas.sqlite3')}, alias='pragmas')
+        try:
+            with wrapper.cursor() as cursor:
+                values = {}
+                for pragma in ('journal_mode', 'synchronous',
+                               'busy_timeout', 'mmap_size'):
+                    cursor.execute(f'PRAGMA {pragma}')
+                    values[pragma] = cursor.fetchone()[0]
+        finally:
+            wrapper.close()
+        assert values == {'journal_mode': 'wal', 'synchronous': 1,
+                          'busy_timeout': 5000,
+                          'mmap_size': 256 * 1024 * 1024}, (
+            'Проверьте, что новое соединение SQLite получает PRAGMA '
+            'из SQLITE_PRAGMAS.'
+        )
+
+    @pytest.mark.django_db
+    def test_04_health_checks_before_first_use(self, tmp_path):
+        checks = []
+
+        class Wrapper(HealthCheckMixin, DatabaseWrapper):
+            usable = True
+
+            def is_usable(self):
+                checks.append(self.connection)
+                return self.usable
+
+        wrapper = Wrapper(
+            {**connection.settings_dict, 'CONN_MAX_AGE': 60,
+             'CONN_HEALTH_CHECKS': True,
+             'NAME': str(tmp_path / 'health.sqlite3')}, alias='health')
+        try:
+            wrapper.ensure_connection()
+            wrapper.close_if_unusable_or_obsolete()
+            assert checks == [], (
+                'Проверьте, что соединение не проверяется в начале '
+                'запроса, а только перед первым использованием.'
+            )
+            broken = wrapper.connection
+            wrapper.usable = False
+            with wrapper.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            assert checks == [broken]
+            assert wrapper.connection is not broken, (
+                'Проверьте, что разорванное соединение открывается заново.'
+            )
+            with wrapper.cursor():
+                pass
+            assert len(checks) == 1, (
+                'Проверьте, что соединение проверяется один раз за запрос.'
+            )
+            wrapper.close_if_unusable_or_obsolete()
+            with wrapper.cursor():
+                pass
+            assert len(checks) == 2
+        finally:
+            wrapper.close()
+
+    def test_05_postgresql_backend(self):
+        config = database_config(
+            'db.sqlite3', env={'DB_ENGINE': 'postgresql'})
+        assert config['ENGINE'] == 'api.backends.postgresql', (
+            'Проверьте, что PostgreSQL подключается бэкендом с проверкой '
+            'соединений.'
+        )
+
+
+@pytest.mark.django_db
+class Test26HealthView:
+
+    def test_01_health(self, client):
+        response = client.get('/api/v1/health/')
+        assert response.status_code == HTTPStatus.OK
+        data = response.json()
+        assert data['status'] == 'ok'
+        assert data['databases']['default']['ok'] is True
+        assert data['databases']['default']['vendor'] == 'sqlite'
+
+    def test_02_unavailable(self, client, monkeypatch):
+        monkeypatch.setattr('api.views.check_databases', lambda: {
+            'default': {'ok': False, 'vendor': 'postgresql',
+                        'error': 'connection refused'}})
+        response = client.get('/api/v1/health/')
+        assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE, (
+            'Проверьте, что `/api/v1/health/` отвечает 503, если база '
+            'недоступна.'
+        )
+        assert response.json()['status'] == 'unavailable'
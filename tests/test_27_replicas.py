@@ -0,0 +1,163 @@
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+from django.core.cache import caches
+from django.core.management import CommandError, call_command
+from django.db import connections
+
+from api.profiling import registry
+from api_yamdb.database import replica_configs
+from reviews.models import Comment, Review
+from tests.utils import create_reviews
+
+REPLICA = 'replica1'
+
+
+@pytest.fixture
+def replica(tmp_path, settings):
+    """Вторая база SQLite в отдельном файле, как реплика на одной
+    машине."""
+    connections.settings[REPLICA] = {
+        **connections['default'].settings_dict,
+        'NAME': str(tmp_path / 'replica.sqlite3'),
+        'TEST': {},
+    }
+    settings.DATABASE_REPLICAS = [REPLICA]
+    yield REPLICA
+    connections[REPLICA].close()
+    del connections[REPLICA]
+    del connections.settings[REPLICA]
+
+
+class Test27ReplicaConfig:
+
+    def test_01_replica_configs(self):
+        primary = {'ENGINE': 'django.db.backends.sqlite3',
+                   'NAME': 'db.sqlite3', 'CONN_MAX_AGE': 60}
+        assert replica_configs(primary, env={}) == {}
+        replicas = replica_configs(
+            primary, env={'DB_REPLICAS': 'a.sqlite3, b.sqlite3'})
+        assert list(replicas) == ['replica1', 'replica2']
+        assert replicas['replica2']['NAME'] == 'b.sqlite3'
+        assert replicas['replica1']['CONN_MAX_AGE'] == 60
+        assert replicas['replica1']['TEST'] == {'MIRROR': 'default'}
+
+        primary = {'ENGINE': 'django.db.backends.postgresql',
+                   'NAME': 'yamdb', 'HOST': 'db', 'PORT': '5432',
+                   'OPTIONS': {'connect_timeout': 5}}
+        replicas = replica_configs(
+            primary, env={'DB_REPLICAS': 'db-replica:6432,db-replica2'})
+        assert (replicas['replica1']['HOST'],
+                replicas['replica1']['PORT']) == ('db-replica', '6432')
+        assert (replicas['replica2']['HOST'],
+                replicas['replica2']['PORT']) == ('db-replica2', '5432')
+        assert replicas['replica2']['NAME'] == 'yamdb'
+
+
+@pytest.mark.django_db(transaction=True)
+class Test27Replicas:
+
+    def test_01_sync_replicas_requires_replicas(self):
+        with pytest.raises(CommandError):
+            call_command('sync_replicas', stdout=StringIO())
+
+    def test_02_reads_from_replica(self, replica, admin_client, user,
+                                   user_client, client):
+        reviews, titles = create_reviews(admin_client, {user: user_client})
+        call_command('sync_replicas', stdout=StringIO())
+        Review.objects.update(text='Изменено после копирования')
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+
+        response = client.get(url)
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()['results'][0]['text'] == reviews[0]['text'], (
+            'Проверьте, что GET-запросы читают реплику.'
+        )
+        response = user_client.get(url)
+        assert response.json()['results'][0]['text'] == (
+            'Изменено после копирования'), (
+            'Проверьте, что после записи пользователь читает основную базу.'
+        )
+
+        caches['replicas'].clear()
+        response = user_client.get(url)
+        assert response.json()['results'][0]['text'] == reviews[0]['text'], (
+            'Проверьте, что по истечении REPLICA_STICKY_SECONDS '
+            'пользователь снова читает реплику.'
+        )
+
+    def test_03_writes_go_to_primary(self, replica, admin_client, user,
+                                     user_client):
+        reviews, titles = create_reviews(admin_client, {user: user_client})
+        call_command('sync_replicas', stdout=StringIO())
+        caches['replicas'].clear()
+        url = (f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+               f'{reviews[0]["id"]}/comments/')
+        response = user_client.post(url, data={'text': 'Комментарий'})
+        assert response.status_code == HTTPStatus.CREATED
+        assert Comment.objects.using('default').count() == 1
+        assert Comment.objects.using(REPLICA).count() == 0, (
+            'Проверьте, что запись идёт в основную базу.'
+        )
+        response = user_client.get(url)
+        assert response.json()['count'] == 1
+
+    def test_04_alias_metrics(self, replica, admin_client, user,
+                              user_client, client, settings):
+        reviews, titles = create_reviews(admin_client, {user: user_client})
+        call_command('sync_replicas', stdout=StringIO())
+        registry.reset()
+        settings.PROFILING_SAMPLE_RATE = 1
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        client.get(url)
+        user_client.post(f'{url}{reviews[0]["id"]}/comments/',
+                         data={'text': 'Комментарий'})
+        settings.PROFILING_SAMPLE_RATE = 0
+        queries = dict(registry.alias_queries)
+        metrics = registry.export()
+        registry.reset()
+        assert queries.get(('api:review-list', REPLICA), 0) >= 2, (
+            'Проверьте, что запросы к реплике учитываются по алиасу базы.'
+        )
+        assert ('api:review-list', 'default') not in queries, (
+            'Проверьте, что список отзывов не обращается к основной базе.'
+        )
+        assert queries.get(('api:comment-list', 'default'), 0) > 0
+        assert ('api:comment-list', REPLICA) not in queries, (
+            'Проверьте, что запрос на запись не читает реплику.'
+        )
+        assert (f'yamdb_db_queries_total{{view="api:review-list",'
+                f'alias="{REPLICA}"}}') in metrics, (
+            'Проверьте, что /api/v1/metrics/ отдаёт число запросов '
+            'по базам данных.'
+        )
+
+    def test_05_replica_reads_without_validators(self, replica, admin_client,
+                                                 user, user_client, client):
+        reviews, titles = create_reviews(admin_client, {user: user_client})
+        call_command('sync_replicas', stdout=StringIO())
+        caches['replicas'].clear()
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+        response = admin_client.patch(url, data={'name': 'Новое название'})
+        assert response.status_code == HTTPStatus.OK
+
+        for _ in range(2):
+            response = client.get(url)
+            assert response.json()['name'] == titles[0]['name']
+            assert 'ETag' not in response, (
+                'Проверьте, что ответ из отстающей реплики не получает '
+                'ETag по свежей версии каталога.'
+            )
+            assert 'Last-Modified' not in response
+            assert response['X-Cache'] == 'MISS', (
+                'Проверьте, что ответ из реплики не попадает в кеш ответов.'
+            )
+
+        response = admin_client.get(url)
+        assert response.json()['name'] == 'Новое название'
+        assert 'ETag' in response, (
+            'Проверьте, что ответ из основной базы получает ETag.'
+        )
+        response = client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
@@ -0,0 +1,112 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from tests.utils import create_reviews, create_titles
+
+
+def get_with_queries(client, url):
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url)
+    assert response.status_code == HTTPStatus.OK, response.content
+    return response.json(), [query['sql'] for query in
+                             queries.captured_queries]
+
+
+@pytest.mark.django_db(transaction=True)
+class Test28Fieldsets:
+
+    def test_01_title_fields(self, admin_client, client):
+        titles, _, _ = create_titles(admin_client)
+        data, queries = get_with_queries(
+            client, '/api/v1/titles/?fields=id,name,rating')
+        assert [set(title) for title in data['results']] == [
+            {'id', 'name', 'rating'}] * len(titles), (
+            'Проверьте, что `?fields=` оставляет в ответе только '
+            'перечисленные поля.'
+        )
+        statements = '\n'.join(queries)
+        assert '"reviews_title"."description"' not in statements, (
+            'Проверьте, что `?fields=` не читает из базы колонки '
+            'невыбранных полей.'
+        )
+        assert 'reviews_genre' not in statements, (
+            'Проверьте, что без поля genre жанры не подгружаются.'
+        )
+        assert 'reviews_category' not in statements
+
+        data, queries = get_with_queries(
+            client, f'/api/v1/titles/{titles[0]["id"]}/?fields=name,genre')
+        assert data == {'name': titles[0]['name'],
+                        'genre': data['genre']}
+        assert len(data['genre']) == 2
+        assert '"reviews_title"."description"' not in '\n'.join(queries)
+
+    def test_02_title_default_and_expand(self, admin_client, client):
+        titles, _, _ = create_titles(admin_client)
+        data, queries = get_with_queries(client, '/api/v1/titles/')
+        assert set(data['results'][0]) == {
+            'id', 'name', 'year', 'rating', 'description', 'genre',
+            'category'}
+        assert 'reviews_titlestats' not in '\n'.join(queries)
+
+        data, queries = get_with_queries(
+            client, '/api/v1/titles/?expand=stats&fields=id,stats')
+        assert data['results'][0]['stats'] is None
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        response = admin_client.post(url, data={'text': 'Отзыв', 'score': 8})
+        assert response.status_code == HTTPStatus.CREATED
+        data, queries = get_with_queries(
+            client, '/api/v1/titles/?expand=stats&fields=id,stats')
+        stats = {title['id']: title['stats'] for title in data['results']}
+        assert stats[titles[0]['id']]['count'] == 1, (
+            'Проверьте, что `?expand=stats` добавляет статистику оценок.'
+        )
+        assert len(queries) == 2, (
+            'Проверьте, что статистика подгружается select_related.'
+        )
+
+    def test_03_review_fields_and_expand(self, admin_client, user,
+                                         user_client, client):
+        reviews, titles = create_reviews(admin_client, {user: user_client})
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        data, queries = get_with_queries(client, f'{url}?fields=id,score')
+        assert data['results'] == [{'id': reviews[0]['id'], 'score': 5}]
+        statements = '\n'.join(queries)
+        assert '"reviews_review"."text"' not in statements
+        assert 'reviews_user' not in statements, (
+            'Проверьте, что без поля author автор не подгружается.'
+        )
+
+        data, _ = get_with_queries(client, f'{url}?expand=author,title')
+        review = data['results'][0]
+        assert review['author'] == {'username': user.username,
+                                    'first_name': user.first_name,
+                                    'last_name': user.last_name}
+        assert review['title'] == {'id': titles[0]['id'],
+                                   'name': titles[0]['name'],
+                                   'year': titles[0]['year']}
+        data, _ = get_with_queries(client, url)
+        assert data['results'][0]['author'] == user.username, (
+            'Проверьте, что без `?expand=` формат ответа не меняется.'
+        )
+
+    def test_04_unknown_fields(self, admin_client, client):
+        create_titles(admin_client)
+        for query in ('fields=id,secret', 'expand=genre'):
+            response = client.get(f'/api/v1/titles/?{query}')
+            assert response.status_code == HTTPStatus.BAD_REQUEST, (
+                'Проверьте, что неизвестное поле в `?fields=` или '
+                '`?expand=` даёт ответ 400.'
+            )
+            assert query.split('=')[0] in response.json()
+
+    def test_05_writes_ignore_fields(self, admin_client, user, user_client):
+        _, titles = create_reviews(admin_client, {user: user_client})
+        response = admin_client.post(
+            f'/api/v1/titles/{titles[1]["id"]}/reviews/?fields=id',
+            data={'text': 'Отзыв', 'score': 3})
+        assert response.status_code == HTTPStatus.CREATED
+        assert response.json()['text'] == 'Отзыв'
@@ -0,0 +1,124 @@
+import datetime as dt
+import uuid
+from decimal import Decimal
+from http import HTTPStatus
+from io import BytesIO
+
+import pytest
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+
+import api.parsers
+import api.renderers
+from api.parsers import FastJSONParser
+from api.renderers import FastJSONRenderer
+from tests.utils import create_comments
+
+UTC = dt.timezone.utc
+
+EDGE_CASES = [
+    None,
+    {'rating': None, 'score': 7, 'mean': 7.333333333333333},
+    {'rating': Decimal('7.50'), 'weighted': Decimal('0.1')},
+    {'pub_date': dt.datetime(2022, 1, 2, 3, 4, 5, 123456, tzinfo=UTC),
+     'local': dt.datetime(2022, 1, 2, 3, 4, 5,
+                          tzinfo=dt.timezone(dt.timedelta(hours=3))),
+     'naive': dt.datetime(2022, 1, 2, 3, 4, 5),
+     'date': dt.date(2022, 1, 2), 'time': dt.time(3, 4, 5, 6)},
+    {'text': 'Отзыв «с кавычками» \" \\ / \n\t\x1f\x7f 😀',
+     'separators': 'a\u2028b\u2029c'},
+    {1: 'один', 10: 'десять'},
+    ReturnDict({'results': ReturnList([{'id': 1}], serializer=None)},
+               serializer=None),
+    [gettext_lazy('Ленивая строка'), uuid.UUID(int=1), b'bytes',
+     dt.timedelta(seconds=90), (1, 2), True, False, -0.0, 10 ** 20],
+]
+
+
+@pytest.mark.parametrize('data', EDGE_CASES)
+def test_29_render_same_bytes(data):
+    assert FastJSONRenderer().render(data) == JSONRenderer().render(data), (
+        'Проверьте, что FastJSONRenderer выдаёт те же байты, '
+        'что и JSONRenderer.'
+    )
+
+
+@pytest.mark.parametrize('data', EDGE_CASES)
+def test_29_render_without_orjson(data, monkeypatch):
+    monkeypatch.setattr(api.renderers, 'orjson', None)
+    assert FastJSONRenderer().render(data) == JSONRenderer().render(data)
+
+
+def test_29_render_indent():
+    data = {'id': 1, 'genre': [{'slug': 'drama'}]}
+    for media_type, context in (('application/json; indent=4', {}),
+                                ('application/json', {'indent': 2})):
+        assert FastJSONRenderer().render(data, media_type, context) == (
+            JSONRenderer().render(data, media_type, context))
+
+
+@pytest.mark.parametrize('body', [
+    b'{"text": "\xd0\x9e\xd1\x82\xd0\xb7\xd1\x8b\xd0\xb2", "score": 7}',
+    b'[1, 2.5, null, true, {"a": {"b": []}}]',
+    b'{"big": 100000000000000000000, "small": 1e-07}',
+    b'"\\ud83d\\ude00 \\u2028"',
+], ids=['utf-8', 'types', 'big-int', 'escapes'])
+def test_29_parse_same_data(body):
+    assert FastJSONParser().parse(BytesIO(body)) == (
+        JSONParser().parse(BytesIO(body)))
+
+
+@pytest.mark.parametrize('body', [b'{"score": NaN}', b'{"score": ',
+                                  b'\xff\xfe'],
+                         ids=['nan', 'truncated', 'not-utf-8'])
+def test_29_parse_errors(body, monkeypatch):
+    with pytest.raises(ParseError) as fast:
+        FastJSONParser().parse(BytesIO(body))
+    with pytest.raises(ParseError) as stdlib:
+        JSONParser().parse(BytesIO(body))
+    assert str(fast.value) == str(stdlib.value), (
+        'Проверьте, что FastJSONParser возвращает ту же ошибку разбора, '
+        'что и JSONParser.'
+    )
+    monkeypatch.setattr(api.parsers, 'orjson', None)
+    with pytest.raises(ParseError):
+        FastJSONParser().parse(BytesIO(body))
+
+
+@pytest.mark.django_db(transaction=True)
+class Test29JSONResponses:
+
+    def test_01_api_responses(self, admin_client, user, user_client):
+        comments, reviews, titles = create_comments(
+            admin_client, {user: user_client})
+        title_url = f'/api/v1/titles/{titles[0]["id"]}/'
+        review_url = f'{title_url}reviews/{reviews[0]["id"]}/'
+        urls = ('/api/v1/titles/', title_url, f'{title_url}stats/',
+                '/api/v1/titles/?expand=stats', f'{title_url}reviews/',
+                f'{review_url}comments/', '/api/v1/genres/',
+                '/api/v1/users/me/')
+        for url in urls:
+            response = user_client.get(url)
+            assert response.status_code == HTTPStatus.OK
+            assert response['Content-Type'] == 'application/json'
+            assert response.content == JSONRenderer().render(
+                response.data), (
+                f'Проверьте, что ответ `{url}` совпадает с JSONRenderer '
+                f'побайтно.'
+            )
+
+    def test_02_json_request(self, admin_client, user, user_client):
+        _, _, titles = create_comments(admin_client, {user: user_client})
+        response = admin_client.post(
+            f'/api/v1/titles/{titles[1]["id"]}/reviews/',
+            data={'text': 'От\u2028зыв', 'score': 9}, format='json')
+        assert response.status_code == HTTPStatus.CREATED
+        assert response.json()['text'] == 'От\u2028зыв'
+        assert b'\\u2028' in response.content
+        response = admin_client.post(
+            f'/api/v1/titles/{titles[1]["id"]}/reviews/', data=b'{"score":',
+            content_type='application/json')
+        assert response.status_code == HTTPStatus.BAD_REQUEST
@@ -1,5 +1,10 @@
+import asyncio
 from http import HTTPStatus
 
+from asgiref.testing import ApplicationCommunicator
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
 
 check_name_and_slug_patterns = (
     (
@@ -305,3 +310,50 @@ def check_fields(obj_type, url_pattern, obj, expected_data, detail=False):
         f'данные {obj_types[obj_type]}{results_in_msg}. Поле `id` не '
         'найдено или не является целым числом.'
     )
+
+
+def check_constant_queries(client, url, add_objects):
+    """Число SQL-запросов на страницу не должно зависеть
+    от количества объектов на ней."""
+    with CaptureQueriesContext(connection) as before:
+        response = client.get(url)
+    assert response.status_code == HTTPStatus.OK
+    results_before = len(response.json()['results'])
+    add_objects()
+    with CaptureQueriesContext(connection) as after:
+        response = client.get(url)
+    assert len(response.json()['results']) > results_before, (
+        f'Проверьте, что после добавления объектов ответ на GET-запрос '
+        f'к `{url}` содержит больше элементов.'
+    )
+    assert len(after) == len(before), (
+        f'Проверьте, что GET-запрос к `{url}` выполняет одинаковое число '
+        f'SQL-запросов независимо от размера страницы: было '
+        f'{len(before)}, стало {len(after)}.'
+    )
+
+
+def asgi_request(app, method, path, body=b'', headers=()):
+    """Запрос к ASGI-приложению: статус и тело ответа целиком."""
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': method, 'scheme': 'http', 'path': path,
+        'raw_path': path.encode(), 'query_string': b'', 'root_path': '',
+        'headers': list(headers), 'server': ('testserver', 80),
+        'client': ('127.0.0.1', 1),
+    }
+
+    async def run():
+        communicator = ApplicationCommunicator(app, scope)
+        await communicator.send_input({'type': 'http.request', 'body': body})
+        start = await communicator.receive_output(5)
+        content = b''
+        while True:
+            message = await communicator.receive_output(5)
+            content += message.get('body', b'')
+            if not message.get('more_body'):
+                break
+        await communicator.wait(5)
+        return start['status'], content
+
+    return asyncio.run(run())